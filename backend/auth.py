@@ -0,0 +1,153 @@
+"""
+signed stateless session tokens, issued by the /login handlers and checked
+in-process on every other request, so no route has to look the caller's role
+up in users/roles or trust the user id it was given in the path.
+a token is base64url(json claims) + "." + base64url(hmac-sha256 of the claims)
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import Depends, Header, HTTPException, Path, Query
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# db.py imports this module before its own load_dotenv()
+load_dotenv()
+
+AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", str(12 * 3600)))
+AUTH_SECRET = os.getenv("AUTH_SECRET")
+if not AUTH_SECRET:
+    # fine for a single dev worker, but tokens then die with the process
+    # and are not accepted by other workers
+    logger.warning("AUTH_SECRET is not set, using a random per-process secret")
+    AUTH_SECRET = secrets.token_urlsafe(32)
+
+STUDENT = "student"
+CLUB_MEMBER = "club member"
+ADMIN = "admin"
+
+
+class TokenUser(BaseModel):
+    """the claims carried by a session token"""
+
+    user_id: int
+    role: str
+    club_id: Optional[int] = None
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(value):
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _sign(payload):
+    return hmac.new(AUTH_SECRET.encode(), payload.encode(), hashlib.sha256).digest()
+
+
+def issue_token(user_id, role, club_id=None):
+    claims = {
+        "sub": user_id,
+        "role": role.lower(),
+        "club_id": club_id,
+        "exp": int(time.time()) + AUTH_TOKEN_TTL,
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_b64encode(_sign(payload))}"
+
+
+def decode_token(token):
+    """claims of a valid, unexpired token, None otherwise"""
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(_b64decode(signature), _sign(payload)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return TokenUser(
+        user_id=claims["sub"], role=claims["role"], club_id=claims.get("club_id")
+    )
+
+
+async def current_user(authorization: Optional[str] = Header(None)):
+    """
+    dependency: the caller, from an "Authorization: Bearer <token>" header.
+    declare it before get_async_db so rejected requests never touch the pool
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    user = decode_token(token) if scheme.lower() == "bearer" else None
+    if user is None:
+        raise HTTPException(
+            status_code=401,
+            detail="missing or invalid session token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+async def stream_user(
+    token: str = Query(
+        ..., description="session token, EventSource cannot send headers"
+    )
+):
+    """dependency for server-sent event streams, same token as a ?token= param"""
+    user = decode_token(token)
+    if user is None:
+        raise HTTPException(status_code=401, detail="missing or invalid session token")
+    return user
+
+
+def require_role(role):
+    """dependency factory: the caller, who must have the given role"""
+
+    async def dependency(user: TokenUser = Depends(current_user)):
+        if user.role != role:
+            raise HTTPException(status_code=403, detail=f"user is not a {role}")
+        return user
+
+    return dependency
+
+
+async def current_student(
+    student_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(require_role(STUDENT)),
+):
+    """dependency for /student/{student_id}/... routes, callers only act as themselves"""
+    if user.user_id != student_id:
+        raise HTTPException(status_code=403, detail="token is for another student")
+    return user
+
+
+async def current_club_member(
+    club_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(require_role(CLUB_MEMBER)),
+):
+    """dependency for /club/{club_id}/... routes, members only act for their club"""
+    if user.club_id != club_id:
+        raise HTTPException(status_code=403, detail="not a member of this club")
+    return user
+
+
+async def current_admin(
+    admin_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(require_role(ADMIN)),
+):
+    """dependency for /admin/{admin_id}/... routes"""
+    if user.user_id != admin_id:
+        raise HTTPException(status_code=403, detail="token is for another admin")
+    return user
@@ -0,0 +1,230 @@
+"""
+bulk student onboarding. an admin uploads a CSV file (header row of the signup
+field names) or an NDJSON file of students as the request body. the body is
+read as it streams in, IMPORT_BATCH_SIZE records at a time. each batch is
+validated, its passwords are hashed in parallel on the password pool, and its
+users and phone numbers are inserted with executemany in one transaction.
+a bad record (invalid field, email taken or repeated) is reported by line
+number and skipped, the rest of its batch still goes in
+"""
+
+import codecs
+import csv
+import json
+import os
+
+from fastapi import Query
+from pydantic import ValidationError
+from sqlalchemy import bindparam, text
+
+from backend.passwords import BCRYPT_ROUNDS, hash_passwords
+from backend.schemas import StudentSignup
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+# imported passwords are usually temporary, fewer rounds make a large import
+# much faster and the hashes are upgraded to BCRYPT_ROUNDS on first login
+IMPORT_BCRYPT_ROUNDS = int(os.getenv("IMPORT_BCRYPT_ROUNDS", str(BCRYPT_ROUNDS)))
+# errors listed in the response, the failed count covers the rest
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+# shared query param of the import routes
+ImportFormat = Query("csv", alias="format", pattern="^(csv|ndjson)$")
+
+TAKEN_EMAILS = text("SELECT email FROM users WHERE email IN :emails").bindparams(
+    bindparam("emails", expanding=True)
+)
+USER_IDS = text("SELECT user_id, email FROM users WHERE email IN :emails").bindparams(
+    bindparam("emails", expanding=True)
+)
+INSERT_USERS = text(
+    """
+    INSERT INTO users
+    (first_name, last_name, email, password_hash, address_street,
+    address_city, address_pincode, role_id) VALUES
+    (:first_name, :last_name, :email, :password_hash,
+    :address_street, :address_city, :address_pincode, :role_id)
+    """
+)
+INSERT_PHONES = text(
+    "INSERT INTO user_phone_numbers (user_id, phone_number) VALUES (:user_id, :phone)"
+)
+
+
+async def _lines(stream):
+    """text lines of a streamed request body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def records(stream, fmt):
+    """
+    (line number, fields) per record, fields is an error message when the line
+    cannot be parsed. csv records have to fit on one line
+    """
+    header = None
+    line_no = 0
+    async for line in _lines(stream):
+        line_no += 1
+        if not line.strip():
+            continue
+        if fmt == "ndjson":
+            try:
+                fields = json.loads(line)
+            except ValueError as e:
+                yield line_no, f"invalid json: {e}"
+                continue
+            if not isinstance(fields, dict):
+                yield line_no, "expected a json object"
+                continue
+        else:
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                yield line_no, f"expected {len(header)} columns, got {len(values)}"
+                continue
+            # empty cells are missing values, not empty strings
+            fields = {name: value or None for name, value in zip(header, values)}
+        yield line_no, fields
+
+
+def _describe(error):
+    return "; ".join(
+        f"{'.'.join(map(str, e['loc'])) or 'record'}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+class StudentImport:
+    """one upload: counts, the reported errors and the emails seen so far"""
+
+    def __init__(self, db):
+        self.db = db
+        self.received = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self._seen = set()
+        self._role_id = None
+
+    def reject(self, line, email, error):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "email": email, "error": error})
+
+    async def run(self, stream, fmt):
+        self._role_id = (
+            await self.db.execute(
+                text("SELECT role_id FROM roles WHERE role_name = 'Student'")
+            )
+        ).scalar_one()
+        batch = []
+        async for line, fields in records(stream, fmt):
+            self.received += 1
+            if isinstance(fields, str):
+                self.reject(line, None, fields)
+                continue
+            try:
+                student = StudentSignup(**fields)
+            except ValidationError as e:
+                self.reject(line, fields.get("email"), _describe(e))
+                continue
+            # emails are unique regardless of case (the column's collation)
+            key = student.email.lower()
+            if key in self._seen:
+                self.reject(line, student.email, "email repeated in the upload")
+                continue
+            self._seen.add(key)
+            batch.append((line, student))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await self._import_batch(batch)
+                batch = []
+        if batch:
+            await self._import_batch(batch)
+        return self.summary()
+
+    async def _import_batch(self, batch):
+        emails = [student.email for _, student in batch]
+        taken = {
+            row.email.lower()
+            for row in await self.db.execute(TAKEN_EMAILS, {"emails": emails})
+        }
+        fresh = []
+        for line, student in batch:
+            if student.email.lower() in taken:
+                self.reject(line, student.email, "email already registered")
+            else:
+                fresh.append((line, student))
+        if not fresh:
+            return
+
+        hashes = await hash_passwords(
+            [student.password for _, student in fresh], IMPORT_BCRYPT_ROUNDS
+        )
+        try:
+            await self._insert(fresh, hashes)
+            await self.db.commit()
+            self.imported += len(fresh)
+            return
+        except Exception:
+            await self.db.rollback()
+        # something slipped past the checks (e.g. an email registered since),
+        # find the bad records one transaction at a time
+        for row, password_hash in zip(fresh, hashes):
+            try:
+                await self._insert([row], [password_hash])
+                await self.db.commit()
+                self.imported += 1
+            except Exception as e:
+                await self.db.rollback()
+                self.reject(row[0], row[1].email, str(e).splitlines()[0])
+
+    async def _insert(self, rows, hashes):
+        students = [student for _, student in rows]
+        await self.db.execute(
+            INSERT_USERS,
+            [
+                {
+                    "first_name": student.first_name,
+                    "last_name": student.last_name,
+                    "email": student.email,
+                    "password_hash": password_hash,
+                    "address_street": student.address_street,
+                    "address_city": student.address_city,
+                    "address_pincode": student.address_pincode,
+                    "role_id": self._role_id,
+                }
+                for student, password_hash in zip(students, hashes)
+            ],
+        )
+        user_ids = {
+            row.email.lower(): row.user_id
+            for row in await self.db.execute(
+                USER_IDS, {"emails": [student.email for student in students]}
+            )
+        }
+        await self.db.execute(
+            INSERT_PHONES,
+            [
+                {"user_id": user_ids[student.email.lower()], "phone": student.phone}
+                for student in students
+            ],
+        )
+
+    def summary(self):
+        return {
+            "received": self.received,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
@@ -0,0 +1,134 @@
+"""
+in-process TTL cache for read heavy query results (e.g. the upcoming events catalog)
+entries are tagged with a generation number held by a pluggable backend, so
+bumping the generation in a shared backend (redis) invalidates every worker
+"""
+
+import os
+import time
+from collections import OrderedDict
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis is optional, only needed for the shared backend
+    redis = None
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "30"))
+CATALOG_CACHE_MAXSIZE = int(os.getenv("CATALOG_CACHE_MAXSIZE", "256"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+MISS = object()
+
+
+class LocalBackend:
+    """
+    generation counters kept in this process only
+    """
+
+    def __init__(self):
+        self._generations = {}
+
+    async def generation(self, namespace):
+        return self._generations.get(namespace, 0)
+
+    async def generations(self, namespaces):
+        return [self._generations.get(namespace, 0) for namespace in namespaces]
+
+    async def bump(self, namespace):
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+
+class RedisBackend:
+    """
+    generation counters kept in redis so invalidations reach all workers,
+    any redis protocol server works (a local redis-server is enough for testing)
+    """
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("CACHE_REDIS_URL is set but redis is not installed")
+        self._client = redis.from_url(url)
+
+    async def generation(self, namespace):
+        value = await self._client.get(f"evently:cache:{namespace}")
+        return int(value) if value is not None else 0
+
+    async def generations(self, namespaces):
+        """several counters in one round trip"""
+        values = await self._client.mget(
+            [f"evently:cache:{namespace}" for namespace in namespaces]
+        )
+        return [int(value) if value is not None else 0 for value in values]
+
+    async def bump(self, namespace):
+        await self._client.incr(f"evently:cache:{namespace}")
+
+
+class TTLCache:
+    """
+    size bounded LRU cache whose entries expire after ttl seconds
+    or as soon as the namespace generation moves on
+    """
+
+    def __init__(self, namespace, maxsize, ttl, backend=None):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend or LocalBackend()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get(self, key):
+        """return the cached value for key, or MISS"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, generation, value = entry
+            if expires_at > time.monotonic() and generation == (
+                await self.backend.generation(self.namespace)
+            ):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self._entries.pop(key, None)
+        self.misses += 1
+        return MISS
+
+    async def set(self, key, value):
+        generation = await self.backend.generation(self.namespace)
+        self._entries[key] = (time.monotonic() + self.ttl, generation, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def invalidate(self):
+        """drop every entry here and, through the backend, in other workers"""
+        self._entries.clear()
+        await self.backend.bump(self.namespace)
+        self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+catalog_cache = TTLCache(
+    "catalog",
+    maxsize=CATALOG_CACHE_MAXSIZE,
+    ttl=CATALOG_CACHE_TTL,
+    backend=RedisBackend(CACHE_REDIS_URL) if CACHE_REDIS_URL else None,
+)
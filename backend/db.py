@@ -1,12 +1,26 @@
 """
-creates a reusable SQLAlchemy db connection
+creates a reusable SQLAlchemy async db connection
 """
 
+import asyncio
+import logging
 import os
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Optional
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from fastapi import Depends, Request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from backend.auth import TokenUser, current_user, decode_token
+from backend.metrics import METRICS_ENABLED, instrument_engine
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -16,19 +30,363 @@ DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# DATABASE_URL can be set directly to point at another async driver,
+# e.g. sqlite+aiosqlite:///./evently.db as a local stand-in
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
+)
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# pool settings, the railway db drops idle connections so connections are
+# pinged on checkout and recycled well before the server side timeout
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
 
 
-def get_db():
+def _pool_options(url):
     """
-    function to return the local session for use by the routes
-    fastAPI automatically injects the get_db dependency into the routes which call it
+    pool keyword args for create_async_engine, sqlite stand-ins
+    use their own pool classes which do not take size/overflow
     """
-    db = SessionLocal()
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"pool_pre_ping": DB_POOL_PRE_PING}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# read replicas, comma separated urls in the same form as DATABASE_URL.
+# GET handlers read from a healthy replica at most REPLICA_MAX_LAG seconds
+# behind the primary, health and lag are checked every REPLICA_CHECK_INTERVAL
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+
+
+def _sqlite_functions(dbapi_conn, conn_record):
+    """mysql's NOW() for the listing queries, the stored procedures stay mysql only"""
+    dbapi_conn.create_function(
+        "NOW", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    )
+
+
+def _create_engine(url):
+    """engine with the pool settings, metrics hooks and sqlite stand-in functions"""
+    new_engine = create_async_engine(url, **_pool_options(url))
+    if METRICS_ENABLED:
+        instrument_engine(new_engine)
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _sqlite_functions)
+    return new_engine
+
+
+def _sessionmaker(bind):
+    return async_sessionmaker(bind=bind, autoflush=False, expire_on_commit=False)
+
+
+engine = _create_engine(DATABASE_URL)
+AsyncSessionLocal = _sessionmaker(engine)
+
+
+class PoolStats:
+    """
+    counters for the connection pool, fed by pool events and by
+    get_async_db which times how long each request waits for a connection
+    """
+
+    # upper bounds (seconds) of the wait time histogram buckets
+    WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+    def __init__(self):
+        self.connects = 0
+        self.connect_failures = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidated = 0
+        self.wait_counts = [0] * len(self.WAIT_BUCKETS)
+        self.wait_total = 0.0
+
+    def observe_wait(self, seconds):
+        """record one connection acquisition"""
+        self.wait_counts[bisect_left(self.WAIT_BUCKETS, seconds)] += 1
+        self.wait_total += seconds
+
+    def snapshot(self, pool):
+        """current pool state plus the accumulated counters"""
+        return {
+            "pool": pool.status(),
+            "size": getattr(pool, "size", lambda: None)(),
+            "checked_out": getattr(pool, "checkedout", lambda: None)(),
+            "overflow": getattr(pool, "overflow", lambda: None)(),
+            "connects": self.connects,
+            "connect_failures": self.connect_failures,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidated": self.invalidated,
+            "wait_seconds": {
+                "count": sum(self.wait_counts),
+                "sum": round(self.wait_total, 6),
+                "buckets": {
+                    ("+Inf" if b == float("inf") else str(b)): c
+                    for b, c in zip(self.WAIT_BUCKETS, self.wait_counts)
+                },
+            },
+        }
+
+
+pool_stats = PoolStats()
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_conn, conn_record):
+    pool_stats.connects += 1
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+    pool_stats.checkouts += 1
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_checkin(dbapi_conn, conn_record):
+    pool_stats.checkins += 1
+
+
+@event.listens_for(engine.sync_engine, "invalidate")
+def _on_invalidate(dbapi_conn, conn_record, exception):
+    pool_stats.invalidated += 1
+
+
+async def _acquire(db):
+    """
+    acquire the connection up front so pool wait time and
+    connect failures are measured separately from query time
+    """
+    start = time.perf_counter()
+    try:
+        await db.connection()
+    except Exception:
+        pool_stats.connect_failures += 1
+        raise
+    pool_stats.observe_wait(time.perf_counter() - start)
+
+
+class Replica:
+    """one read replica, healthy once a check found it up and within max_lag"""
+
+    def __init__(self, url):
+        self.engine = _create_engine(url)
+        self.sessionmaker = _sessionmaker(self.engine)
+        self.healthy = False
+        self.lag = None
+        self.failures = 0
+        self.checked_at = None
+
+    async def _lag(self, conn):
+        """seconds behind the primary, None when replication is broken"""
+        if self.engine.dialect.name != "mysql":
+            return 0.0
+        # SHOW SLAVE STATUS / Seconds_Behind_Master before mysql 8.0.22
+        row = (await conn.exec_driver_sql("SHOW REPLICA STATUS")).mappings().first()
+        if row is None:
+            return 0.0  # not replicating, e.g. a stand-in for tests
+        lag = row.get("Seconds_Behind_Source")
+        return None if lag is None else float(lag)
+
+    async def check(self, max_lag):
+        try:
+            async with self.engine.connect() as conn:
+                await conn.exec_driver_sql("SELECT 1")
+                self.lag = await self._lag(conn)
+        except Exception as e:
+            self.lag = None
+            self.failures += 1
+            logger.warning("read replica %s is down: %s", self.engine.url, e)
+        self.healthy = self.lag is not None and self.lag <= max_lag
+        self.checked_at = time.time()
+
+    def stats(self):
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "lag": self.lag,
+            "failures": self.failures,
+        }
+
+
+class ReplicaSet:
+    """
+    picks the replica a GET reads from, round robin over the healthy ones.
+    reads go to the primary when no replica is healthy, and for a user who
+    wrote in the last max_lag + check_interval seconds so they see their write
+    """
+
+    def __init__(self, urls, max_lag, check_interval):
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = 0
+        self._writes = {}
+        self._task = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    @property
+    def read_your_writes_window(self):
+        return self.max_lag + self.check_interval
+
+    def note_write(self, user_id):
+        if user_id is not None and self.replicas:
+            self._writes[user_id] = time.monotonic()
+
+    def pick(self, user_id=None):
+        """a healthy replica for this user's read, None for the primary"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        wrote_at = self._writes.get(user_id)
+        if not healthy or (
+            wrote_at is not None
+            and time.monotonic() - wrote_at < self.read_your_writes_window
+        ):
+            self.primary_reads += 1
+            return None
+        self._next = (self._next + 1) % len(healthy)
+        self.replica_reads += 1
+        return healthy[self._next]
+
+    def mark_down(self, replica):
+        """take a replica out of rotation until the next check finds it healthy"""
+        replica.healthy = False
+        replica.failures += 1
+
+    async def check_all(self):
+        await asyncio.gather(
+            *(replica.check(self.max_lag) for replica in self.replicas)
+        )
+        cutoff = time.monotonic() - self.read_your_writes_window
+        self._writes = {
+            user: wrote_at
+            for user, wrote_at in self._writes.items()
+            if wrote_at > cutoff
+        }
+
+    async def _check_loop(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    def start(self):
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._check_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self):
+        return {
+            "replicas": [replica.stats() for replica in self.replicas],
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "recent_writers": len(self._writes),
+        }
+
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS, REPLICA_MAX_LAG, REPLICA_CHECK_INTERVAL)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session):
+    # sessions from get_async_db carry the caller, see read_replica
+    replicas.note_write(session.info.get("user_id"))
+
+
+async def get_async_db(request: Request):
+    """
+    function to return the async session for use by the routes
+    fastAPI automatically injects the get_async_db dependency into the routes which call it.
+    sessions are on the primary, commits by a signed in caller route
+    their reads to the primary for a while (see ReplicaSet)
+    """
+    async with AsyncSessionLocal() as db:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        user = decode_token(token) if scheme.lower() == "bearer" else None
+        db.info["user_id"] = user.user_id if user else None
+        await _acquire(db)
+        yield db
+
+
+async def read_replica(user: TokenUser = Depends(current_user)):
+    """dependency: the replica this GET reads from, None for the primary"""
+    return replicas.pick(user.user_id)
+
+
+async def _open_read_session(replica):
+    """
+    session on the replica, on the primary when there is none or
+    its connection fails (the replica is then marked down)
+    """
+    if replica is not None:
+        db = replica.sessionmaker()
+        try:
+            await db.connection()
+            return db
+        except Exception:
+            await db.close()
+            replicas.mark_down(replica)
+            logger.warning(
+                "read replica %s failed, reading from the primary", replica.engine.url
+            )
+    db = AsyncSessionLocal()
+    try:
+        await _acquire(db)
+    except Exception:
+        await db.close()
+        raise
+    return db
+
+
+async def get_read_db(replica: Optional[Replica] = Depends(read_replica)):
+    """
+    get_async_db for GET handlers that only read, the session is on a healthy
+    replica. declare it after the auth and versioned() dependencies
+    """
+    db = await _open_read_session(replica)
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
+
+
+async def gather_on_sessions(*queries, replica=None):
+    """
+    run each query(db) concurrently, each on its own session and connection
+    (one session cannot run two statements at once), results in query order.
+    pass replica (from the read_replica dependency) to read from it
+    """
+
+    async def run(query):
+        db = await _open_read_session(replica)
+        try:
+            return await query(db)
+        finally:
+            await db.close()
+
+    return await asyncio.gather(*(run(query) for query in queries))
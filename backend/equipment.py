@@ -0,0 +1,123 @@
+"""
+equipment availability over time. an item has quantity units, each reservation
+(booking_equipment row of a pending or approved booking) holds some of them for
+its event's window, and a maintenance log takes the whole item out for its
+day. the units free over [start, end) come from a sweep over the reservations
+and maintenance days overlapping it, which idx_booking_equipment_window finds
+without reading the item's past reservations.
+
+the reservation route reads with lock=True, the item's row stays locked until
+it commits, so concurrent reservations of one item are checked one after the
+other and cannot overbook it
+"""
+
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import text
+
+from backend.venue_index import _as_datetime
+
+ITEM = text(
+    """
+    SELECT equipment_id, equipment_name, type, status, quantity
+    FROM equipment WHERE equipment_id = :equipment_id
+    """
+)
+ITEM_FOR_UPDATE = text(
+    """
+    SELECT equipment_id, equipment_name, type, status, quantity
+    FROM equipment WHERE equipment_id = :equipment_id
+    FOR UPDATE
+    """
+)
+RESERVATIONS = text(
+    """
+    SELECT be.booking_id, be.quantity, be.start_time, be.end_time
+    FROM booking_equipment be
+    JOIN bookings b ON be.booking_id = b.booking_id
+    WHERE be.equipment_id = :equipment_id
+      AND be.end_time > :start AND be.start_time < :end
+      AND b.status <> 'Rejected'
+    """
+)
+# a log is for a whole day, it overlaps [start, end) from start's date on
+MAINTENANCE_DAYS = text(
+    """
+    SELECT log_date FROM maintenance_logs
+    WHERE equipment_id = :equipment_id
+      AND log_date >= :first_day AND log_date < :end
+    """
+)
+
+
+def usage_timeline(intervals, start, end):
+    """
+    [(from, to, units in use)] covering [start, end), neighbours differ in
+    units. a sweep over the (start, end, units) intervals clipped to the
+    window: +units where one starts, -units where one ends, so one ending
+    when the next starts never counts twice
+    """
+    deltas = Counter()
+    for lo, hi, units in intervals:
+        lo, hi = max(lo, start), min(hi, end)
+        if lo < hi:
+            deltas[lo] += units
+            deltas[hi] -= units
+    timeline = []
+
+    def piece(lo, hi, used):
+        if timeline and timeline[-1][2] == used:
+            timeline[-1] = (timeline[-1][0], hi, used)
+        else:
+            timeline.append((lo, hi, used))
+
+    used, at = 0, start
+    for point in sorted(deltas):
+        if point > at:
+            piece(at, point, used)
+            at = point
+        used += deltas[point]
+    if at < end:
+        piece(at, end, used)
+    return timeline
+
+
+def _day(value):
+    """drivers without a DATE type (sqlite) hand back strings"""
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+async def availability(db, equipment_id, start, end, exclude_booking=None, lock=False):
+    """
+    (item row, [(from, to, free units)] covering [start, end)), None if there
+    is no such item. an item under maintenance has no unit free. the
+    reservation of exclude_booking is left out (it is being changed), lock
+    keeps the item's row locked until the transaction ends
+    """
+    start, end = _as_datetime(start), _as_datetime(end)
+    item = (
+        await db.execute(
+            ITEM_FOR_UPDATE if lock else ITEM, {"equipment_id": equipment_id}
+        )
+    ).fetchone()
+    if item is None:
+        return None
+    if item.status == "Under Maintenance":
+        return item, [(start, end, 0)]
+
+    params = {"equipment_id": equipment_id, "start": start, "end": end}
+    intervals = [
+        (_as_datetime(row.start_time), _as_datetime(row.end_time), row.quantity)
+        for row in await db.execute(RESERVATIONS, params)
+        if row.booking_id != exclude_booking
+    ]
+    for row in await db.execute(
+        MAINTENANCE_DAYS, {**params, "first_day": start.date()}
+    ):
+        day = datetime.combine(_day(row.log_date), time.min)
+        intervals.append((day, day + timedelta(days=1), item.quantity))
+    return item, [
+        (lo, hi, max(item.quantity - used, 0))
+        for lo, hi, used in usage_timeline(intervals, start, end)
+    ]
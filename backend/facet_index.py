@@ -0,0 +1,356 @@
+"""
+filtered browsing of the upcoming events with facet counts, behind the student
+event browser. the upcoming events are counted per (club, has an approved
+venue) and per (club, category, has an approved venue), overall and for each
+day. the counts are kept up to date as events are created, get a venue
+approved and start, so the counts for any filter add up at most clubs x
+categories entries (per day of a date range) instead of running a GROUP BY over
+the events join.
+
+create_event and the approval routes update the index of their own worker, it
+is rebuilt every FACET_INDEX_REFRESH seconds to pick up the other workers'
+"""
+
+import asyncio
+import os
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import text
+
+from backend.venue_index import _as_datetime
+
+FACET_INDEX_REFRESH = float(os.getenv("FACET_INDEX_REFRESH", "60"))
+
+
+class FacetEvent:
+    __slots__ = ("start", "club_id", "category_ids", "has_venue")
+
+    def __init__(self, start, club_id, category_ids, has_venue):
+        self.start = start
+        self.club_id = club_id
+        self.category_ids = category_ids
+        self.has_venue = has_venue
+
+
+class FacetCounts:
+    """
+    events per (club_id, has_venue), and per (club_id, category_id,
+    has_venue) where an event counts once for each of its categories
+    """
+
+    __slots__ = ("events", "tagged")
+
+    def __init__(self):
+        self.events = Counter()
+        self.tagged = Counter()
+
+    def add(self, event, n):
+        keys = [(self.events, (event.club_id, event.has_venue))] + [
+            (self.tagged, (event.club_id, category_id, event.has_venue))
+            for category_id in event.category_ids
+        ]
+        for counter, key in keys:
+            counter[key] += n
+            if not counter[key]:
+                del counter[key]
+
+    def __bool__(self):
+        return bool(self.events)
+
+
+# what a fresh index built in a thread hands over to the live one
+INDEX_STATE = (
+    "events",
+    "upcoming",
+    "by_club",
+    "by_category",
+    "totals",
+    "days",
+    "day_keys",
+)
+
+
+class EventFacetIndex:
+    def __init__(self, refresh):
+        self.refresh = refresh
+        # upcoming events only, those that start are dropped by _expire()
+        self.events = {}
+        # (start, event_id) sorted, of every event, per club and per category
+        self.upcoming = []
+        self.by_club = {}
+        self.by_category = {}
+        self.totals = FacetCounts()
+        # FacetCounts per start date, and those dates sorted
+        self.days = {}
+        self.day_keys = []
+        self.clubs = {}
+        self.categories = {}
+        self.loaded_at = None
+        self._lock = asyncio.Lock()
+        # changes made while load() runs, applied to the fresh index too
+        self._replay = None
+
+    def _count(self, event, n):
+        self.totals.add(event, n)
+        day = event.start.date()
+        counts = self.days.get(day)
+        if counts is None:
+            counts = self.days[day] = FacetCounts()
+            insort(self.day_keys, day)
+        counts.add(event, n)
+        if not counts:
+            del self.days[day]
+            del self.day_keys[bisect_left(self.day_keys, day)]
+
+    def add_event(
+        self, event_id, start_time, club_id, category_ids=(), has_venue=False
+    ):
+        """index one event, skipped if already indexed or started"""
+        if self._replay is not None:
+            self._replay.append(
+                ("add_event", (event_id, start_time, club_id, category_ids, has_venue))
+            )
+        start = _as_datetime(start_time)
+        if event_id in self.events or start < datetime.now():
+            return
+        event = self.events[event_id] = FacetEvent(
+            start, club_id, tuple(category_ids), bool(has_venue)
+        )
+        key = (start, event_id)
+        insort(self.upcoming, key)
+        insort(self.by_club.setdefault(club_id, []), key)
+        for category_id in event.category_ids:
+            insort(self.by_category.setdefault(category_id, []), key)
+        self._count(event, 1)
+
+    def venue_approved(self, event_id):
+        """the event got an approved booking"""
+        if self._replay is not None:
+            self._replay.append(("venue_approved", (event_id,)))
+        event = self.events.get(event_id)
+        if event is not None and not event.has_venue:
+            self._count(event, -1)
+            event.has_venue = True
+            self._count(event, 1)
+
+    def _expire(self, now):
+        """drop the events that have started since the last call"""
+        i = bisect_left(self.upcoming, (now,))
+        if not i:
+            return
+        started = self.upcoming[:i]
+        del self.upcoming[:i]
+        lists = set()
+        for _, event_id in started:
+            event = self.events.pop(event_id)
+            self._count(event, -1)
+            lists.add(("club", event.club_id))
+            lists.update(("category", c) for c in event.category_ids)
+        for kind, key in lists:
+            keys = (self.by_club if kind == "club" else self.by_category)[key]
+            # sorted like upcoming, the started events are in front
+            del keys[: bisect_left(keys, (now,))]
+
+    def _build(self, events, categories):
+        """index events from scratch, off the event loop"""
+        now = datetime.now()
+        for row in events:
+            start = _as_datetime(row.start_time)
+            if start < now:
+                continue
+            event = self.events[row.event_id] = FacetEvent(
+                start,
+                row.club_id,
+                tuple(categories.get(row.event_id, ())),
+                bool(row.has_venue),
+            )
+            key = (start, row.event_id)
+            # appended, then sorted once at the end
+            self.upcoming.append(key)
+            self.by_club.setdefault(row.club_id, []).append(key)
+            for category_id in event.category_ids:
+                self.by_category.setdefault(category_id, []).append(key)
+            self._count(event, 1)
+        for keys in (
+            self.upcoming,
+            *self.by_club.values(),
+            *self.by_category.values(),
+        ):
+            keys.sort()
+
+    async def load(self, db):
+        """rebuild the index from the upcoming events"""
+        self._replay = []
+        try:
+            await self._rebuild(db)
+        finally:
+            self._replay = None
+        self.loaded_at = time.monotonic()
+
+    async def _rebuild(self, db):
+        clubs = await db.execute(text("SELECT club_id, club_name FROM clubs"))
+        names = await db.execute(
+            text("SELECT category_id, category_name FROM categories")
+        )
+        events = (
+            await db.execute(
+                text(
+                    """
+                    SELECT e.event_id, e.start_time, e.club_id,
+                           EXISTS (
+                               SELECT 1 FROM bookings b
+                               WHERE b.event_id = e.event_id AND b.status = 'Approved'
+                           ) AS has_venue
+                    FROM events e
+                    WHERE e.start_time >= NOW()
+                    """
+                )
+            )
+        ).fetchall()
+        categories = {}
+        for row in await db.execute(
+            text(
+                """
+                SELECT ec.event_id, ec.category_id
+                FROM event_categories ec
+                JOIN events e ON ec.event_id = e.event_id
+                WHERE e.start_time >= NOW()
+                """
+            )
+        ):
+            categories.setdefault(row.event_id, []).append(row.category_id)
+
+        fresh = EventFacetIndex(self.refresh)
+        await asyncio.to_thread(fresh._build, events, categories)
+        # events created or approved by this worker since the reads began
+        for method, args in self._replay:
+            getattr(fresh, method)(*args)
+        for name in INDEX_STATE:
+            setattr(self, name, getattr(fresh, name))
+        self.clubs = {row.club_id: row.club_name for row in clubs}
+        self.categories = {row.category_id: row.category_name for row in names}
+
+    async def ensure_loaded(self, db):
+        if (
+            self.loaded_at is not None
+            and time.monotonic() - self.loaded_at < self.refresh
+        ):
+            return
+        async with self._lock:
+            # another request may have reloaded while we waited
+            if (
+                self.loaded_at is None
+                or time.monotonic() - self.loaded_at >= self.refresh
+            ):
+                await self.load(db)
+
+    def _scopes(self, from_date, to_date):
+        """the FacetCounts covering the date range, all days if it is open"""
+        if from_date is None and to_date is None:
+            return [self.totals]
+        lo = 0 if from_date is None else bisect_left(self.day_keys, from_date)
+        hi = (
+            len(self.day_keys)
+            if to_date is None
+            else bisect_right(self.day_keys, to_date)
+        )
+        return [self.days[day] for day in self.day_keys[lo:hi]]
+
+    def facets(
+        self,
+        club_id=None,
+        category_id=None,
+        has_venue=False,
+        from_date=None,
+        to_date=None,
+    ):
+        """
+        (total, club counts, category counts) of the upcoming events passing
+        the filters. each facet is counted under the other filters only, so
+        it shows what picking another club or category would return
+        """
+        self._expire(datetime.now())
+        total = 0
+        clubs = Counter()
+        categories = Counter()
+        for counts in self._scopes(from_date, to_date):
+            if category_id is None:
+                for (club, venue), n in counts.events.items():
+                    if venue or not has_venue:
+                        clubs[club] += n
+                        if club_id is None or club == club_id:
+                            total += n
+            for (club, category, venue), n in counts.tagged.items():
+                if has_venue and not venue:
+                    continue
+                if club_id is None or club == club_id:
+                    categories[category] += n
+                if category == category_id:
+                    clubs[club] += n
+                    if club_id is None or club == club_id:
+                        total += n
+        return total, clubs, categories
+
+    def page(
+        self,
+        limit,
+        after=None,
+        club_id=None,
+        category_id=None,
+        has_venue=False,
+        from_date=None,
+        to_date=None,
+    ):
+        """
+        ids of up to limit upcoming events passing the filters in (start_time,
+        event_id) order, after the (start_time, event_id) key after. and the
+        key of the last one if more follow, None otherwise
+        """
+        self._expire(datetime.now())
+        # walk the shortest list the filters allow
+        source = self.upcoming
+        for keys in (
+            self.by_club.get(club_id, []) if club_id is not None else None,
+            self.by_category.get(category_id, []) if category_id is not None else None,
+        ):
+            if keys is not None and len(keys) < len(source):
+                source = keys
+        i = 0 if after is None else bisect_right(source, after)
+        if from_date is not None:
+            i = max(
+                i,
+                bisect_left(
+                    source, (datetime.combine(from_date, datetime.min.time()),)
+                ),
+            )
+        ids = []
+        last = None
+        for i in range(i, len(source)):
+            start, event_id = source[i]
+            if to_date is not None and start.date() > to_date:
+                break
+            event = self.events[event_id]
+            if (
+                (club_id is None or event.club_id == club_id)
+                and (category_id is None or category_id in event.category_ids)
+                and (event.has_venue or not has_venue)
+            ):
+                if len(ids) == limit:
+                    return ids, last
+                ids.append(event_id)
+                last = (start, event_id)
+        return ids, None
+
+    def stats(self):
+        return {
+            "events": len(self.events),
+            "days": len(self.day_keys),
+            "club_keys": len(self.totals.events),
+            "category_keys": len(self.totals.tagged),
+        }
+
+
+facet_index = EventFacetIndex(FACET_INDEX_REFRESH)
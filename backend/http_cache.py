@@ -0,0 +1,120 @@
+"""
+conditional GET support: every table the read endpoints depend on has a change
+counter that the routers bump after committing a write. a response's ETag is a
+hash of the counters of the tables it reads, so the versioned() dependency
+answers If-None-Match with 304 before a db connection is even checked out.
+the counters live in the cache backend, set CACHE_REDIS_URL when running
+several workers so a write in one is seen by all
+"""
+
+import hashlib
+import os
+import secrets
+import time
+
+from fastapi import Depends, HTTPException, Request
+from starlette.datastructures import MutableHeaders
+
+from backend.auth import TokenUser, current_user
+from backend.cache import CACHE_REDIS_URL, LocalBackend, RedisBackend
+
+# ETags also roll over every ETAG_WINDOW seconds, which bounds how long a
+# listing relative to NOW() or a row edited outside the api can be stale
+ETAG_WINDOW = int(os.getenv("ETAG_WINDOW", "60"))
+
+# browsers may keep the body but must revalidate it on every use,
+# private because the responses are per user
+CACHE_CONTROL = "private, no-cache"
+
+
+class TableVersions:
+    """change counter per table, kept in a cache backend"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or LocalBackend()
+        # local counters restart at 0, an epoch per process keeps ETags
+        # handed out by an earlier process (or another worker) from matching
+        self.epoch = (
+            secrets.token_hex(4) if isinstance(self.backend, LocalBackend) else ""
+        )
+        self.not_modified = 0
+
+    async def bump(self, *tables):
+        for table in tables:
+            await self.backend.bump(f"table:{table}")
+
+    async def etag(self, tables, *parts):
+        """weak ETag over the table versions, the time window and any extra parts"""
+        versions = await self.backend.generations([f"table:{t}" for t in tables])
+        raw = "|".join(
+            map(str, (self.epoch, int(time.time() // ETAG_WINDOW), *versions, *parts))
+        )
+        return f'W/"{hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()}"'
+
+
+table_versions = TableVersions(
+    RedisBackend(CACHE_REDIS_URL) if CACHE_REDIS_URL else None
+)
+
+
+def if_none_match(header, etag):
+    """does an If-None-Match header match etag (weak comparison)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag.removeprefix("W/") in tags
+
+
+def versioned(*tables):
+    """
+    dependency for cacheable GETs, listing every table the response reads:
+    _: None = versioned("events", ...), after the auth dependency and before
+    get_async_db. a matching If-None-Match raises 304 (starlette sends it
+    without a body), otherwise CacheHeadersMiddleware puts the ETag on the
+    response, handlers returning a Response of their own included
+    """
+
+    async def check(request: Request, user: TokenUser = Depends(current_user)):
+        etag = await table_versions.etag(
+            tables, user.user_id, user.role, request.url.path, request.url.query
+        )
+        headers = {
+            "ETag": etag,
+            "Cache-Control": CACHE_CONTROL,
+            "Vary": "Authorization",
+        }
+        if if_none_match(request.headers.get("if-none-match"), etag):
+            table_versions.not_modified += 1
+            raise HTTPException(status_code=304, headers=headers)
+        request.state.cache_headers = headers
+
+    return Depends(check)
+
+
+class CacheHeadersMiddleware:
+    """
+    adds the headers versioned() left in request.state to a 200 response.
+    an injected Response's headers are dropped when a handler returns its
+    own response (RowJSONResponse), so they are set here on the way out
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = scope.get("state", {}).get("cache_headers")
+                if headers:
+                    response_headers = MutableHeaders(scope=message)
+                    for name, value in headers.items():
+                        response_headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
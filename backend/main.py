@@ -3,13 +3,89 @@ collects all the routers (modular route groups)
 from separate files into app
 """
 
-from fastapi import FastAPI
+import logging
+import secrets
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
 
+from backend.cache import catalog_cache
+from backend.db import AsyncSessionLocal, engine, pool_stats, replicas
+from backend.facet_index import facet_index
+from backend.http_cache import CacheHeadersMiddleware, table_versions
+from backend.metrics import (
+    CONTENT_TYPE,
+    METRICS_ENABLED,
+    METRICS_TOKEN,
+    MetricsMiddleware,
+    header,
+    histogram_lines,
+    registry,
+    sample,
+)
+from backend.passwords import password_pool
+from backend.pubsub import hub
 from backend.routers import admin, club, student
+from backend.search_index import search_index
+from backend.venue_index import venue_index
+from backend.waitlist import promotion_worker, waitlist_index
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # brotli is optional, gzip is used without it
+    BrotliMiddleware = None
+
+# list responses smaller than this are not worth compressing
+COMPRESS_MIN_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    warm the in-memory indexes, if the db is asleep they load on first use,
+    and run the pub/sub hub's, read replica health check and waitlist
+    promotion background tasks
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            await venue_index.load(db)
+            await search_index.ensure_loaded(db)
+            await facet_index.ensure_loaded(db)
+            await waitlist_index.ensure_loaded(db)
+    except Exception:
+        logger.warning("in-memory indexes not loaded at startup", exc_info=True)
+    hub.start(AsyncSessionLocal)
+    replicas.start()
+    promotion_worker.start(AsyncSessionLocal)
+    yield
+    await promotion_worker.stop()
+    await replicas.stop()
+    await hub.stop()
+    password_pool.shutdown()
+
 
-app = FastAPI(title="evently: university event management api")
+app = FastAPI(title="evently: university event management api", lifespan=lifespan)
 
+# innermost, so the Vary it sets is merged with the compression middleware's
+app.add_middleware(CacheHeadersMiddleware)
+
+# brotli for clients that accept it (falls back to gzip itself), else gzip
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+
+# outside compression so the timings include it
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# added last so it is the outermost middleware and 304s get CORS headers too
 origins = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
@@ -35,3 +111,91 @@ app.include_router(admin.router)
 def root():
     """root endpoint"""
     return {"message": "db running on railway"}
+
+
+@registry.collector
+def _app_metrics():
+    """counters the other modules already keep, read at scrape time"""
+    wait = "evently_db_pool_wait_seconds"
+    return [
+        *sample(
+            "evently_db_pool_checked_out",
+            "gauge",
+            "pooled connections in use",
+            getattr(engine.pool, "checkedout", lambda: None)(),
+        ),
+        *sample(
+            "evently_db_pool_overflow",
+            "gauge",
+            "connections open beyond the pool size",
+            getattr(engine.pool, "overflow", lambda: None)(),
+        ),
+        *header(wait, "histogram", "time requests waited for a pooled connection"),
+        *histogram_lines(
+            wait, pool_stats.WAIT_BUCKETS, pool_stats.wait_counts, pool_stats.wait_total
+        ),
+        *sample(
+            "evently_db_connect_failures_total",
+            "counter",
+            "failed connection acquisitions",
+            pool_stats.connect_failures,
+        ),
+        *sample(
+            "evently_replica_reads_total",
+            "counter",
+            "GET reads routed to a read replica",
+            replicas.replica_reads,
+        ),
+        *sample(
+            "evently_replica_primary_reads_total",
+            "counter",
+            "GET reads routed to the primary (no healthy replica, or read-your-writes)",
+            replicas.primary_reads,
+        ),
+        *sample(
+            "evently_password_jobs_in_flight",
+            "gauge",
+            "bcrypt jobs queued or running",
+            password_pool.in_flight,
+        ),
+        *sample(
+            "evently_password_jobs_rejected_total",
+            "counter",
+            "logins turned away with 429",
+            password_pool.rejected,
+        ),
+        *sample(
+            "evently_catalog_cache_hits_total",
+            "counter",
+            "catalog cache hits",
+            catalog_cache.hits,
+        ),
+        *sample(
+            "evently_catalog_cache_misses_total",
+            "counter",
+            "catalog cache misses",
+            catalog_cache.misses,
+        ),
+        *sample(
+            "evently_http_not_modified_total",
+            "counter",
+            "conditional GETs answered with 304",
+            table_versions.not_modified,
+        ),
+        *sample(
+            "evently_sse_streams",
+            "gauge",
+            "open server-sent event streams",
+            hub.stats()["streams"],
+        ),
+    ]
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(authorization: Optional[str] = Header(None)):
+    """prometheus scrape endpoint, behind METRICS_TOKEN when it is set"""
+    if METRICS_TOKEN and not secrets.compare_digest(
+        authorization or "", f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,270 @@
+"""
+request, query, password and serialization timings exposed at /metrics in the
+prometheus text format, so a slow dashboard can be pinned on bcrypt, the pool
+wait, one sql statement or rendering the response.
+
+MetricsMiddleware times every request by route template and remembers the
+request scope in a context var, the cursor hooks of instrument_engine() use it
+to tag each statement with the handler (router function) that ran it.
+statements slower than SLOW_QUERY_MS are logged. with METRICS_ENABLED=false
+neither the middleware nor the hooks are installed
+"""
+
+import logging
+import os
+import re
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import lru_cache
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# optional bearer token prometheus has to send to scrape /metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"),
+)  # fmt: skip
+
+# scope of the request being served, set by MetricsMiddleware
+_request_scope = ContextVar("request_scope", default=None)
+
+
+def current_handler():
+    """name of the router function serving this request, "-" outside requests"""
+    scope = _request_scope.get()
+    endpoint = scope.get("endpoint") if scope else None
+    return getattr(endpoint, "__name__", "-")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _bound(bucket):
+    return "+Inf" if bucket == float("inf") else repr(bucket)
+
+
+def header(name, kind, help):
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+
+
+def sample(name, kind, help, value):
+    """lines of a single unlabelled counter or gauge, none if value is None"""
+    return [] if value is None else [*header(name, kind, help), f"{name} {value}"]
+
+
+def histogram_lines(name, buckets, counts, total, labels=(), label_values=()):
+    """one histogram series, counts per bucket (not cumulative) as recorded"""
+    lines, running = [], 0
+    for bucket, count in zip(buckets, counts):
+        running += count
+        le = _labels(labels, label_values, f'le="{_bound(bucket)}"')
+        lines.append(f"{name}_bucket{le} {running}")
+    suffix = _labels(labels, label_values)
+    lines.append(f"{name}_sum{suffix} {total}")
+    lines.append(f"{name}_count{suffix} {running}")
+    return lines
+
+
+class Histogram:
+    """cumulative-bucket histogram per label combination"""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * len(self.buckets), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        lines = header(self.name, "histogram", self.help)
+        for label_values, (counts, total) in sorted(self._series.items()):
+            lines += histogram_lines(
+                self.name, self.buckets, counts, total, self.labels, label_values
+            )
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series = {}
+
+    def inc(self, amount=1, *label_values):
+        self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self):
+        lines = header(self.name, "counter", self.help)
+        for label_values, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Registry:
+    """the metrics recorded here plus collectors reading other modules' counters"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """register fn returning exposition lines, called at scrape time"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collect in self._collectors:
+            lines += collect()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    "evently_http_request_duration_seconds",
+    "time to serve a request, by route template",
+    ("method", "route", "status"),
+)
+QUERY_LATENCY = registry.histogram(
+    "evently_db_query_duration_seconds",
+    "sql statement execution time, by router function and statement",
+    ("handler", "query"),
+)
+QUERY_ROWS = registry.counter(
+    "evently_db_query_rows_total",
+    "rows returned or affected (as the driver reports them)",
+    ("handler", "query"),
+)
+SLOW_QUERIES = registry.counter(
+    "evently_db_slow_queries_total",
+    "statements slower than SLOW_QUERY_MS",
+    ("handler", "query"),
+)
+PASSWORD_LATENCY = registry.histogram(
+    "evently_password_job_duration_seconds",
+    "bcrypt job time on the password pool, queueing included",
+    ("job",),
+)
+RENDER_LATENCY = registry.histogram(
+    "evently_response_render_duration_seconds",
+    "time to encode a RowJSONResponse body",
+    ("handler",),
+)
+
+TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+`?(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def query_label(statement):
+    """
+    low cardinality name of a statement: its verb and first table
+    ("SELECT events", "CALL sp_RegisterForEvent")
+    """
+    words = statement.split(None, 2)
+    if not words:
+        return "-"
+    verb = words[0].upper()
+    if verb == "CALL" and len(words) > 1:
+        return f"CALL {words[1].split('(')[0]}"
+    match = TABLE_RE.search(statement)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+def instrument_engine(engine):
+    """time every statement run through engine, tagged with the current handler"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        handler, query = current_handler(), query_label(statement)
+        QUERY_LATENCY.observe(elapsed, handler, query)
+        # -1 when the driver does not know (e.g. sqlite selects)
+        if cursor.rowcount >= 0:
+            QUERY_ROWS.inc(cursor.rowcount, handler, query)
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            SLOW_QUERIES.inc(1, handler, query)
+            logger.warning(
+                "slow query: %.0fms in %s, %s rows: %s",
+                elapsed * 1000,
+                handler,
+                cursor.rowcount,
+                " ".join(statement.split())[:500],
+            )
+
+
+class MetricsMiddleware:
+    """times each request, labelled by the route template it matched"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        token = _request_scope.set(scope)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_scope.reset(token)
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                # unmatched paths share one label instead of one each
+                getattr(route, "path", "unmatched"),
+                status,
+            )
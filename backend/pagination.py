@@ -0,0 +1,90 @@
+"""
+keyset (cursor) pagination helpers for listings ordered by (start_time, event_id)
+cursors are opaque to the client, they are just the sort key of the last row
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(start_time, event_id):
+    """pack the sort key of the last row on a page into an opaque token"""
+    if isinstance(start_time, datetime):
+        start_time = start_time.isoformat()
+    raw = json.dumps([str(start_time), event_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """inverse of encode_cursor, 400 for anything that was not issued by us"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        start_time, event_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(start_time), int(event_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail="invalid cursor") from e
+
+
+def keyset_fragment(descending=False):
+    """
+    sql (AND ...) continuing after :after_time / :after_id, written
+    as an expanded OR so mysql can use a range scan on the index
+    """
+    op = "<" if descending else ">"
+    return (
+        f"AND (e.start_time {op} :after_time "
+        f"OR (e.start_time = :after_time AND e.event_id {op} :after_id))"
+    )
+
+
+class PageParams:
+    """
+    query params shared by every paginated listing,
+    used as a dependency: page: PageParams = Depends()
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(
+            None, description="next_cursor of the previous page"
+        ),
+        limit: int = Query(DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.after = decode_cursor(cursor) if cursor else None
+
+    def params(self):
+        """
+        bind params of a page, :page_limit fetches one extra
+        event to tell whether a next page exists
+        """
+        params = {"page_limit": self.limit + 1}
+        if self.after is not None:
+            params.update(after_time=self.after[0], after_id=self.after[1])
+        return params
+
+    def statement(self, variants):
+        """pick the first-page or after-cursor variant of a keyset query"""
+        return variants[self.after is not None]
+
+    def split(self, rows):
+        """
+        rows were fetched for limit + 1 events (an event may span several
+        adjacent rows), trim the extra event and build the next cursor
+        """
+        events_seen = 0
+        for i, row in enumerate(rows):
+            if i == 0 or rows[i - 1].event_id != row.event_id:
+                if events_seen == self.limit:
+                    last = rows[i - 1]
+                    return rows[:i], encode_cursor(last.start_time, last.event_id)
+                events_seen += 1
+        return rows, None
@@ -0,0 +1,141 @@
+"""
+password hashing/verification on a dedicated process pool, so bcrypt's ~250ms
+of cpu per call neither blocks the event loop nor holds the GIL of the worker
+serving other endpoints. the number of queued + running jobs is bounded, past
+PASSWORD_QUEUE_LIMIT callers get a 429 instead of waiting behind the backlog
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from sqlalchemy import text
+
+from backend.metrics import PASSWORD_LATENCY
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(PASSWORD_WORKERS * 8)))
+# passwords per pool job in bulk hashing, small so logins queued behind an
+# import wait for one short job rather than the whole batch
+HASH_SLICE_SIZE = int(os.getenv("HASH_SLICE_SIZE", "8"))
+
+# password hashing context, hashes with fewer rounds than BCRYPT_ROUNDS
+# count as needing an update and are rehashed on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS
+)
+
+
+# these two run inside the pool processes
+def _hash(password):
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password, password_hash):
+    return pwd_context.verify_and_update(password, password_hash)
+
+
+def _hash_many(passwords, rounds):
+    context = pwd_context.copy(bcrypt__rounds=rounds)
+    return [context.hash(password) for password in passwords]
+
+
+class PasswordPool:
+    """process pool plus the count of jobs currently queued or running"""
+
+    def __init__(self, workers, queue_limit):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn, not fork: the parent holds an event loop and db sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="too many login attempts in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+            PASSWORD_LATENCY.observe(time.perf_counter() - start, fn.__name__[1:])
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordPool(PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT)
+
+
+async def hash_password(password):
+    return await password_pool.run(_hash, password)
+
+
+async def hash_passwords(passwords, rounds=BCRYPT_ROUNDS):
+    """
+    hashes of many passwords, in order. slices of HASH_SLICE_SIZE run on the
+    pool with at most one job per worker in flight, so logins keep getting
+    through, and wait for a login storm to pass rather than fail with 429.
+    hashes with fewer rounds than BCRYPT_ROUNDS are upgraded on login
+    """
+    slices = [
+        passwords[i : i + HASH_SLICE_SIZE]
+        for i in range(0, len(passwords), HASH_SLICE_SIZE)
+    ]
+    limit = asyncio.Semaphore(password_pool.workers)
+
+    async def run(passwords_slice):
+        async with limit:
+            while True:
+                try:
+                    return await password_pool.run(_hash_many, passwords_slice, rounds)
+                except HTTPException as e:
+                    # the pool is full of logins, let them go first
+                    if e.status_code != 429:
+                        raise
+                    await asyncio.sleep(1)
+
+    hashed = await asyncio.gather(*(run(s) for s in slices))
+    return [password_hash for part in hashed for password_hash in part]
+
+
+async def verify_password(password, password_hash):
+    """
+    returns (valid, new_hash), new_hash is set when the stored hash
+    was made with outdated parameters and should be replaced
+    """
+    return await password_pool.run(_verify_and_update, password, password_hash)
+
+
+async def save_rehash(db, user_id, new_hash):
+    """persist a hash upgraded by verify_password (rehash-on-login)"""
+    await db.execute(
+        text(
+            "UPDATE users SET password_hash = :password_hash WHERE user_id = :user_id"
+        ),
+        {"password_hash": new_hash, "user_id": user_id},
+    )
+    await db.commit()
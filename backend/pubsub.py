@@ -0,0 +1,224 @@
+"""
+pub/sub hub pushing incremental changes (booking approved/rejected, new pending
+booking, attendee counts) to dashboards over server-sent events, so they no
+longer have to reload and re-run the listing queries to notice them.
+
+topics are "admin" and "club:<club_id>". messages go through a pluggable
+broker: in-process by default, redis pub/sub (PUBSUB_REDIS_URL, defaulting to
+CACHE_REDIS_URL) so a change made on one worker reaches streams on every worker.
+registrations are coalesced: they only mark the event dirty and one query per
+PUBSUB_COALESCE_INTERVAL publishes the counts of all dirty events
+"""
+
+import asyncio
+import json
+import logging
+import os
+
+from sqlalchemy import bindparam, text
+
+from backend.cache import CACHE_REDIS_URL
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis is optional, only needed for the shared broker
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+PUBSUB_REDIS_URL = os.getenv("PUBSUB_REDIS_URL", CACHE_REDIS_URL)
+PUBSUB_COALESCE_INTERVAL = float(os.getenv("PUBSUB_COALESCE_INTERVAL", "1"))
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "100"))
+PUBSUB_CHANNEL = "evently:pubsub"
+# comment lines sent on idle streams so proxies keep them open
+SSE_HEARTBEAT = 15
+
+ADMIN_TOPIC = "admin"
+
+
+def club_topic(club_id):
+    return f"club:{club_id}"
+
+
+class LocalBroker:
+    """delivers straight to the streams of this process"""
+
+    async def publish(self, deliver, topic, message):
+        deliver(topic, message)
+
+    async def listen(self, deliver):
+        return
+
+
+class RedisBroker:
+    """
+    publishes to a redis channel every worker listens on,
+    each worker then delivers to its own streams
+    """
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("PUBSUB_REDIS_URL is set but redis is not installed")
+        self._client = redis.from_url(url)
+
+    async def publish(self, deliver, topic, message):
+        await self._client.publish(
+            PUBSUB_CHANNEL, json.dumps({"topic": topic, "message": message})
+        )
+
+    async def listen(self, deliver):
+        pubsub = self._client.pubsub()
+        await pubsub.subscribe(PUBSUB_CHANNEL)
+        async for item in pubsub.listen():
+            if item["type"] == "message":
+                data = json.loads(item["data"])
+                deliver(data["topic"], data["message"])
+
+
+class PubSubHub:
+    """
+    topic -> queues of the open streams. a stream that falls PUBSUB_QUEUE_SIZE
+    messages behind gets its queue replaced by a single resync message,
+    telling the client to reload instead of buffering without bound
+    """
+
+    def __init__(self, broker=None, coalesce_interval=1.0, queue_size=100):
+        self.broker = broker or LocalBroker()
+        self.coalesce_interval = coalesce_interval
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._dirty_events = set()
+        self._tasks = []
+        self.published = 0
+        self.resyncs = 0
+
+    def _deliver(self, topic, message):
+        for queue in self._subscribers.get(topic, ()):
+            if queue.full():
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+                self.resyncs += 1
+            else:
+                queue.put_nowait(message)
+
+    async def publish(self, topic, message):
+        """never raises, a push is best effort and must not fail the write"""
+        try:
+            await self.broker.publish(self._deliver, topic, message)
+            self.published += 1
+        except Exception:
+            logger.warning("publish to %s failed", topic, exc_info=True)
+
+    def subscribe(self, *topics):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        for topic in topics:
+            self._subscribers.setdefault(topic, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        for topic in list(self._subscribers):
+            self._subscribers[topic].discard(queue)
+            if not self._subscribers[topic]:
+                del self._subscribers[topic]
+
+    async def stream(self, request, *topics):
+        """server-sent events body: one data line of json per message"""
+        queue = self.subscribe(*topics)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(message)}\n\n"
+        finally:
+            self.unsubscribe(queue)
+
+    def attendees_changed(self, event_id):
+        """coalesced, the count goes out with the next flush"""
+        self._dirty_events.add(event_id)
+
+    async def flush_attendee_counts(self, db):
+        """one query for every event touched since the last flush"""
+        if not self._dirty_events:
+            return
+        event_ids, self._dirty_events = list(self._dirty_events), set()
+        rows = (
+            await db.execute(
+                text(
+                    """
+                    SELECT e.event_id, e.club_id, s.capacity,
+                           COUNT(a.user_id) AS attendee_count
+                    FROM events e
+                    LEFT JOIN attendees a ON a.event_id = e.event_id
+                    LEFT JOIN event_seats s ON s.event_id = e.event_id
+                    WHERE e.event_id IN :event_ids
+                    GROUP BY e.event_id, e.club_id, s.capacity
+                    """
+                ).bindparams(bindparam("event_ids", expanding=True)),
+                {"event_ids": event_ids},
+            )
+        ).fetchall()
+        for row in rows:
+            await self.publish(
+                club_topic(row.club_id),
+                {
+                    "type": "attendee_count",
+                    "event_id": row.event_id,
+                    "attendee_count": row.attendee_count,
+                    "capacity": row.capacity,
+                },
+            )
+
+    async def _flush_loop(self, session_factory):
+        while True:
+            await asyncio.sleep(self.coalesce_interval)
+            try:
+                async with session_factory() as db:
+                    await self.flush_attendee_counts(db)
+            except Exception:
+                logger.warning("attendee count flush failed", exc_info=True)
+
+    async def _listen_loop(self):
+        while True:
+            try:
+                await self.broker.listen(self._deliver)
+                return
+            except Exception:
+                logger.warning("pubsub listener failed, retrying", exc_info=True)
+                await asyncio.sleep(1)
+
+    def start(self, session_factory):
+        self._tasks = [
+            asyncio.create_task(self._listen_loop()),
+            asyncio.create_task(self._flush_loop(session_factory)),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self):
+        return {
+            "broker": type(self.broker).__name__,
+            "streams": len(
+                {id(q) for queues in self._subscribers.values() for q in queues}
+            ),
+            "published": self.published,
+            "resyncs": self.resyncs,
+            "pending_attendee_counts": len(self._dirty_events),
+        }
+
+
+hub = PubSubHub(
+    RedisBroker(PUBSUB_REDIS_URL) if PUBSUB_REDIS_URL else None,
+    coalesce_interval=PUBSUB_COALESCE_INTERVAL,
+    queue_size=PUBSUB_QUEUE_SIZE,
+)
@@ -0,0 +1,256 @@
+"""
+the read queries behind the listing and dashboard endpoints, built once at
+import instead of on every request. each one declares its result columns and
+their types, so rows come back already converted (datetimes parsed,
+is_available as a bool) and can go straight to RowJSONResponse.
+
+keyset paginated listings come as {False: first page, True: after a cursor},
+pick one with PageParams.statement(). writes and stored procedure calls stay
+inline in the routers, they are one-off and have no rows to serialize
+"""
+
+from sqlalchemy import Boolean, DateTime, Integer, String, bindparam, text
+
+from backend.pagination import keyset_fragment
+
+
+def keyset_variants(sql, descending=False, **columns):
+    """the two variants of a keyset query, sql has a {keyset} placeholder"""
+    return {
+        after: text(
+            sql.format(keyset=keyset_fragment(descending) if after else "")
+        ).columns(**columns)
+        for after in (False, True)
+    }
+
+
+# columns of an event row in the student listings
+STUDENT_EVENT_COLUMNS = dict(
+    event_id=Integer,
+    event_name=String,
+    description=String,
+    start_time=DateTime,
+    end_time=DateTime,
+    club_name=String,
+    venue_name=String,
+    venue_location=String,
+)
+
+# the page is cut in the derived table so the joins only run for the rows returned
+UPCOMING_EVENTS = keyset_variants(
+    """
+    SELECT e.event_id, e.event_name, e.description, e.start_time, e.end_time,
+           c.club_name, v.venue_name, v.location AS venue_location
+    FROM (
+        SELECT e.event_id, e.event_name, e.description, e.start_time, e.end_time, e.club_id
+        FROM events e
+        WHERE e.start_time >= NOW() {keyset}
+        ORDER BY e.start_time ASC, e.event_id ASC
+        LIMIT :page_limit
+    ) e JOIN clubs c ON e.club_id = c.club_id
+    LEFT JOIN bookings b ON e.event_id = b.event_id AND b.status = 'Approved'
+    LEFT JOIN venues v ON b.venue_id = v.venue_id
+    ORDER BY e.start_time ASC, e.event_id ASC
+    """,
+    **STUDENT_EVENT_COLUMNS,
+)
+
+REGISTRATIONS = keyset_variants(
+    """
+    SELECT e.event_id, e.event_name, e.description, e.start_time, e.end_time,
+           c.club_name, v.venue_name, v.location AS venue_location
+    FROM (
+        SELECT e.event_id, e.event_name, e.description, e.start_time, e.end_time, e.club_id
+        FROM attendees a
+        JOIN events e ON a.event_id = e.event_id
+        WHERE a.user_id = :student_id {keyset}
+        ORDER BY e.start_time ASC, e.event_id ASC
+        LIMIT :page_limit
+    ) e
+    JOIN clubs c ON e.club_id = c.club_id
+    LEFT JOIN bookings b ON e.event_id = b.event_id AND b.status = 'Approved'
+    LEFT JOIN venues v ON b.venue_id = v.venue_id
+    ORDER BY e.start_time ASC, e.event_id ASC
+    """,
+    **STUDENT_EVENT_COLUMNS,
+)
+
+REGISTERED_UPCOMING_IDS = text(
+    """
+    SELECT a.event_id
+    FROM attendees a
+    JOIN events e ON a.event_id = e.event_id
+    WHERE a.user_id = :student_id AND e.start_time >= NOW()
+    """
+).columns(event_id=Integer)
+
+# the events the student waits for, through uq_event_waitlist_user;
+# places in the queue come from backend.waitlist, by ticket
+WAITLIST_ENTRIES = text(
+    """
+    SELECT w.event_id, w.ticket, w.joined_at, e.event_name, e.start_time,
+           e.end_time, c.club_name
+    FROM event_waitlist w
+    JOIN events e ON w.event_id = e.event_id
+    JOIN clubs c ON e.club_id = c.club_id
+    WHERE w.user_id = :student_id
+    ORDER BY e.start_time ASC, e.event_id ASC
+    """
+).columns(
+    event_id=Integer,
+    ticket=Integer,
+    joined_at=DateTime,
+    event_name=String,
+    start_time=DateTime,
+    end_time=DateTime,
+    club_name=String,
+)
+
+# display rows of events picked in memory (search, browse), in no particular order
+SEARCH_RESULTS = (
+    text(
+        """
+    SELECT e.event_id, e.event_name, e.description, e.start_time, e.end_time,
+           c.club_name, v.venue_name, v.location AS venue_location
+    FROM events e
+    JOIN clubs c ON e.club_id = c.club_id
+    LEFT JOIN bookings b ON e.event_id = b.event_id AND b.status = 'Approved'
+    LEFT JOIN venues v ON b.venue_id = v.venue_id
+    WHERE e.event_id IN :event_ids
+    """
+    )
+    .bindparams(bindparam("event_ids", expanding=True))
+    .columns(**STUDENT_EVENT_COLUMNS)
+)
+
+CLUB_EVENTS = keyset_variants(
+    """
+    SELECT
+        e.event_id, e.event_name, e.description, e.start_time, e.end_time,
+        b.booking_id, v.venue_name, b.status AS booking_status,
+        COUNT(a.user_id) AS attendee_count
+    FROM (
+        SELECT e.event_id, e.event_name, e.description, e.start_time, e.end_time
+        FROM events e
+        WHERE e.club_id = :club_id {keyset}
+        ORDER BY e.start_time DESC, e.event_id DESC
+        LIMIT :page_limit
+    ) e
+    LEFT JOIN bookings b ON e.event_id = b.event_id
+    LEFT JOIN venues v ON b.venue_id = v.venue_id
+    LEFT JOIN attendees a ON a.event_id = e.event_id
+    GROUP BY
+        e.event_id, e.event_name, e.description, e.start_time, e.end_time,
+        b.booking_id, v.venue_name, b.status
+    ORDER BY e.start_time DESC, e.event_id DESC, b.booking_id
+    """,
+    descending=True,
+    event_id=Integer,
+    event_name=String,
+    description=String,
+    start_time=DateTime,
+    end_time=DateTime,
+    booking_id=Integer,
+    venue_name=String,
+    booking_status=String,
+    attendee_count=Integer,
+)
+
+ALL_VENUES = text(
+    "SELECT venue_id, venue_name, location, capacity FROM venues ORDER BY venue_name"
+).columns(venue_id=Integer, venue_name=String, location=String, capacity=Integer)
+
+ALL_EQUIPMENT = text(
+    """
+    SELECT equipment_id, equipment_name, type, status, quantity
+    FROM equipment ORDER BY equipment_name
+    """
+).columns(
+    equipment_id=Integer,
+    equipment_name=String,
+    type=String,
+    status=String,
+    quantity=Integer,
+)
+
+ALL_CATEGORIES = text(
+    "SELECT category_id, category_name FROM categories ORDER BY category_name"
+).columns(category_id=Integer, category_name=String)
+
+UNBOOKED_EVENTS = text(
+    """
+    SELECT e.event_id, e.event_name, e.start_time, e.end_time
+    FROM events e
+    LEFT JOIN bookings b ON e.event_id = b.event_id
+    WHERE e.club_id = :club_id
+      AND (b.booking_id IS NULL OR b.status = 'Rejected')
+    ORDER BY e.start_time DESC
+    """
+).columns(event_id=Integer, event_name=String, start_time=DateTime, end_time=DateTime)
+
+PENDING_BOOKINGS = text(
+    """
+    SELECT
+        b.booking_id,
+        e.event_name, e.start_time, e.end_time,
+        v.venue_name, v.capacity,
+        c.club_name,
+        u.first_name AS requested_by_name,
+        COUNT(ap.booking_id) = 0 AS is_available
+    FROM bookings b
+    JOIN events e ON b.event_id = e.event_id
+    JOIN venues v ON b.venue_id = v.venue_id
+    JOIN clubs c ON e.club_id = c.club_id
+    JOIN users u ON b.requested_by = u.user_id
+    -- approved bookings on the same venue that overlap this slot,
+    -- same rule as fn_CheckVenueAvailability but as one join
+    LEFT JOIN (
+        SELECT ab.booking_id, ab.venue_id, ae.start_time, ae.end_time
+        FROM bookings ab
+        JOIN events ae ON ab.event_id = ae.event_id
+        WHERE ab.status = 'Approved'
+    ) ap ON ap.venue_id = b.venue_id
+        AND e.start_time < ap.end_time AND e.end_time > ap.start_time
+    WHERE b.status = 'Pending'
+    GROUP BY
+        b.booking_id, e.event_name, e.start_time, e.end_time,
+        v.venue_name, v.capacity, c.club_name, u.first_name,
+        b.request_timestamp
+    ORDER BY b.request_timestamp ASC
+    """
+).columns(
+    booking_id=Integer,
+    event_name=String,
+    start_time=DateTime,
+    end_time=DateTime,
+    venue_name=String,
+    capacity=Integer,
+    club_name=String,
+    requested_by_name=String,
+    is_available=Boolean,
+)
+
+RECENT_AUDIT_LOG = text(
+    """
+    SELECT log_id, log_timestamp, action_type, details
+    FROM audit_log
+    ORDER BY log_timestamp DESC
+    LIMIT 50
+    """
+).columns(log_id=Integer, log_timestamp=DateTime, action_type=String, details=String)
+
+# every statement above by name, scripts/check_explain.py EXPLAINs them all
+REGISTRY = {
+    "upcoming_events": UPCOMING_EVENTS,
+    "registrations": REGISTRATIONS,
+    "registered_upcoming_ids": REGISTERED_UPCOMING_IDS,
+    "waitlist_entries": WAITLIST_ENTRIES,
+    "search_results": SEARCH_RESULTS,
+    "club_events": CLUB_EVENTS,
+    "all_venues": ALL_VENUES,
+    "all_categories": ALL_CATEGORIES,
+    "all_equipment": ALL_EQUIPMENT,
+    "unbooked_events": UNBOOKED_EVENTS,
+    "pending_bookings": PENDING_BOOKINGS,
+    "recent_audit_log": RECENT_AUDIT_LOG,
+}
@@ -3,55 +3,103 @@ endpoints for admin facing actions
 handles login, booking approval, and system overview
 """
 
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, Depends, HTTPException, Path, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.db import get_db
-from backend.routers.student import StudentLogin, pwd_context
+from backend import queries
+from backend.auth import (
+    ADMIN,
+    TokenUser,
+    current_admin,
+    issue_token,
+    require_role,
+    stream_user,
+)
+from backend.bulk_import import ImportFormat, StudentImport
+from backend.cache import catalog_cache
+from backend.db import (
+    Replica,
+    engine,
+    gather_on_sessions,
+    get_async_db,
+    get_read_db,
+    pool_stats,
+    read_replica,
+    replicas,
+)
+from backend.export import ExportFormat, export_response
+from backend.facet_index import facet_index
+from backend.http_cache import table_versions, versioned
+from backend.passwords import save_rehash, verify_password
+from backend.pubsub import ADMIN_TOPIC, club_topic, hub
+from backend.schemas import StudentLogin
+from backend.seats import sold_out
+from backend.serialization import RowJSONResponse
+from backend.singleflight import fetch_all, reads
+from backend.venue_index import VenueSlots, venue_index
+from backend.waitlist import promotion_worker
 
 
 class AdminLogin(StudentLogin):
     pass
 
 
+class BulkApproveRequest(BaseModel):
+    """either explicit booking ids, or every pending booking"""
+
+    booking_ids: List[int] = []
+    all_pending: bool = False
+
+
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
+# every admin route but /login, declared on the route so it runs before get_async_db
+admin_only = [Depends(require_role(ADMIN))]
+
 
 @router.post("/login")
-def login_admin(login_data: AdminLogin, db: Session = Depends(get_db)):
+async def login_admin(login_data: AdminLogin, db: AsyncSession = Depends(get_async_db)):
     """
     verify admin's creds and role
     """
     try:
-        user = db.execute(
-            text(
-                """
+        user = (
+            await db.execute(
+                text(
+                    """
                 SELECT u.user_id, u.first_name, u.password_hash, r.role_name
                 FROM users u
                 JOIN roles r ON u.role_id = r.role_id
                 WHERE u.email = :email;
                 """
-            ),
-            {"email": login_data.email},
+                ),
+                {"email": login_data.email},
+            )
         ).fetchone()
 
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        if not pwd_context.verify(login_data.password, user.password_hash):
+        valid, new_hash = await verify_password(login_data.password, user.password_hash)
+        if not valid:
             raise HTTPException(status_code=401, detail="Invalid password")
 
         if user.role_name.lower() != "admin":
             raise HTTPException(status_code=403, detail="User is not an Admin")
 
+        if new_hash:
+            await save_rehash(db, user.user_id, new_hash)
+
         return {
             "message": f"Welcome, {user.first_name}!",
             "user_id": user.user_id,
             "role": user.role_name,
+            "token": issue_token(user.user_id, ADMIN),
         }
     except HTTPException:
         raise
@@ -59,52 +107,87 @@ def login_admin(login_data: AdminLogin, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
 
 
-@router.get("/bookings/pending")
-def get_pending_bookings(db: Session = Depends(get_db)):
+async def _pending_bookings(db):
+    return await fetch_all(db, queries.PENDING_BOOKINGS)
+
+
+@router.get(
+    "/bookings/pending",
+    dependencies=[
+        *admin_only,
+        versioned("bookings", "events", "venues", "clubs", "users"),
+    ],
+)
+async def get_pending_bookings(db: AsyncSession = Depends(get_read_db)):
     """
     Get a list of all pending venue bookings for admin review.
     """
     try:
-        pending = db.execute(
+        return RowJSONResponse(await _pending_bookings(db))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
+
+
+async def _publish_booking_status(booking_id, event_id, club_id, status):
+    """push a decided booking to its club's dashboard and to admin dashboards"""
+    message = {
+        "type": "booking_status",
+        "booking_id": booking_id,
+        "event_id": event_id,
+        "status": status,
+    }
+    await hub.publish(club_topic(club_id), message)
+    await hub.publish(ADMIN_TOPIC, message)
+
+
+async def _lock_venues(db, venue_ids):
+    """
+    lock the venues' rows until commit. every approval takes them first, in
+    venue_id order, so approvals touching the same venue run one at a time
+    and never both pass the overlap check
+    """
+    if venue_ids:
+        await db.execute(
             text(
                 """
-                SELECT 
-                    b.booking_id, 
-                    e.event_name, e.start_time, e.end_time,
-                    v.venue_name, v.capacity,
-                    c.club_name,
-                    u.first_name AS requested_by_name,
-                    fn_CheckVenueAvailability(v.venue_id, e.start_time, e.end_time) AS is_available
-                FROM bookings b
-                JOIN events e ON b.event_id = e.event_id
-                JOIN venues v ON b.venue_id = v.venue_id
-                JOIN clubs c ON e.club_id = c.club_id
-                JOIN users u ON b.requested_by = u.user_id
-                WHERE b.status = 'Pending'
-                ORDER BY b.request_timestamp ASC;
+                SELECT venue_id FROM venues
+                WHERE venue_id IN :venue_ids
+                ORDER BY venue_id
+                FOR UPDATE
                 """
-            )
-        ).fetchall()
-
-        pending_list = [dict(row._mapping) for row in pending]
-        return pending_list
-
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
+            ).bindparams(bindparam("venue_ids", expanding=True)),
+            {"venue_ids": sorted(venue_ids)},
+        )
 
 
-@router.post("/bookings/{booking_id}/approve")
-def approve_booking(booking_id: int = Path(..., gt=0), db: Session = Depends(get_db)):
+@router.post("/bookings/{booking_id}/approve", dependencies=admin_only)
+async def approve_booking(
+    booking_id: int = Path(..., gt=0), db: AsyncSession = Depends(get_async_db)
+):
     """
     Approve a pending booking using the stored procedure.
     This will auto-reject if there is a conflict.
     """
     try:
-        result = db.execute(
-            text("CALL sp_ApproveBooking(:b_id)"), {"b_id": booking_id}
+        venue = (
+            await db.execute(
+                text("SELECT venue_id FROM bookings WHERE booking_id = :b_id"),
+                {"b_id": booking_id},
+            )
+        ).fetchone()
+        # the same venue lock as bulk approve, held through the procedure
+        await _lock_venues(db, [venue.venue_id] if venue else [])
+        result = (
+            await db.execute(
+                text("CALL sp_ApproveBooking(:b_id)"), {"b_id": booking_id}
+            )
         ).fetchone()
 
-        db.commit()
+        await db.commit()
+        await catalog_cache.invalidate()
+        await table_versions.bump("bookings")
+        # an approval can change an event's capacity
+        sold_out.clear()
 
         if not result:
             raise HTTPException(
@@ -114,46 +197,424 @@ def approve_booking(booking_id: int = Path(..., gt=0), db: Session = Depends(get
         if "Error" in result.message:
             raise HTTPException(status_code=400, detail=result.message)
 
-        if "rejected" in result.message.lower():
-            return {"message": result.message, "status": "Rejected"}
+        status = "Rejected" if "rejected" in result.message.lower() else "Approved"
+        slot = (
+            await db.execute(
+                text(
+                    """
+                    SELECT b.venue_id, b.event_id, e.club_id, e.start_time, e.end_time
+                    FROM bookings b
+                    JOIN events e ON b.event_id = e.event_id
+                    WHERE b.booking_id = :b_id
+                    """
+                ),
+                {"b_id": booking_id},
+            )
+        ).fetchone()
+        if slot:
+            if status == "Approved":
+                # keep the venue availability index in step with the new slot
+                venue_index.add_booking(
+                    booking_id, slot.venue_id, slot.start_time, slot.end_time
+                )
+                facet_index.venue_approved(slot.event_id)
+                # a bigger venue frees seats for the waitlist
+                promotion_worker.nudge(slot.event_id)
+            await _publish_booking_status(
+                booking_id, slot.event_id, slot.club_id, status
+            )
+
+        return {"message": result.message, "status": status}
+
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
+
+
+@router.post("/bookings/bulk_approve", dependencies=admin_only)
+async def bulk_approve_bookings(
+    request: BulkApproveRequest, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Approve many pending bookings in one transaction.
+    Conflicts are settled first-come by request_timestamp with the same
+    overlap rule as fn_CheckVenueAvailability: a booking that overlaps an
+    approved slot (existing, or approved earlier in this batch) is rejected.
+    The venues involved stay locked until commit, like in the single approve.
+    A pending booking filed on another venue meanwhile is left pending.
+    """
+    if not request.all_pending and not request.booking_ids:
+        raise HTTPException(status_code=400, detail="No bookings given")
+    try:
+        where = (
+            "b.status = 'Pending'" if request.all_pending else "b.booking_id IN :ids"
+        )
+        venues_stmt = text(f"SELECT DISTINCT b.venue_id FROM bookings b WHERE {where}")
+        stmt = text(
+            f"""
+            SELECT b.booking_id, b.venue_id, b.event_id, b.status,
+                   e.club_id, e.start_time, e.end_time
+            FROM bookings b
+            JOIN events e ON b.event_id = e.event_id
+            WHERE {where}
+            ORDER BY b.request_timestamp ASC, b.booking_id ASC
+            FOR UPDATE
+            """
+        )
+        params = {}
+        if not request.all_pending:
+            venues_stmt = venues_stmt.bindparams(bindparam("ids", expanding=True))
+            stmt = stmt.bindparams(bindparam("ids", expanding=True))
+            params = {"ids": request.booking_ids}
+        # venues first, as the single approve does, then the candidates.
+        # no venue is locked after that, it would be the opposite order
+        venue_ids = {row.venue_id for row in await db.execute(venues_stmt, params)}
+        await _lock_venues(db, venue_ids)
+        candidates = (await db.execute(stmt, params)).fetchall()
+
+        slots = {venue_id: VenueSlots() for venue_id in venue_ids}
+        if venue_ids:
+            approved = (
+                await db.execute(
+                    text(
+                        """
+                        SELECT b.booking_id, b.venue_id, e.start_time, e.end_time
+                        FROM bookings b
+                        JOIN events e ON b.event_id = e.event_id
+                        WHERE b.status = 'Approved' AND b.venue_id IN :venue_ids
+                        """
+                    ).bindparams(bindparam("venue_ids", expanding=True)),
+                    {"venue_ids": list(venue_ids)},
+                )
+            ).fetchall()
+            for row in approved:
+                slots[row.venue_id].add(row.start_time, row.end_time, row.booking_id)
 
-        return {"message": result.message, "status": "Approved"}
+        # one pass in request order, each approval blocks later overlaps
+        results, to_approve, to_reject = {}, [], []
+        for row in candidates:
+            if row.status != "Pending":
+                results[row.booking_id] = (
+                    row.status,
+                    "Booking is not in Pending status.",
+                )
+            elif row.venue_id not in slots:
+                # filed since the venues were read, on a venue not locked
+                results[row.booking_id] = (
+                    "Pending",
+                    "Booking left pending: filed during the approval, try again.",
+                )
+            elif slots[row.venue_id].overlaps(row.start_time, row.end_time):
+                to_reject.append(row.booking_id)
+                results[row.booking_id] = (
+                    "Rejected",
+                    "Booking rejected: Venue conflict detected.",
+                )
+            else:
+                slots[row.venue_id].add(row.start_time, row.end_time, row.booking_id)
+                to_approve.append(row.booking_id)
+                results[row.booking_id] = (
+                    "Approved",
+                    "Booking approved successfully.",
+                )
 
+        for status, ids in (("Approved", to_approve), ("Rejected", to_reject)):
+            if ids:
+                await db.execute(
+                    text(
+                        "UPDATE bookings SET status = :status WHERE booking_id IN :ids"
+                    ).bindparams(bindparam("ids", expanding=True)),
+                    {"status": status, "ids": ids},
+                )
+        if to_approve:
+            # same seat counter upsert as sp_ApproveBooking
+            await db.execute(
+                text(
+                    """
+                    INSERT INTO event_seats (event_id, capacity, seats_taken)
+                    SELECT b.event_id, v.capacity,
+                           (SELECT COUNT(*) FROM attendees a WHERE a.event_id = b.event_id)
+                    FROM bookings b
+                    JOIN venues v ON b.venue_id = v.venue_id
+                    WHERE b.booking_id IN :ids
+                    ON DUPLICATE KEY UPDATE capacity = VALUES(capacity)
+                    """
+                ).bindparams(bindparam("ids", expanding=True)),
+                {"ids": to_approve},
+            )
+        await db.commit()
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
 
+    await catalog_cache.invalidate()
+    await table_versions.bump("bookings")
+    sold_out.clear()
+    for row in candidates:
+        if row.booking_id in to_approve:
+            venue_index.add_booking(
+                row.booking_id, row.venue_id, row.start_time, row.end_time
+            )
+            facet_index.venue_approved(row.event_id)
+            promotion_worker.nudge(row.event_id)
+            await _publish_booking_status(
+                row.booking_id, row.event_id, row.club_id, "Approved"
+            )
+        elif row.booking_id in to_reject:
+            await _publish_booking_status(
+                row.booking_id, row.event_id, row.club_id, "Rejected"
+            )
+
+    requested = (
+        [row.booking_id for row in candidates]
+        if request.all_pending
+        else request.booking_ids
+    )
+    not_found = ("NotFound", "Booking not found.")
+    return {
+        "approved": len(to_approve),
+        "rejected": len(to_reject),
+        "results": [
+            {
+                "booking_id": booking_id,
+                "status": results.get(booking_id, not_found)[0],
+                "message": results.get(booking_id, not_found)[1],
+            }
+            for booking_id in requested
+        ],
+    }
 
-@router.post("/bookings/{booking_id}/reject")
-def reject_booking(booking_id: int = Path(..., gt=0), db: Session = Depends(get_db)):
+
+@router.post("/bookings/{booking_id}/reject", dependencies=admin_only)
+async def reject_booking(
+    booking_id: int = Path(..., gt=0), db: AsyncSession = Depends(get_async_db)
+):
     """
     Manually reject a pending booking.
     """
     try:
-        db.execute(
+        result = await db.execute(
             text(
                 "UPDATE bookings SET status = 'Rejected' WHERE booking_id = :b_id AND status = 'Pending'"
             ),
             {"b_id": booking_id},
         )
-        db.commit()
+        booking = (
+            await db.execute(
+                text(
+                    """
+                    SELECT b.event_id, e.club_id
+                    FROM bookings b
+                    JOIN events e ON b.event_id = e.event_id
+                    WHERE b.booking_id = :b_id
+                    """
+                ),
+                {"b_id": booking_id},
+            )
+        ).fetchone()
+        await db.commit()
+        await catalog_cache.invalidate()
+        await table_versions.bump("bookings")
+        # only pending bookings are rejected here, their slots were never in
+        # the venue index, so it is left alone
+        if booking and result.rowcount:
+            await _publish_booking_status(
+                booking_id, booking.event_id, booking.club_id, "Rejected"
+            )
         return {"message": "Booking manually rejected", "status": "Rejected"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
 
 
-@router.get("/audit_log")
-def get_audit_log(db: Session = Depends(get_db)):
+async def _recent_audit_log(db):
+    return await fetch_all(db, queries.RECENT_AUDIT_LOG)
+
+
+@router.get("/audit_log", dependencies=[*admin_only, versioned("audit_log")])
+async def get_audit_log(db: AsyncSession = Depends(get_read_db)):
     """
     Get the 50 most recent audit log entries.
     """
     try:
-        logs = db.execute(
-            text("SELECT * FROM audit_log ORDER BY log_timestamp DESC LIMIT 50")
-        ).fetchall()
+        return RowJSONResponse(await _recent_audit_log(db))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
+
 
-        log_list = [dict(row._mapping) for row in logs]
-        return log_list
+@router.get("/{admin_id}/dashboard")
+async def get_admin_dashboard(
+    user: TokenUser = Depends(current_admin),
+    _: None = versioned("bookings", "events", "venues", "clubs", "users", "audit_log"),
+    replica: Optional[Replica] = Depends(read_replica),
+):
+    """
+    Pending bookings and the recent audit log in one round trip,
+    the two queries run concurrently on separate connections.
+    """
+    try:
+        pending, audit_log = await gather_on_sessions(
+            _pending_bookings, _recent_audit_log, replica=replica
+        )
+        return RowJSONResponse({"pending_bookings": pending, "audit_log": audit_log})
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
+
+
+@router.post("/students/import", dependencies=admin_only)
+async def import_students(
+    request: Request,
+    fmt: str = ImportFormat,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Bulk student signup from a CSV (header row with the signup field names)
+    or NDJSON file sent as the request body, read as it streams in.
+    Invalid records are skipped and reported with their line number.
+    """
+    students = StudentImport(db)
+    try:
+        return await students.run(request.stream(), fmt)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
+    finally:
+        if students.imported:
+            # trg_LogUserCreation writes the audit log
+            await table_versions.bump("users", "audit_log")
+
+
+@router.get("/audit_log/export", dependencies=admin_only)
+async def export_audit_log(
+    fmt: str = ExportFormat, replica: Optional[Replica] = Depends(read_replica)
+):
+    """
+    The whole audit log, oldest first, streamed as CSV or NDJSON.
+    """
+    return export_response(
+        text(
+            "SELECT log_id, log_timestamp, action_type, details FROM audit_log ORDER BY log_id"
+        ),
+        {},
+        fmt,
+        "audit_log",
+        replica,
+    )
+
+
+@router.get("/bookings/export", dependencies=admin_only)
+async def export_bookings(
+    fmt: str = ExportFormat, replica: Optional[Replica] = Depends(read_replica)
+):
+    """
+    Every booking with its event, venue and club, streamed as CSV or NDJSON.
+    """
+    return export_response(
+        text(
+            """
+            SELECT b.booking_id, b.status, b.request_timestamp,
+                   e.event_id, e.event_name, e.start_time, e.end_time,
+                   v.venue_name, c.club_name, b.requested_by
+            FROM bookings b
+            JOIN events e ON b.event_id = e.event_id
+            JOIN venues v ON b.venue_id = v.venue_id
+            JOIN clubs c ON e.club_id = c.club_id
+            ORDER BY b.booking_id
+            """
+        ),
+        {},
+        fmt,
+        "bookings",
+        replica,
+    )
+
+
+@router.get("/events/{event_id}/attendees/export", dependencies=admin_only)
+async def export_event_attendees(
+    event_id: int = Path(..., gt=0),
+    fmt: str = ExportFormat,
+    replica: Optional[Replica] = Depends(read_replica),
+):
+    """
+    Full attendee list of any event, streamed as CSV or NDJSON.
+    """
+    return export_response(
+        text(
+            """
+                SELECT u.user_id, u.first_name, u.last_name, u.email, a.rsvp_timestamp
+                FROM attendees a
+                JOIN users u ON a.user_id = u.user_id
+                WHERE a.event_id = :event_id
+                ORDER BY a.rsvp_timestamp, u.user_id
+            """
+        ),
+        {"event_id": event_id},
+        fmt,
+        f"event_{event_id}_attendees",
+        replica,
+    )
+
+
+@router.get("/stream")
+async def stream_admin_updates(
+    request: Request, user: TokenUser = Depends(stream_user)
+):
+    """
+    Server-sent events for the admin dashboard: new pending bookings and
+    booking status changes. The token comes as ?token= (EventSource).
+    """
+    if user.role != ADMIN:
+        raise HTTPException(status_code=403, detail="User is not an Admin")
+    return StreamingResponse(
+        hub.stream(request, ADMIN_TOPIC),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/pubsub_stats", dependencies=admin_only)
+async def get_pubsub_stats():
+    """
+    Open event streams, messages published and resyncs forced on slow streams.
+    """
+    return hub.stats()
+
+
+@router.get("/pool_stats", dependencies=admin_only)
+async def get_pool_stats():
+    """
+    Connection pool usage: checked out, overflow, wait times and connect failures.
+    """
+    return pool_stats.snapshot(engine.pool)
+
+
+@router.get("/replica_stats", dependencies=admin_only)
+async def get_replica_stats():
+    """
+    Read replica health and lag, and how many reads went to replicas vs the primary.
+    """
+    return replicas.stats()
+
+
+@router.get("/cache_stats", dependencies=admin_only)
+async def get_cache_stats():
+    """
+    Hit/miss counters for the upcoming events catalog cache, how many
+    conditional GETs were answered with 304 and how many identical
+    concurrent reads were collapsed into one query.
+    """
+    return {
+        **catalog_cache.stats(),
+        "not_modified": table_versions.not_modified,
+        "single_flight": reads.stats(),
+    }
+
+
+@router.get("/waitlist_stats", dependencies=admin_only)
+async def get_waitlist_stats():
+    """
+    Events with a waitlist, students waiting and how many the promotion
+    worker has moved into freed seats.
+    """
+    return promotion_worker.stats()
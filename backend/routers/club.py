@@ -6,15 +6,41 @@ handles login, event creation, and booking venues
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
-from sqlalchemy import text
-from sqlalchemy.orm import Session
-
-from backend.db import get_db
-
-# Import from your existing student router
-from backend.routers.student import StudentLogin, pwd_context
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import queries
+from backend.auth import (
+    CLUB_MEMBER,
+    TokenUser,
+    current_club_member,
+    issue_token,
+    require_role,
+    stream_user,
+)
+from backend.cache import catalog_cache
+from backend.db import (
+    Replica,
+    gather_on_sessions,
+    get_async_db,
+    get_read_db,
+    read_replica,
+)
+from backend.equipment import availability
+from backend.export import ExportFormat, export_response
+from backend.facet_index import facet_index
+from backend.http_cache import table_versions, versioned
+from backend.pagination import PageParams
+from backend.passwords import save_rehash, verify_password
+from backend.pubsub import ADMIN_TOPIC, club_topic, hub
+from backend.schemas import StudentLogin
+from backend.search_index import search_index
+from backend.serialization import RowJSONResponse
+from backend.singleflight import fetch_all
+from backend.venue_index import venue_index
 
 
 class ClubLogin(StudentLogin):
@@ -26,6 +52,7 @@ class EventCreate(BaseModel):
     description: Optional[str] = None
     start_time: datetime
     end_time: datetime
+    category_ids: List[int] = []
 
 
 class BookingRequest(BaseModel):
@@ -44,20 +71,25 @@ class Venue(BaseModel):
 class EventBasic(BaseModel):
     event_id: int
     event_name: str
+    start_time: datetime
+    end_time: datetime
 
 
 router = APIRouter(prefix="/club", tags=["Club"])
 
 
 @router.post("/login")
-def login_club_member(login_data: ClubLogin, db: Session = Depends(get_db)):
+async def login_club_member(
+    login_data: ClubLogin, db: AsyncSession = Depends(get_async_db)
+):
     """
     verify club member's creds and role
     """
     try:
-        user = db.execute(
-            text(
-                """
+        user = (
+            await db.execute(
+                text(
+                    """
                 SELECT u.user_id, u.first_name, u.password_hash, r.role_name,
                        cm.club_id, c.club_name
                 FROM users u
@@ -66,14 +98,16 @@ def login_club_member(login_data: ClubLogin, db: Session = Depends(get_db)):
                 LEFT JOIN clubs c ON cm.club_id = c.club_id
                 WHERE u.email = :email;
                 """
-            ),
-            {"email": login_data.email},
+                ),
+                {"email": login_data.email},
+            )
         ).fetchone()
 
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        if not pwd_context.verify(login_data.password, user.password_hash):
+        valid, new_hash = await verify_password(login_data.password, user.password_hash)
+        if not valid:
             raise HTTPException(status_code=401, detail="Invalid password")
 
         if user.role_name.lower() != "club member":
@@ -84,12 +118,16 @@ def login_club_member(login_data: ClubLogin, db: Session = Depends(get_db)):
                 status_code=403, detail="Club Member is not assigned to any club"
             )
 
+        if new_hash:
+            await save_rehash(db, user.user_id, new_hash)
+
         return {
             "message": f"Welcome, {user.first_name}!",
             "user_id": user.user_id,
             "role": user.role_name,
             "club_id": user.club_id,
             "club_name": user.club_name,
+            "token": issue_token(user.user_id, CLUB_MEMBER, user.club_id),
         }
     except HTTPException:
         raise
@@ -98,16 +136,34 @@ def login_club_member(login_data: ClubLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/{club_id}/events")
-def create_event(
+async def create_event(
     club_id: int,
     event_data: EventCreate,
-    db: Session = Depends(get_db),
+    user: TokenUser = Depends(current_club_member),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
-    Create a new event for a club.
+    Create a new event for a club, tagged with the given categories.
     """
     try:
-        db.execute(
+        category_ids = list(dict.fromkeys(event_data.category_ids))
+        categories = []
+        if category_ids:
+            categories = (
+                await db.execute(
+                    text(
+                        """
+                        SELECT category_id, category_name FROM categories
+                        WHERE category_id IN :ids
+                        """
+                    ).bindparams(bindparam("ids", expanding=True)),
+                    {"ids": category_ids},
+                )
+            ).fetchall()
+            if len(categories) != len(category_ids):
+                raise HTTPException(status_code=400, detail="Unknown category")
+
+        await db.execute(
             text(
                 """
                 INSERT INTO events (event_name, description, start_time, end_time, club_id)
@@ -124,44 +180,75 @@ def create_event(
         )
 
         # Get the last inserted ID
-        event_id_result = db.execute(text("SELECT LAST_INSERT_ID()")).fetchone()
+        event_id_result = (await db.execute(text("SELECT LAST_INSERT_ID()"))).fetchone()
         if event_id_result is None or event_id_result[0] is None:
             raise Exception("Could not retrieve new event ID after insert.")
 
         event_id = event_id_result[0]
+        if category_ids:
+            await db.execute(
+                text(
+                    """
+                    INSERT INTO event_categories (event_id, category_id)
+                    VALUES (:event_id, :category_id)
+                    """
+                ),
+                [
+                    {"event_id": event_id, "category_id": category_id}
+                    for category_id in category_ids
+                ],
+            )
 
-        db.commit()
+        await db.commit()
+        await catalog_cache.invalidate()
+        await table_versions.bump("events")
+        # until the index is loaded the load picks the event up itself
+        if search_index.loaded_at is not None:
+            search_index.add_event(
+                event_id,
+                event_data.event_name,
+                event_data.description,
+                event_data.start_time,
+                search_index.clubs.get(club_id),
+                [row.category_name for row in categories],
+            )
+        if facet_index.loaded_at is not None:
+            facet_index.add_event(
+                event_id, event_data.start_time, club_id, category_ids
+            )
 
         return {"message": "Event created successfully", "event_id": event_id}
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
 
 
 @router.post("/bookings")
-def request_venue_booking(
-    booking_data: BookingRequest, requested_by: int, db: Session = Depends(get_db)
+async def request_venue_booking(
+    booking_data: BookingRequest,
+    user: TokenUser = Depends(require_role(CLUB_MEMBER)),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
-    Request a venue booking for an event.
-    'requested_by' should be the user_id of the club member (as a query param).
+    Request a venue booking for one of the member's club's events.
+    The requesting club member is taken from the session token.
     """
+    event = (
+        await db.execute(
+            text("SELECT club_id FROM events WHERE event_id = :event_id"),
+            {"event_id": booking_data.event_id},
+        )
+    ).fetchone()
+    if event is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if event.club_id != user.club_id:
+        raise HTTPException(status_code=403, detail="not an event of your club")
     try:
-        # Check if user is a club member
-        user_check = db.execute(
-            text(
-                "SELECT role_name FROM users u JOIN roles r ON u.role_id = r.role_id WHERE u.user_id = :user_id"
-            ),
-            {"user_id": requested_by},
-        ).fetchone()
-
-        if not user_check or user_check.role_name.lower() != "club member":
-            raise HTTPException(
-                status_code=403, detail="Requesting user is not a club member"
-            )
-
-        db.execute(
+        result = await db.execute(
             text(
                 """
                 INSERT INTO bookings (event_id, venue_id, requested_by, status)
@@ -171,86 +258,396 @@ def request_venue_booking(
             {
                 "event_id": booking_data.event_id,
                 "venue_id": booking_data.venue_id,
-                "requested_by": requested_by,
+                "requested_by": user.user_id,
+            },
+        )
+        await db.commit()
+        await table_versions.bump("bookings")
+        await hub.publish(
+            ADMIN_TOPIC,
+            {
+                "type": "booking_requested",
+                "booking_id": result.lastrowid,
+                "event_id": booking_data.event_id,
+                "venue_id": booking_data.venue_id,
+                "club_id": user.club_id,
             },
         )
-        db.commit()
         return {"message": "Booking requested successfully. Awaiting admin approval."}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
 
 
+async def _club_events_page(db, club_id, page):
+    """one page of the club's events newest first, as (rows, next_cursor)"""
+    events = await fetch_all(
+        db, page.statement(queries.CLUB_EVENTS), {"club_id": club_id, **page.params()}
+    )
+    return page.split(events)
+
+
+async def _all_venues(db):
+    return await fetch_all(db, queries.ALL_VENUES)
+
+
+async def _all_categories(db):
+    return await fetch_all(db, queries.ALL_CATEGORIES)
+
+
+async def _unbooked_events(db, club_id):
+    return await fetch_all(db, queries.UNBOOKED_EVENTS, {"club_id": club_id})
+
+
 @router.get("/{club_id}/events")
-def get_club_events(club_id: int = Path(..., gt=0), db: Session = Depends(get_db)):
+async def get_club_events(
+    club_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_club_member),
+    _: None = versioned("events", "bookings", "venues", "attendees"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
-    Get all events (past and future) for a specific club.
+    Get one page of events (past and future) for a specific club, newest first.
+    Pass next_cursor back as ?cursor= to get the following page.
     """
     try:
-        events = db.execute(
-            text(
-                """
-                SELECT 
-                    e.event_id, e.event_name, e.description, e.start_time, e.end_time,
-                    v.venue_name, b.status AS booking_status,
-                    fn_GetAttendeeCount(e.event_id) AS attendee_count
-                FROM events e
-                LEFT JOIN bookings b ON e.event_id = b.event_id
-                LEFT JOIN venues v ON b.venue_id = v.venue_id
-                WHERE e.club_id = :club_id
-                ORDER BY e.start_time DESC;
-                """
-            ),
-            {"club_id": club_id},
-        ).fetchall()
+        events_list, next_cursor = await _club_events_page(db, club_id, page)
+        return RowJSONResponse(
+            {"club_id": club_id, "events": events_list, "next_cursor": next_cursor}
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
 
-        events_list = [dict(row._mapping) for row in events]
-        return events_list
+
+@router.get("/{club_id}/dashboard")
+async def get_club_dashboard(
+    club_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_club_member),
+    _: None = versioned("events", "bookings", "venues", "attendees"),
+    page: PageParams = Depends(),
+    replica: Optional[Replica] = Depends(read_replica),
+):
+    """
+    Everything the club dashboard needs in one round trip: a page of the
+    club's events, all venues and the unbooked events for the booking form,
+    and the categories for the event form. The queries run concurrently on
+    separate connections.
+    """
+    try:
+        (events, next_cursor), venues, unbooked, categories = await gather_on_sessions(
+            lambda db: _club_events_page(db, club_id, page),
+            _all_venues,
+            lambda db: _unbooked_events(db, club_id),
+            _all_categories,
+            replica=replica,
+        )
+        return RowJSONResponse(
+            {
+                "club_id": club_id,
+                "events": events,
+                "next_cursor": next_cursor,
+                "venues": venues,
+                "unbooked_events": unbooked,
+                "categories": categories,
+            }
+        )
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
 
 
+@router.get("/{club_id}/events/{event_id}/attendees/export")
+async def export_club_event_attendees(
+    club_id: int = Path(..., gt=0),
+    event_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_club_member),
+    fmt: str = ExportFormat,
+    replica: Optional[Replica] = Depends(read_replica),
+):
+    """
+    Full attendee list of one of the club's events, streamed as CSV or NDJSON.
+    Events of other clubs export no rows.
+    """
+    return export_response(
+        text(
+            """
+                SELECT u.user_id, u.first_name, u.last_name, u.email, a.rsvp_timestamp
+                FROM attendees a
+                JOIN users u ON a.user_id = u.user_id
+                JOIN events e ON a.event_id = e.event_id
+                WHERE a.event_id = :event_id AND e.club_id = :club_id
+                ORDER BY a.rsvp_timestamp, u.user_id
+            """
+        ),
+        {"event_id": event_id, "club_id": club_id},
+        fmt,
+        f"event_{event_id}_attendees",
+        replica,
+    )
+
+
+@router.get("/{club_id}/stream")
+async def stream_club_updates(
+    request: Request,
+    club_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(stream_user),
+):
+    """
+    Server-sent events for the club dashboard: booking status changes
+    and attendee counts of the club's events, as json data lines.
+    EventSource cannot send headers, so the token comes as ?token=.
+    """
+    if user.role != CLUB_MEMBER or user.club_id != club_id:
+        raise HTTPException(status_code=403, detail="not a member of this club")
+    return StreamingResponse(
+        hub.stream(request, club_topic(club_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ---
 # NEW ENDPOINTS FOR BOOKING FORM
 # ---
 
 
 @router.get("/venues", response_model=List[Venue])
-def get_all_venues(db: Session = Depends(get_db)):
+async def get_all_venues(
+    user: TokenUser = Depends(require_role(CLUB_MEMBER)),
+    _: None = versioned("venues"),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
     Get a list of all venues for the booking form.
     """
     try:
-        venues = db.execute(
-            text(
-                "SELECT venue_id, venue_name, location, capacity FROM venues ORDER BY venue_name"
-            )
-        ).fetchall()
-        return venues
+        return RowJSONResponse(await _all_venues(db))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
+
+
+@router.get("/venues/available", response_model=List[Venue])
+async def get_available_venues(
+    start: datetime = Query(...),
+    end: datetime = Query(...),
+    user: TokenUser = Depends(require_role(CLUB_MEMBER)),
+    _: None = versioned("venues", "bookings", "events"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get the venues with no approved booking overlapping [start, end),
+    answered from the in-memory venue availability index.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    try:
+        await venue_index.ensure_loaded(db)
+        return venue_index.available_venues(start, end)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
 
 
 @router.get("/{club_id}/events/unbooked", response_model=List[EventBasic])
-def get_unbooked_events(club_id: int = Path(..., gt=0), db: Session = Depends(get_db)):
+async def get_unbooked_events(
+    club_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_club_member),
+    _: None = versioned("events", "bookings"),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
     Get a list of events for this club that do not have a booking.
     """
     try:
-        events = db.execute(
+        return RowJSONResponse(await _unbooked_events(db, club_id))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
+
+
+# ---
+# EQUIPMENT RESERVATIONS
+# ---
+
+
+class EquipmentReservation(BaseModel):
+    equipment_id: int
+    quantity: int = 1
+
+
+def _timeline(pieces):
+    return [{"start": lo, "end": hi, "free": free} for lo, hi, free in pieces]
+
+
+async def _club_booking(db, club_id, booking_id):
+    """the club's booking with its event's window, 404 for other clubs'"""
+    booking = (
+        await db.execute(
             text(
                 """
-                SELECT e.event_id, e.event_name
-                FROM events e
-                LEFT JOIN bookings b ON e.event_id = b.event_id
-                WHERE e.club_id = :club_id
-                  AND (b.booking_id IS NULL OR b.status = 'Rejected')
-                ORDER BY e.start_time DESC;
+                SELECT b.booking_id, b.status, e.start_time, e.end_time
+                FROM bookings b
+                JOIN events e ON b.event_id = e.event_id
+                WHERE b.booking_id = :booking_id AND e.club_id = :club_id
                 """
             ),
-            {"club_id": club_id},
-        ).fetchall()
-        return events
+            {"booking_id": booking_id, "club_id": club_id},
+        )
+    ).fetchone()
+    if booking is None:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    return booking
+
+
+@router.get("/equipment")
+async def get_all_equipment(
+    user: TokenUser = Depends(require_role(CLUB_MEMBER)),
+    _: None = versioned("equipment"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Get every equipment item with the number of units it has.
+    """
+    try:
+        return RowJSONResponse(await fetch_all(db, queries.ALL_EQUIPMENT))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
+
+
+@router.get("/equipment/{equipment_id}/availability")
+async def get_equipment_availability(
+    equipment_id: int = Path(..., gt=0),
+    start: datetime = Query(...),
+    end: datetime = Query(...),
+    user: TokenUser = Depends(require_role(CLUB_MEMBER)),
+    _: None = versioned("equipment", "booking_equipment", "bookings"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    How many units of an item are free for the whole of [start, end), and the
+    free units over time within it. Reservations of pending and approved
+    bookings and the item's maintenance days count against it.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    try:
+        found = await availability(db, equipment_id, start, end)
+        if found is None:
+            raise HTTPException(status_code=404, detail="Equipment not found")
+        item, pieces = found
+        return RowJSONResponse(
+            {
+                "equipment_id": equipment_id,
+                "quantity": item.quantity,
+                "free": min(free for _, _, free in pieces),
+                "timeline": _timeline(pieces),
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
+
+
+@router.post("/{club_id}/bookings/{booking_id}/equipment")
+async def reserve_equipment(
+    request: EquipmentReservation,
+    club_id: int = Path(..., gt=0),
+    booking_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_club_member),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Reserve units of an item for the event of one of the club's bookings,
+    or change the number already reserved. Refused with 409 when fewer units
+    are free at some point of the event.
+    """
+    if request.quantity < 1:
+        raise HTTPException(status_code=400, detail="quantity must be at least 1")
+    try:
+        booking = await _club_booking(db, club_id, booking_id)
+        if booking.status == "Rejected":
+            raise HTTPException(status_code=400, detail="Booking was rejected")
+        # locks the item's row: other reservations of it wait for our commit
+        found = await availability(
+            db,
+            request.equipment_id,
+            booking.start_time,
+            booking.end_time,
+            exclude_booking=booking_id,
+            lock=True,
+        )
+        if found is None:
+            raise HTTPException(status_code=404, detail="Equipment not found")
+        free = min(free for _, _, free in found[1])
+        if request.quantity > free:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Only {free} unit(s) free during the event",
+            )
+
+        await db.execute(
+            text(
+                """
+                INSERT INTO booking_equipment
+                (booking_id, equipment_id, quantity, start_time, end_time)
+                VALUES (:booking_id, :equipment_id, :quantity, :start_time, :end_time)
+                ON DUPLICATE KEY UPDATE quantity = VALUES(quantity)
+                """
+            ),
+            {
+                "booking_id": booking_id,
+                "equipment_id": request.equipment_id,
+                "quantity": request.quantity,
+                "start_time": booking.start_time,
+                "end_time": booking.end_time,
+            },
+        )
+        await db.commit()
+        await table_versions.bump("booking_equipment")
+        return {
+            "message": "Equipment reserved",
+            "equipment_id": request.equipment_id,
+            "quantity": request.quantity,
+            "free": free - request.quantity,
+        }
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
+
+
+@router.delete("/{club_id}/bookings/{booking_id}/equipment/{equipment_id}")
+async def release_equipment(
+    club_id: int = Path(..., gt=0),
+    booking_id: int = Path(..., gt=0),
+    equipment_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_club_member),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Give back the units of an item reserved for one of the club's bookings.
+    """
+    try:
+        await _club_booking(db, club_id, booking_id)
+        result = await db.execute(
+            text(
+                """
+                DELETE FROM booking_equipment
+                WHERE booking_id = :booking_id AND equipment_id = :equipment_id
+                """
+            ),
+            {"booking_id": booking_id, "equipment_id": equipment_id},
+        )
+        await db.commit()
+        if not result.rowcount:
+            raise HTTPException(status_code=404, detail="Reservation not found")
+        await table_versions.bump("booking_equipment")
+        return {"message": "Equipment released"}
+    except HTTPException:
+        raise
     except Exception as e:
+        await db.rollback()
         raise HTTPException(status_code=400, detail=f"Error: {str(e)}") from e
@@ -3,49 +3,60 @@ endpoints for student facing actions
 handles signup, login, event interactions
 """
 
+from datetime import date
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Path
-from passlib.context import CryptContext
-from pydantic import BaseModel, EmailStr
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from sqlalchemy import text
-from sqlalchemy.orm import Session
-
-from backend.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import queries
+from backend.auth import (
+    STUDENT,
+    TokenUser,
+    current_student,
+    issue_token,
+    require_role,
+)
+from backend.cache import MISS, catalog_cache
+from backend.db import (
+    Replica,
+    gather_on_sessions,
+    get_async_db,
+    get_read_db,
+    read_replica,
+)
+from backend.facet_index import facet_index
+from backend.http_cache import table_versions, versioned
+from backend.pagination import PageParams, encode_cursor
+from backend.passwords import hash_password, save_rehash, verify_password
+from backend.pubsub import hub
+from backend.schemas import StudentLogin, StudentSignup
+from backend.search_index import search_index
+from backend.seats import FULL_MESSAGE, reject_if_sold_out, sold_out
+from backend.serialization import RowJSONResponse
+from backend.singleflight import fetch_all
+from backend.waitlist import SEATS_FOR_UPDATE, promotion_worker, waitlist_index
 
 ##########signup###############
 
 
-class StudentSignup(BaseModel):
-    """
-    class for the data coming from the user"""
-
-    first_name: str
-    last_name: str
-    email: EmailStr
-    password: str
-    phone: str
-    address_street: Optional[str] = None
-    address_city: Optional[str] = None
-    address_pincode: Optional[str] = None
-
-
 router = APIRouter(prefix="/student", tags=["Student"])
 
-# password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 @router.post("/signup")
-def signup_student(student_data: StudentSignup, db: Session = Depends(get_db)):
+async def signup_student(
+    student_data: StudentSignup, db: AsyncSession = Depends(get_async_db)
+):
     """
     create a new student user
     """
     try:
-        hashed_pw = pwd_context.hash(student_data.password)  # hash the password
+        # hash the password on the password pool, bcrypt is cpu bound
+        hashed_pw = await hash_password(student_data.password)
         # what will be stored in the table is the hashed password
 
-        db.execute(
+        await db.execute(
             text(
                 """
                      INSERT INTO users 
@@ -68,7 +79,7 @@ def signup_student(student_data: StudentSignup, db: Session = Depends(get_db)):
         )
         # add user phone number in user_phone_numbers table, since it
         # is actually a multivalued attributed
-        db.execute(
+        await db.execute(
             text(
                 """
                         INSERT INTO user_phone_numbers (user_id, phone_number)
@@ -79,10 +90,15 @@ def signup_student(student_data: StudentSignup, db: Session = Depends(get_db)):
         )
         # email is unique and hence can be used in the selection of user_id
 
-        db.commit()
+        await db.commit()
+        # trg_LogUserCreation writes the audit log
+        await table_versions.bump("users", "audit_log")
         return {"message": "signup successful"}
+    except HTTPException:
+        # e.g. 429 from the password pool
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=400, detail=f"error: {str(e)}"
         ) from e  # exception chaining,
@@ -91,39 +107,39 @@ def signup_student(student_data: StudentSignup, db: Session = Depends(get_db)):
 
 
 #########login#####
-class StudentLogin(BaseModel):
-    """
-    class for data coming from user during login
-    """
-
-    email: EmailStr
-    password: str
 
 
 @router.post("/login")
-def login_student(login_data: StudentLogin, db: Session = Depends(get_db)):
+async def login_student(
+    login_data: StudentLogin, db: AsyncSession = Depends(get_async_db)
+):
     """
     verify student's creds and role, given the user only gives
     in the email and pass
     """
     try:
-        result = db.execute(
-            text(
-                """
+        result = (
+            await db.execute(
+                text(
+                    """
                      SELECT u.user_id, u.first_name, u.last_name, u.password_hash, r.role_name
                      FROM users u
                      JOIN roles r ON u.role_id = r.role_id
                      WHERE u.email = :email;
                      """
-            ),
-            {"email": login_data.email},
+                ),
+                {"email": login_data.email},
+            )
         ).fetchone()
         if not result:
             raise HTTPException(status_code=404, detail="user not found")
 
         # check if the password is same by checking password entered by
         # user and that fetched from db, which is the right one
-        if not pwd_context.verify(login_data.password, result.password_hash):
+        valid, new_hash = await verify_password(
+            login_data.password, result.password_hash
+        )
+        if not valid:
             # 401: unauthorised client error
             raise HTTPException(status_code=401, detail="invalid password")
 
@@ -132,76 +148,179 @@ def login_student(login_data: StudentLogin, db: Session = Depends(get_db)):
             # 403: forbidden client error, changing authentication does not help here
             raise HTTPException(status_code=403, detail="user is not a student")
 
+        if new_hash:
+            await save_rehash(db, result.user_id, new_hash)
+
         return {
             "message": f"welcome, {result.first_name}!",
             "user_id": result.user_id,
             "role": result.role_name,
+            "token": issue_token(result.user_id, STUDENT),
         }
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=f"error: {str(e)}") from e
 
 
+#######event listings#########
+async def _upcoming_events_page(db, page):
+    """
+    one page of upcoming events as (rows, next_cursor), the catalog is
+    the same for every student so it is served from the cache when possible
+    """
+    cache_key = ("upcoming_events", page.cursor, page.limit)
+    cached = await catalog_cache.get(cache_key)
+    if cached is not MISS:
+        return cached
+
+    events = await fetch_all(db, page.statement(queries.UPCOMING_EVENTS), page.params())
+    result = page.split(events)
+    await catalog_cache.set(cache_key, result)
+    return result
+
+
+async def _registrations_page(db, student_id, page):
+    """one page of the events the student registered for, as (rows, next_cursor)"""
+    events = await fetch_all(
+        db,
+        page.statement(queries.REGISTRATIONS),
+        {"student_id": student_id, **page.params()},
+    )
+    return page.split(events)
+
+
+async def _registered_upcoming_ids(db, student_id):
+    """ids of the upcoming events the student is registered for"""
+    rows = await fetch_all(
+        db, queries.REGISTERED_UPCOMING_IDS, {"student_id": student_id}
+    )
+    return {row.event_id for row in rows}
+
+
 #######get events###########
 @router.get("/{student_id}/events")
-def get_all_events_for_students(
-    student_id: int = Path(..., gt=0), db: Session = Depends(get_db)
+async def get_all_events_for_students(
+    student_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_student),
+    _: None = versioned("events", "clubs", "bookings", "venues"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
-    return all upcoming events for a student
+    return one page of upcoming events for a student,
+    pass next_cursor back as ?cursor= to get the following page.
+    who is asking comes from the session token, no role lookup needed
     """
 
     try:
-        # verify the student exists
-        result = db.execute(
-            text(
-                """
-        SELECT u.user_id, r.role_name
-        FROM users u 
-        JOIN roles r ON u.role_id = r.role_id
-        WHERE u.user_id = :student_id;
-        """
-            ),
-            {"student_id": student_id},
-        ).fetchone()
+        events_list, next_cursor = await _upcoming_events_page(db, page)
+        return RowJSONResponse(
+            {
+                "student_id": student_id,
+                "events": events_list,
+                "next_cursor": next_cursor,
+            }
+        )
 
-        if not result:
-            raise HTTPException(status_code=404, detail="student not found")
-        if result.role_name.lower() != "student":
-            raise HTTPException(status_code=403, detail="user is not a student")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"error: {str(e)}") from e
 
-        # fetch all upcoming events
-        events = db.execute(
-            text(
-                """
-        SELECT e.event_id, e.event_name, e.description, e.start_time, e.end_time, c.club_name, v.venue_name, v.location
-        FROM events e JOIN clubs c ON e.club_id = c.club_id
-        LEFT JOIN bookings b ON e.event_id = b.event_id AND b.status = 'Approved'
-        LEFT JOIN venues v ON b.venue_id = v.venue_id
-        WHERE e.start_time >= NOW()
-        ORDER BY e.start_time ASC;
-        """
-            )
-        ).fetchall()
 
-        # convert to json
-        events_list = [
+#######search events#########
+@router.get("/events/search")
+async def search_events(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    user: TokenUser = Depends(require_role(STUDENT)),
+    _: None = versioned("events", "clubs", "bookings", "venues"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    upcoming events matching every word of q by name, description, club or
+    category, best match first. any word may also match as the prefix of a
+    longer one (ranked lower), so results show up while typing. answered
+    from the in-memory search index, total counts every match
+    """
+    try:
+        await search_index.ensure_loaded(db)
+        total, ranked = search_index.search(q, limit)
+        events = []
+        if ranked:
+            rank = {event_id: i for i, (event_id, _) in enumerate(ranked)}
+            rows = await db.execute(queries.SEARCH_RESULTS, {"event_ids": list(rank)})
+            events = sorted(rows, key=lambda row: rank[row.event_id])
+        return RowJSONResponse({"query": q, "total": total, "events": events})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"error: {str(e)}") from e
+
+
+#######browse events#########
+def _facet_list(counts, names, key):
+    """facet counts as a list, largest first"""
+    return [
+        {key + "_id": item_id, key + "_name": names.get(item_id), "count": n}
+        for item_id, n in sorted(
+            counts.items(), key=lambda item: (-item[1], names.get(item[0]) or "")
+        )
+    ]
+
+
+@router.get("/events/browse")
+async def browse_events(
+    club_id: Optional[int] = Query(None, gt=0),
+    category_id: Optional[int] = Query(None, gt=0),
+    has_venue: bool = Query(False, description="only events with an approved venue"),
+    from_date: Optional[date] = Query(None, description="first start date"),
+    to_date: Optional[date] = Query(None, description="last start date"),
+    user: TokenUser = Depends(require_role(STUDENT)),
+    _: None = versioned("events", "clubs", "bookings", "venues"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    one page of the upcoming events passing the filters, soonest first, with
+    the number of matches and the counts per club and per category. each
+    facet's counts apply the other filters, not its own. both come from the
+    in-memory facet index, pass next_cursor back as ?cursor= for the next page
+    """
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="from_date is after to_date")
+    try:
+        await facet_index.ensure_loaded(db)
+        filters = dict(
+            club_id=club_id,
+            category_id=category_id,
+            has_venue=has_venue,
+            from_date=from_date,
+            to_date=to_date,
+        )
+        total, clubs, categories = facet_index.facets(**filters)
+        ids, last = facet_index.page(page.limit, page.after, **filters)
+        events = []
+        if ids:
+            order = {event_id: i for i, event_id in enumerate(ids)}
+            rows = await db.execute(queries.SEARCH_RESULTS, {"event_ids": ids})
+            events = sorted(rows, key=lambda row: order[row.event_id])
+        return RowJSONResponse(
             {
-                "event_id": row.event_id,
-                "event_name": row.event_name,
-                "description": row.description,
-                "start_time": row.start_time,
-                "end_time": row.end_time,
-                "club_name": row.club_name,
-                "venue_name": row.venue_name,
-                "venue_location": row.location,
+                "total": total,
+                "events": events,
+                "next_cursor": encode_cursor(*last) if last else None,
+                "facets": {
+                    "clubs": _facet_list(clubs, facet_index.clubs, "club"),
+                    "categories": _facet_list(
+                        categories, facet_index.categories, "category"
+                    ),
+                },
             }
-            for row in events
-        ]
-
-        return {"student_id": student_id, "events": events_list}
+        )
 
     except HTTPException:
         raise
@@ -211,64 +330,74 @@ def get_all_events_for_students(
 
 #########get all registrations###
 @router.get("/{student_id}/registrations")
-def get_registered_events(
-    student_id: int = Path(..., gt=0), db: Session = Depends(get_db)
+async def get_registered_events(
+    student_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_student),
+    _: None = versioned("attendees", "events", "clubs", "bookings", "venues"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
-    select all the registrations by the student
+    select one page of the registrations by the student
     """
 
-    # check if the student is present first
     try:
-        result = db.execute(
-            text(
-                """
-            SELECT u.user_id, r.role_name
-            FROM users u
-            JOIN roles r ON u.role_id = r.role_id
-            WHERE u.user_id = :student_id
-            """
-            ),
-            {"student_id": student_id},
-        ).fetchone()
+        events_list, next_cursor = await _registrations_page(db, student_id, page)
+        return RowJSONResponse(
+            {
+                "student_id": student_id,
+                "events": events_list,
+                "next_cursor": next_cursor,
+            }
+        )
 
-        if not result:
-            raise HTTPException(status_code=404, detail="student not found")
-        if result.role_name.lower() != "student":
-            raise HTTPException(status_code=403, detail="user not a student")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"error: {str(e)}") from e
 
-        events = db.execute(
-            text(
-                """
-            SELECT e.event_id, e.event_name, e.description, e.start_time, e.end_time, c.club_name, v.venue_name, v.location
-            FROM attendees a        
-            JOIN events e ON a.event_id = e.event_id    
-            JOIN clubs c ON e.club_id = c.club_id    
-            LEFT JOIN bookings b ON e.event_id = b.event_id AND b.status = 'Approved'
-            LEFT JOIN venues v ON b.venue_id = v.venue_id
-            WHERE a.user_id = :student_id
-            ORDER BY e.start_time ASC;
-            """
-            ),
-            {"student_id": student_id},
-        ).fetchall()
 
-        # convert to json
-        events_list = [
+#########dashboard###############
+@router.get("/{student_id}/dashboard")
+async def get_student_dashboard(
+    student_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_student),
+    _: None = versioned("attendees", "events", "clubs", "bookings", "venues"),
+    page: PageParams = Depends(),
+    replica: Optional[Replica] = Depends(read_replica),
+):
+    """
+    everything the student dashboard needs in one round trip: a page of
+    upcoming events flagged with is_registered, and the first page of the
+    student's registrations. the queries run concurrently on separate
+    connections. registered_event_ids lets the client flag later event pages
+    """
+    try:
+        (events, next_cursor), (registrations, reg_cursor), registered = (
+            await gather_on_sessions(
+                lambda db: _upcoming_events_page(db, page),
+                lambda db: _registrations_page(
+                    db, student_id, PageParams(cursor=None, limit=page.limit)
+                ),
+                lambda db: _registered_upcoming_ids(db, student_id),
+                replica=replica,
+            )
+        )
+        # the cached page is shared, flag copies of its events
+        events = [
+            {**event._asdict(), "is_registered": event.event_id in registered}
+            for event in events
+        ]
+        return RowJSONResponse(
             {
-                "event_id": row.event_id,
-                "event_name": row.event_name,
-                "description": row.description,
-                "start_time": row.start_time,
-                "end_time": row.end_time,
-                "club_name": row.club_name,
-                "venue_name": row.venue_name,
-                "venue_location": row.location,
+                "student_id": student_id,
+                "events": events,
+                "next_cursor": next_cursor,
+                "registrations": registrations,
+                "registrations_next_cursor": reg_cursor,
+                "registered_event_ids": sorted(registered),
             }
-            for row in events
-        ]
-
-        return events_list
+        )
 
     except HTTPException:
         raise
@@ -278,30 +407,263 @@ def get_registered_events(
 
 ######register for event#####
 @router.post("/{student_id}/register/{event_id}")
-def register_for_event(
+async def register_for_event(
     student_id: int = Path(..., gt=0),
     event_id: int = Path(..., gt=0),
-    db: Session = Depends(get_db),
+    user: TokenUser = Depends(current_student),
+    _: None = Depends(reject_if_sold_out),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Register a student for an event by calling the stored procedure.
+    The procedure enforces the approved venue's capacity, events already
+    known to be full are rejected by reject_if_sold_out without a db round trip.
     """
     try:
-        result = db.execute(
-            text("CALL sp_RegisterForEvent(:u_id, :e_id)"),
-            {"u_id": student_id, "e_id": event_id},
+        result = (
+            await db.execute(
+                text("CALL sp_RegisterForEvent(:u_id, :e_id)"),
+                {"u_id": student_id, "e_id": event_id},
+            )
         ).fetchone()
 
-        db.commit()
+        await db.commit()
 
+        if result and result.message == FULL_MESSAGE:
+            sold_out.mark_sold_out(event_id)
         if result and "Error" in result.message:
             raise HTTPException(status_code=409, detail=result.message)
+        # only a registration that went through changes the attendees
+        await table_versions.bump("attendees")
 
+        # pushed to the club's dashboard with the next coalesced flush
+        hub.attendees_changed(event_id)
         return {"message": "Registration successful."}
 
     except HTTPException:
-        db.rollback()
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"error: {str(e)}") from e
+
+
+######unregister from event#####
+@router.delete("/{student_id}/register/{event_id}")
+async def unregister_from_event(
+    student_id: int = Path(..., gt=0),
+    event_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_student),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Cancel a registration for an upcoming event. The seat goes back to the
+    event's counter, the promotion worker hands it to the waitlist if any.
+    """
+    try:
+        deleted = await db.execute(
+            text(
+                """
+                DELETE FROM attendees
+                WHERE user_id = :u_id AND event_id = :e_id
+                  AND event_id IN (
+                      SELECT event_id FROM events
+                      WHERE event_id = :e_id AND start_time > NOW()
+                  )
+                """
+            ),
+            {"u_id": student_id, "e_id": event_id},
+        )
+        if not deleted.rowcount:
+            raise HTTPException(
+                status_code=404,
+                detail="Error: No registration for this upcoming event.",
+            )
+        await db.execute(
+            text(
+                """
+                UPDATE event_seats SET seats_taken = seats_taken - 1
+                WHERE event_id = :e_id AND seats_taken > 0
+                """
+            ),
+            {"e_id": event_id},
+        )
+        await db.commit()
+        await table_versions.bump("attendees")
+
+        sold_out.clear(event_id)
+        promotion_worker.nudge(event_id)
+        hub.attendees_changed(event_id)
+        return {"message": "Registration cancelled."}
+
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"error: {str(e)}") from e
+
+
+######waitlist#####
+@router.post("/{student_id}/waitlist/{event_id}")
+async def join_waitlist(
+    student_id: int = Path(..., gt=0),
+    event_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_student),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Join the waitlist of a full event, students are promoted to attendees in
+    the order they joined as seats free up. The event's seat counter row is
+    held until commit, so tickets are handed out one at a time.
+    """
+    try:
+        seats = (await db.execute(SEATS_FOR_UPDATE, {"event_id": event_id})).fetchone()
+        event = (
+            await db.execute(
+                text(
+                    """
+                    SELECT e.start_time > NOW() AS upcoming,
+                           EXISTS (
+                               SELECT 1 FROM attendees a
+                               WHERE a.user_id = :u_id AND a.event_id = e.event_id
+                           ) AS registered,
+                           EXISTS (
+                               SELECT 1 FROM event_waitlist w
+                               WHERE w.user_id = :u_id AND w.event_id = e.event_id
+                           ) AS waiting,
+                           EXISTS (
+                               SELECT 1 FROM event_waitlist w
+                               WHERE w.event_id = e.event_id
+                           ) AS has_waitlist
+                    FROM events e WHERE e.event_id = :e_id
+                    """
+                ),
+                {"u_id": student_id, "e_id": event_id},
+            )
+        ).fetchone()
+        if event is None or not event.upcoming:
+            raise HTTPException(
+                status_code=404, detail="Error: No such upcoming event."
+            )
+        if event.registered:
+            raise HTTPException(
+                status_code=409,
+                detail="Error: User is already registered for this event.",
+            )
+        if event.waiting:
+            raise HTTPException(
+                status_code=409, detail="Error: User is already on the waitlist."
+            )
+        # free seats still wait for the worker while others are queued
+        if seats is None or (
+            seats.seats_taken < seats.capacity and not event.has_waitlist
+        ):
+            raise HTTPException(
+                status_code=409, detail="Error: Event is not full, register instead."
+            )
+
+        ticket = seats.next_ticket
+        await db.execute(
+            text(
+                """
+                INSERT INTO event_waitlist (event_id, ticket, user_id)
+                VALUES (:e_id, :ticket, :u_id)
+                """
+            ),
+            {"e_id": event_id, "ticket": ticket, "u_id": student_id},
+        )
+        await db.execute(
+            text(
+                """
+                UPDATE event_seats SET next_ticket = next_ticket + 1
+                WHERE event_id = :e_id
+                """
+            ),
+            {"e_id": event_id},
+        )
+        await db.commit()
+        await table_versions.bump("event_waitlist")
+
+        waitlist_index.joined(event_id, ticket, student_id)
+        if seats.seats_taken < seats.capacity:
+            promotion_worker.nudge(event_id)
+        position, waiting = waitlist_index.place(event_id, ticket)
+        return {
+            "message": "Joined the waitlist.",
+            "position": position,
+            "waiting": waiting,
+        }
+
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"error: {str(e)}") from e
+
+
+@router.delete("/{student_id}/waitlist/{event_id}")
+async def leave_waitlist(
+    student_id: int = Path(..., gt=0),
+    event_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_student),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Leave the waitlist of an event.
+    """
+    try:
+        deleted = await db.execute(
+            text(
+                """
+                DELETE FROM event_waitlist
+                WHERE user_id = :u_id AND event_id = :e_id
+                """
+            ),
+            {"u_id": student_id, "e_id": event_id},
+        )
+        if not deleted.rowcount:
+            raise HTTPException(
+                status_code=404, detail="Error: User is not on the waitlist."
+            )
+        await db.commit()
+        await table_versions.bump("event_waitlist")
+
+        waitlist_index.left(event_id, [student_id])
+        return {"message": "Left the waitlist."}
+
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"error: {str(e)}") from e
+
+
+@router.get("/{student_id}/waitlist")
+async def get_waitlist(
+    student_id: int = Path(..., gt=0),
+    user: TokenUser = Depends(current_student),
+    _: None = versioned("event_waitlist", "attendees", "events", "clubs"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    the events the student waits for, with their place in each queue and how
+    many wait. the places come from the in-memory waitlist index, O(log n)
+    per event, the entries themselves from the db
+    """
+    try:
+        await waitlist_index.ensure_loaded(db)
+        entries = []
+        for row in await db.execute(
+            queries.WAITLIST_ENTRIES, {"student_id": student_id}
+        ):
+            position, waiting = waitlist_index.place(row.event_id, row.ticket)
+            entries.append({**row._asdict(), "position": position, "waiting": waiting})
+        return RowJSONResponse({"student_id": student_id, "waitlist": entries})
+
+    except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=400, detail=f"error: {str(e)}") from e
@@ -0,0 +1,30 @@
+"""
+request bodies shared by several routers and modules
+"""
+
+from typing import Optional
+
+from pydantic import BaseModel, EmailStr
+
+
+class StudentSignup(BaseModel):
+    """
+    class for the data coming from the user, also each record of a bulk import"""
+
+    first_name: str
+    last_name: str
+    email: EmailStr
+    password: str
+    phone: str
+    address_street: Optional[str] = None
+    address_city: Optional[str] = None
+    address_pincode: Optional[str] = None
+
+
+class StudentLogin(BaseModel):
+    """
+    class for data coming from user during login, the admin and club logins too
+    """
+
+    email: EmailStr
+    password: str
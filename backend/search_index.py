@@ -0,0 +1,361 @@
+"""
+in-memory inverted index over event names, descriptions, club names and
+categories, behind the student event search. every word of the query has to
+match, as a whole word or as the prefix of one, whichever word of the query it
+is (so results show up while typing, and "rob night" finds "robotics night"),
+and matches are ranked with BM25, name and club matches weighing more than the
+description.
+
+events are never edited or deleted through the api, so after the first load
+only events with a higher id are fetched: create_event adds its event straight
+away, and events created by other workers are picked up every
+SEARCH_INDEX_REFRESH seconds
+"""
+
+import asyncio
+import heapq
+import math
+import os
+import re
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime
+from itertools import repeat
+from operator import mul
+
+from sqlalchemy import text
+
+from backend.venue_index import _as_datetime
+
+SEARCH_INDEX_REFRESH = float(os.getenv("SEARCH_INDEX_REFRESH", "60"))
+# a query word expands to at most this many indexed words it is a prefix of
+SEARCH_MAX_EXPANSIONS = int(os.getenv("SEARCH_MAX_EXPANSIONS", "50"))
+
+FIELD_WEIGHTS = {
+    "event_name": 3.0,
+    "club_name": 2.0,
+    "categories": 2.0,
+    "description": 1.0,
+}
+# a prefix match counts for less than the whole word
+PREFIX_WEIGHT = 0.7
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# words found in more than this share of the events are ignored when the
+# query has rarer ones
+COMMON_WORD_SHARE = 0.5
+# a word's cached scores are recomputed once the number of events
+# (and so its idf and the average length) moved by more than this
+IMPACT_STALENESS = 0.05
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or the to with".split()
+)
+WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(value):
+    """lowercased words without accents or stopwords"""
+    if not value:
+        return []
+    value = value.lower()
+    if not value.isascii():
+        value = "".join(
+            ch
+            for ch in unicodedata.normalize("NFKD", value)
+            if not unicodedata.combining(ch)
+        )
+    return [word for word in WORD_RE.findall(value) if word not in STOPWORDS]
+
+
+class Postings:
+    """
+    the events containing one word, ids ascending, with the word's weight in
+    each. arrays keep 100k events compact. impacts caches each event's BM25
+    score for the word, dropped when the postings change
+    """
+
+    __slots__ = ("ids", "weights", "impacts", "impacts_at")
+
+    def __init__(self):
+        self.ids = array("I")
+        self.weights = array("f")
+        self.impacts = None
+        self.impacts_at = 0
+
+    def add(self, event_id, weight):
+        if not self.ids or event_id > self.ids[-1]:
+            self.ids.append(event_id)
+            self.weights.append(weight)
+        else:
+            # create_event can add an event before load() fetched lower ids
+            i = bisect_left(self.ids, event_id)
+            self.ids.insert(i, event_id)
+            self.weights.insert(i, weight)
+        self.impacts = None
+
+
+# what a fresh index built in a thread hands over to the live one
+INDEX_STATE = ("postings", "terms", "lengths", "total_length", "started", "upcoming")
+
+
+class EventSearchIndex:
+    def __init__(self, refresh):
+        self.refresh = refresh
+        self.postings = {}
+        # every indexed word, sorted, prefix lookups are a bisect
+        self.terms = []
+        self.lengths = {}
+        self.total_length = 0.0
+        # ids of the events that have started, and a heap of (start, id) of
+        # those that have not, the search moves events over as time passes
+        self.started = set()
+        self.upcoming = []
+        self.clubs = {}
+        # highest event id load() has fetched, create_event adds events
+        # out of turn so the ids indexed may go higher
+        self.loaded_through = 0
+        self.loaded_at = None
+        self._lock = asyncio.Lock()
+
+    def add_event(
+        self, event_id, event_name, description, start_time, club_name, categories=()
+    ):
+        """index one event, events already indexed are skipped"""
+        if event_id in self.lengths:
+            return
+        weights = {}
+        for field, value in (
+            ("event_name", event_name),
+            ("description", description),
+            ("club_name", club_name),
+            ("categories", " ".join(categories)),
+        ):
+            for word in tokenize(value):
+                weights[word] = weights.get(word, 0.0) + FIELD_WEIGHTS[field]
+        for word, weight in weights.items():
+            postings = self.postings.get(word)
+            if postings is None:
+                postings = self.postings[word] = Postings()
+                insort(self.terms, word)
+            postings.add(event_id, weight)
+        length = sum(weights.values())
+        self.lengths[event_id] = length
+        self.total_length += length
+        start = _as_datetime(start_time)
+        if start < datetime.now():
+            self.started.add(event_id)
+        else:
+            heapq.heappush(self.upcoming, (start, event_id))
+
+    def _add_rows(self, events, categories):
+        for row in events:
+            self.add_event(
+                row.event_id,
+                row.event_name,
+                row.description,
+                row.start_time,
+                self.clubs.get(row.club_id),
+                categories.get(row.event_id, ()),
+            )
+        if events:
+            self.loaded_through = max(self.loaded_through, events[-1].event_id)
+
+    def _build(self, events, categories):
+        """index events from scratch, scores included, off the event loop"""
+        self._add_rows(events, categories)
+        for postings in self.postings.values():
+            self._impacts(postings)
+
+    async def load(self, db):
+        """index the clubs and the events added since the last load"""
+        clubs = await db.execute(text("SELECT club_id, club_name FROM clubs"))
+        self.clubs = {row.club_id: row.club_name for row in clubs}
+        params = {"after_id": self.loaded_through}
+        events = (
+            await db.execute(
+                text(
+                    """
+                    SELECT event_id, event_name, description, start_time, club_id
+                    FROM events WHERE event_id > :after_id ORDER BY event_id
+                    """
+                ),
+                params,
+            )
+        ).fetchall()
+        categories = {}
+        for row in await db.execute(
+            text(
+                """
+                SELECT ec.event_id, c.category_name
+                FROM event_categories ec
+                JOIN categories c ON ec.category_id = c.category_id
+                WHERE ec.event_id > :after_id
+                """
+            ),
+            params,
+        ):
+            categories.setdefault(row.event_id, []).append(row.category_name)
+
+        if self.lengths or len(events) < 1000:
+            self._add_rows(events, categories)
+        else:
+            # the first load can be 100k events, they are tokenized into a
+            # fresh index in a thread so requests keep being served meanwhile
+            fresh = EventSearchIndex(self.refresh)
+            fresh.clubs = self.clubs
+            await asyncio.to_thread(fresh._build, events, categories)
+            for name in INDEX_STATE:
+                setattr(self, name, getattr(fresh, name))
+            # events created meanwhile have higher ids, the next load adds them
+            self.loaded_through = fresh.loaded_through
+        self.loaded_at = time.monotonic()
+
+    async def ensure_loaded(self, db):
+        if (
+            self.loaded_at is not None
+            and time.monotonic() - self.loaded_at < self.refresh
+        ):
+            return
+        async with self._lock:
+            # another request may have loaded while we waited
+            if (
+                self.loaded_at is None
+                or time.monotonic() - self.loaded_at >= self.refresh
+            ):
+                await self.load(db)
+
+    def _expansions(self, word):
+        """
+        (term, weight) of the indexed words matching word, itself first,
+        then the words it is a prefix of. every query word is expanded, not
+        only the last one typed
+        """
+        found = []
+        if word in self.postings:
+            found.append((word, 1.0))
+        if len(word) < 2:
+            # a single letter would expand to a large part of the vocabulary
+            return found
+        i = bisect_left(self.terms, word)
+        while (
+            i < len(self.terms)
+            and len(found) < SEARCH_MAX_EXPANSIONS
+            and self.terms[i].startswith(word)
+        ):
+            if self.terms[i] != word:
+                found.append((self.terms[i], PREFIX_WEIGHT))
+            i += 1
+        return found
+
+    def _impacts(self, postings):
+        """BM25 score of the word in each of its events, cached"""
+        n_events = len(self.lengths)
+        if (
+            postings.impacts is None
+            or abs(n_events - postings.impacts_at) > n_events * IMPACT_STALENESS
+        ):
+            average = self.total_length / n_events or 1.0
+            df = len(postings.ids)
+            idf = math.log(1 + (n_events - df + 0.5) / (df + 0.5))
+            lengths = self.lengths
+            postings.impacts = array(
+                "f",
+                (
+                    idf * tf * (K1 + 1)
+                    / (tf + K1 * (1 - B + B * lengths[event_id] / average))
+                    for event_id, tf in zip(postings.ids, postings.weights)
+                ),
+            )  # fmt: skip
+            postings.impacts_at = n_events
+        return postings.impacts
+
+    def _scores(self, terms, totals):
+        """
+        score per event for one query word, the best of its expansions.
+        totals holds the scores of the words before it, only the events in
+        it are looked at and the result adds to them
+        """
+        scores = {}
+        for term, weight in terms:
+            postings = self.postings[term]
+            ids, impacts = postings.ids, self._impacts(postings)
+            if totals is not None and len(totals) * 16 < len(ids):
+                # few candidates left, look them up rather than scan the word
+                term_scores = {}
+                for event_id in totals:
+                    i = bisect_left(ids, event_id)
+                    if i < len(ids) and ids[i] == event_id:
+                        term_scores[event_id] = impacts[i] * weight
+            else:
+                if weight != 1.0:
+                    impacts = map(mul, impacts, repeat(weight))
+                pairs = zip(ids, impacts)
+                if totals is None:
+                    term_scores = dict(pairs)
+                else:
+                    term_scores = {
+                        event_id: score
+                        for event_id, score in pairs
+                        if event_id in totals
+                    }
+            # merge the smaller into the larger, keeping the best per event
+            if len(term_scores) > len(scores):
+                scores, term_scores = term_scores, scores
+            for event_id, score in term_scores.items():
+                if score > scores.get(event_id, 0.0):
+                    scores[event_id] = score
+        if totals is None:
+            return scores
+        return {
+            event_id: totals[event_id] + score for event_id, score in scores.items()
+        }
+
+    def search(self, query, limit, upcoming_only=True):
+        """
+        (total, [(event_id, score), ...]) of the best limit events matching
+        every query word (but the common ones), only those not started yet
+        unless upcoming_only is off
+        """
+        words = [
+            (word, self._expansions(word)) for word in dict.fromkeys(tokenize(query))
+        ]
+        if not words or not all(terms for _, terms in words):
+            return 0, []
+        df = {
+            word: sum(len(self.postings[term].ids) for term, _ in terms)
+            for word, terms in words
+        }
+        # rarest word first, the others are only scored on its matches
+        words.sort(key=lambda item: df[item[0]])
+        # words in most events ("club") barely rank or filter anything but
+        # are the most costly to check, they only count when alone
+        common = len(self.lengths) * COMMON_WORD_SHARE
+        words = [item for item in words if df[item[0]] <= common] or words[:1]
+        totals = None
+        for _, terms in words:
+            totals = self._scores(terms, totals)
+            if not totals:
+                return 0, []
+        candidates = totals.keys()
+        if upcoming_only:
+            now = datetime.now()
+            while self.upcoming and self.upcoming[0][0] < now:
+                self.started.add(heapq.heappop(self.upcoming)[1])
+            candidates = candidates - self.started
+        best = heapq.nlargest(limit, candidates, key=totals.__getitem__)
+        return len(candidates), [(event_id, totals[event_id]) for event_id in best]
+
+    def stats(self):
+        return {
+            "events": len(self.lengths),
+            "terms": len(self.terms),
+            "postings": sum(len(p.ids) for p in self.postings.values()),
+            "loaded_through": self.loaded_through,
+        }
+
+
+search_index = EventSearchIndex(SEARCH_INDEX_REFRESH)
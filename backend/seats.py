@@ -0,0 +1,56 @@
+"""
+in-process view of which events are sold out, so a registration rush on a full
+event is answered with 409 before a db connection is even checked out.
+the db (event_seats + sp_RegisterForEvent) stays the source of truth, entries
+here expire after SOLD_OUT_TTL so seats freed by another worker are noticed
+"""
+
+import os
+import time
+
+from fastapi import HTTPException, Path
+
+SOLD_OUT_TTL = float(os.getenv("SOLD_OUT_TTL", "30"))
+
+FULL_MESSAGE = "Error: Event is full."
+
+
+class SoldOutRegistry:
+    """event_id -> time it was seen full"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._sold_out = {}
+        self.fast_rejections = 0
+
+    def is_sold_out(self, event_id):
+        seen_at = self._sold_out.get(event_id)
+        if seen_at is None:
+            return False
+        if time.monotonic() - seen_at > self.ttl:
+            del self._sold_out[event_id]
+            return False
+        return True
+
+    def mark_sold_out(self, event_id):
+        self._sold_out[event_id] = time.monotonic()
+
+    def clear(self, event_id=None):
+        """forget one event (a seat was freed) or all (capacities changed)"""
+        if event_id is None:
+            self._sold_out.clear()
+        else:
+            self._sold_out.pop(event_id, None)
+
+
+sold_out = SoldOutRegistry(SOLD_OUT_TTL)
+
+
+async def reject_if_sold_out(event_id: int = Path(..., gt=0)):
+    """
+    dependency for the register route, declared before get_async_db
+    so a known-full event never touches the pool
+    """
+    if sold_out.is_sold_out(event_id):
+        sold_out.fast_rejections += 1
+        raise HTTPException(status_code=409, detail=FULL_MESSAGE)
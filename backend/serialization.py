@@ -0,0 +1,54 @@
+"""
+fast JSON responses for row listings. FastAPI runs whatever a handler returns
+through jsonable_encoder, which walks every row again just to rebuild the same
+dicts, then json.dumps walks them a third time. RowJSONResponse is returned
+directly so that step is skipped, and sqlalchemy rows are encoded straight to
+bytes by orjson (datetimes natively, rows through _default)
+"""
+
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from sqlalchemy.engine import Row
+
+from backend.metrics import METRICS_ENABLED, RENDER_LATENCY, current_handler
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder is used without it
+    orjson = None
+
+
+def _default(value):
+    """types neither encoder handles natively"""
+    if isinstance(value, Row):
+        return value._asdict()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+
+class RowJSONResponse(JSONResponse):
+    """
+    JSONResponse taking rows as they come from the db, return it from the
+    handler: return RowJSONResponse({"events": rows, ...})
+    """
+
+    def render(self, content):
+        if not METRICS_ENABLED:
+            return dumps(content)
+        start = time.perf_counter()
+        body = dumps(content)
+        RENDER_LATENCY.observe(time.perf_counter() - start, current_handler())
+        return body
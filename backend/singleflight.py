@@ -0,0 +1,113 @@
+"""
+single-flight reads: when registration opens hundreds of requests run the same
+listing query within a few milliseconds of each other. fetch_all() lets
+concurrent identical reads (same statement, parameters and database) share one
+execution, the first caller runs it on its session and the others wait for its
+rows. only the precompiled statements of backend.queries go through it, and
+the rows are shared, so callers must not mutate them.
+
+a commit anywhere in the process forgets the reads in flight, so a request
+never joins a read that started before a write it made
+"""
+
+import asyncio
+import os
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.metrics import query_label, registry
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+FLIGHTS = registry.counter(
+    "evently_single_flight_executions_total",
+    "reads executed by fetch_all",
+    ("query",),
+)
+COLLAPSED = registry.counter(
+    "evently_single_flight_collapsed_total",
+    "reads answered by an identical read already in flight",
+    ("query",),
+)
+
+
+@lru_cache(maxsize=256)
+def _label(statement):
+    return query_label(str(statement))
+
+
+class SingleFlight:
+    """the in-flight reads by key, each a task the callers with that key await"""
+
+    def __init__(self):
+        self._flights = {}
+        self.executions = 0
+        self.collapsed = 0
+
+    async def do(self, key, fn, label="-"):
+        """result of fn(), shared with every concurrent call using the same key"""
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.executions += 1
+            FLIGHTS.inc(1, label)
+            # cancelling the first caller cancels the read, see below
+            return await task
+
+        self.collapsed += 1
+        COLLAPSED.inc(1, label)
+        try:
+            # shielded, one waiting caller going away does not cancel the read
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled() and not asyncio.current_task().cancelling():
+                # the first caller went away mid read, start a new one
+                return await self.do(key, fn, label)
+            raise
+
+    def _forget(self, key, task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+
+    def forget_all(self):
+        """later callers start new reads, the ones in flight still finish"""
+        self._flights.clear()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._flights),
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+        }
+
+
+reads = SingleFlight()
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session):
+    reads.forget_all()
+
+
+async def fetch_all(db, statement, params=None):
+    """
+    (await db.execute(statement, params)).fetchall(), shared with identical
+    concurrent calls. reads on the primary and on a replica are kept apart
+    """
+    params = params or {}
+    if not SINGLE_FLIGHT_ENABLED:
+        return (await db.execute(statement, params)).fetchall()
+
+    async def run():
+        return (await db.execute(statement, params)).fetchall()
+
+    key = (statement, db.bind, tuple(sorted(params.items())))
+    return await reads.do(key, run, _label(statement))
@@ -0,0 +1,143 @@
+"""
+in-memory index of approved venue slots, answers "is venue X free from start to
+end" and "which venues are free from start to end" without scanning bookings.
+sp_ApproveBooking stays the authority on conflicts, this index only keeps the
+booking form from offering venues that would be auto-rejected. it is reloaded
+every VENUE_INDEX_REFRESH seconds to pick up approvals made by other workers
+"""
+
+import asyncio
+import os
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from sqlalchemy import text
+
+VENUE_INDEX_REFRESH = float(os.getenv("VENUE_INDEX_REFRESH", "60"))
+
+
+def _as_datetime(value):
+    """drivers without a DATETIME type (sqlite) hand back strings"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+class VenueSlots:
+    """
+    approved (start, end, booking_id) slots of one venue sorted by start,
+    max_end[i] is the latest end among the first i + 1 slots, so an overlap
+    check is one bisect even if legacy data holds overlapping slots
+    """
+
+    def __init__(self):
+        self.slots = []
+        self.max_end = []
+
+    def _rebuild_max_end(self):
+        self.max_end = []
+        latest = None
+        for _, end, _ in self.slots:
+            latest = end if latest is None or end > latest else latest
+            self.max_end.append(latest)
+
+    def add(self, start, end, booking_id):
+        insort(self.slots, (start, end, booking_id))
+        self._rebuild_max_end()
+
+    def overlaps(self, start, end):
+        """same rule as fn_CheckVenueAvailability: start < old_end and end > old_start"""
+        # slots[:i] are the ones starting before the requested end
+        i = bisect_left(self.slots, (end,))
+        return i > 0 and self.max_end[i - 1] > start
+
+
+class VenueAvailabilityIndex:
+    """
+    VenueSlots per venue plus the venue rows themselves,
+    so the available venues endpoint needs no query once loaded
+    """
+
+    def __init__(self, refresh):
+        self.refresh = refresh
+        self.venues = {}
+        self.slots = {}
+        self.loaded_at = None
+        self._lock = asyncio.Lock()
+
+    async def load(self, db):
+        """(re)build the index from the venues table and approved bookings"""
+        venues = (
+            await db.execute(
+                text("SELECT venue_id, venue_name, location, capacity FROM venues")
+            )
+        ).fetchall()
+        approved = (
+            await db.execute(
+                text(
+                    """
+                    SELECT b.booking_id, b.venue_id, e.start_time, e.end_time
+                    FROM bookings b
+                    JOIN events e ON b.event_id = e.event_id
+                    WHERE b.status = 'Approved'
+                    """
+                )
+            )
+        ).fetchall()
+
+        slots = {row.venue_id: VenueSlots() for row in venues}
+        for row in approved:
+            venue_slots = slots.setdefault(row.venue_id, VenueSlots())
+            venue_slots.slots.append(
+                (
+                    _as_datetime(row.start_time),
+                    _as_datetime(row.end_time),
+                    row.booking_id,
+                )
+            )
+        for venue_slots in slots.values():
+            venue_slots.slots.sort()
+            venue_slots._rebuild_max_end()
+
+        self.venues = {row.venue_id: dict(row._mapping) for row in venues}
+        self.slots = slots
+        self.loaded_at = time.monotonic()
+
+    async def ensure_loaded(self, db):
+        if (
+            self.loaded_at is not None
+            and time.monotonic() - self.loaded_at < self.refresh
+        ):
+            return
+        async with self._lock:
+            # another request may have reloaded while we waited
+            if (
+                self.loaded_at is None
+                or time.monotonic() - self.loaded_at >= self.refresh
+            ):
+                await self.load(db)
+
+    def add_booking(self, booking_id, venue_id, start, end):
+        self.slots.setdefault(venue_id, VenueSlots()).add(
+            _as_datetime(start), _as_datetime(end), booking_id
+        )
+
+    def is_available(self, venue_id, start, end):
+        venue_slots = self.slots.get(venue_id)
+        return venue_slots is None or not venue_slots.overlaps(
+            _as_datetime(start), _as_datetime(end)
+        )
+
+    def available_venues(self, start, end):
+        """venue rows free for the whole of [start, end), by venue name"""
+        start, end = _as_datetime(start), _as_datetime(end)
+        free = [
+            venue
+            for venue_id, venue in self.venues.items()
+            if self.is_available(venue_id, start, end)
+        ]
+        return sorted(free, key=lambda venue: venue["venue_name"])
+
+
+venue_index = VenueAvailabilityIndex(VENUE_INDEX_REFRESH)
@@ -0,0 +1,361 @@
+"""
+waitlists of full events. a student joining one draws the event's next ticket
+(event_seats.next_ticket) and waits in event_waitlist in ticket order. while an
+event has a waitlist sp_RegisterForEvent leaves its free seats alone, the
+promotion worker hands them out: seats are freed by the unregister route and by
+a bigger venue being approved, both nudge the worker, which moves the first
+waiting students into attendees in batches of WAITLIST_BATCH_SIZE. every
+WAITLIST_SWEEP_INTERVAL seconds it also looks at every event with a waitlist,
+for seats freed on other workers.
+
+a student's place in the queue comes from an in-memory Fenwick tree per event
+over its tickets, O(log n) whoever left in between instead of a COUNT over the
+waitlist. the routes and the worker update the index of their own worker, it
+is rebuilt every WAITLIST_INDEX_REFRESH seconds to pick up the other workers'
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import bindparam, text
+
+from backend.http_cache import table_versions
+from backend.pubsub import hub
+
+logger = logging.getLogger(__name__)
+
+WAITLIST_INDEX_REFRESH = float(os.getenv("WAITLIST_INDEX_REFRESH", "60"))
+WAITLIST_BATCH_SIZE = int(os.getenv("WAITLIST_BATCH_SIZE", "100"))
+WAITLIST_SWEEP_INTERVAL = float(os.getenv("WAITLIST_SWEEP_INTERVAL", "30"))
+
+SEATS_FOR_UPDATE = text(
+    """
+    SELECT capacity, seats_taken, next_ticket FROM event_seats
+    WHERE event_id = :event_id
+    FOR UPDATE
+    """
+)
+# the PK (event_id, ticket) is the queue order
+FIRST_WAITING = text(
+    """
+    SELECT ticket, user_id FROM event_waitlist
+    WHERE event_id = :event_id
+    ORDER BY ticket
+    LIMIT :n
+    """
+)
+ALREADY_REGISTERED = text(
+    """
+    SELECT user_id FROM attendees
+    WHERE event_id = :event_id AND user_id IN :user_ids
+    """
+).bindparams(bindparam("user_ids", expanding=True))
+FREE_SEATS = text(
+    """
+    SELECT event_id FROM event_seats
+    WHERE event_id IN :event_ids AND seats_taken < capacity
+    """
+).bindparams(bindparam("event_ids", expanding=True))
+
+
+class TicketQueue:
+    """
+    one event's waitlist: a Fenwick tree over its tickets holding 1 for each
+    ticket still waiting, so the place of a ticket (the tickets waiting up to
+    it) is a prefix sum. the tree starts at the first ticket seen and grows at
+    the end. joins reach the index after their commit, so an earlier ticket
+    can come in late, the tree is then rebuilt from it
+    """
+
+    __slots__ = ("base", "tree", "tickets")
+
+    def __init__(self, first_ticket):
+        self.base = first_ticket - 1
+        # 1-based, tree[i] sums the (i - lowbit(i), i] range
+        self.tree = [0]
+        # user_id -> ticket
+        self.tickets = {}
+
+    def _prefix(self, i):
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def _add(self, ticket, delta):
+        i = ticket - self.base
+        while len(self.tree) <= i:
+            # a new node covers tickets already in the tree, sum them up
+            j = len(self.tree)
+            self.tree.append(self._prefix(j - 1) - self._prefix(j - (j & -j)))
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def _rebase(self, first_ticket):
+        self.base = first_ticket - 1
+        self.tree = [0]
+        for ticket in self.tickets.values():
+            self._add(ticket, 1)
+
+    def add(self, ticket, user_id):
+        if user_id in self.tickets:
+            return
+        if ticket <= self.base:
+            self._rebase(ticket)
+        self.tickets[user_id] = ticket
+        self._add(ticket, 1)
+
+    def remove(self, user_id):
+        ticket = self.tickets.pop(user_id, None)
+        if ticket is not None:
+            self._add(ticket, -1)
+
+    def place(self, ticket):
+        """1-based place of ticket, counted as waiting even if not indexed"""
+        i = min(ticket - self.base - 1, len(self.tree) - 1)
+        return (self._prefix(i) if i > 0 else 0) + 1
+
+    def __len__(self):
+        return len(self.tickets)
+
+
+class WaitlistIndex:
+    def __init__(self, refresh):
+        self.refresh = refresh
+        # event_id -> TicketQueue, events without anyone waiting are dropped
+        self.queues = {}
+        self.loaded_at = None
+        self._lock = asyncio.Lock()
+        # changes made while load() runs, applied to the fresh index too
+        self._replay = None
+
+    def joined(self, event_id, ticket, user_id):
+        if self._replay is not None:
+            self._replay.append(("joined", (event_id, ticket, user_id)))
+        queue = self.queues.get(event_id)
+        if queue is None:
+            queue = self.queues[event_id] = TicketQueue(ticket)
+        queue.add(ticket, user_id)
+
+    def left(self, event_id, user_ids):
+        """the students left the waitlist or were promoted"""
+        if self._replay is not None:
+            self._replay.append(("left", (event_id, user_ids)))
+        queue = self.queues.get(event_id)
+        if queue is None:
+            return
+        for user_id in user_ids:
+            queue.remove(user_id)
+        if not queue:
+            del self.queues[event_id]
+
+    def place(self, event_id, ticket):
+        """(place of ticket, students waiting) in the event's waitlist"""
+        queue = self.queues.get(event_id)
+        if queue is None:
+            return 1, 1
+        place = queue.place(ticket)
+        return place, max(len(queue), place)
+
+    def _build(self, rows):
+        for row in rows:
+            self.joined(row.event_id, row.ticket, row.user_id)
+
+    async def load(self, db):
+        """rebuild the index from the waitlist table"""
+        self._replay = []
+        try:
+            rows = (
+                await db.execute(
+                    text(
+                        """
+                        SELECT event_id, ticket, user_id FROM event_waitlist
+                        ORDER BY event_id, ticket
+                        """
+                    )
+                )
+            ).fetchall()
+            fresh = WaitlistIndex(self.refresh)
+            fresh._build(rows)
+            # joins and promotions of this worker since the read began
+            for method, args in self._replay:
+                getattr(fresh, method)(*args)
+            self.queues = fresh.queues
+        finally:
+            self._replay = None
+        self.loaded_at = time.monotonic()
+
+    async def ensure_loaded(self, db):
+        if (
+            self.loaded_at is not None
+            and time.monotonic() - self.loaded_at < self.refresh
+        ):
+            return
+        async with self._lock:
+            # another request may have reloaded while we waited
+            if (
+                self.loaded_at is None
+                or time.monotonic() - self.loaded_at >= self.refresh
+            ):
+                await self.load(db)
+
+    def stats(self):
+        return {
+            "events": len(self.queues),
+            "waiting": sum(len(queue) for queue in self.queues.values()),
+        }
+
+
+waitlist_index = WaitlistIndex(WAITLIST_INDEX_REFRESH)
+
+
+class PromotionWorker:
+    """background task filling the free seats of events from their waitlist"""
+
+    def __init__(self, batch_size, sweep_interval):
+        self.batch_size = batch_size
+        self.sweep_interval = sweep_interval
+        self._pending = set()
+        self._wake = asyncio.Event()
+        self._task = None
+        self.promoted = 0
+        self.batches = 0
+
+    def nudge(self, event_id):
+        """seats of the event may have freed up, promoted on the next pass"""
+        self._pending.add(event_id)
+        self._wake.set()
+
+    async def _promote_batch(self, db, event_id):
+        """
+        promote up to batch_size students while seats are free, in one
+        transaction holding the event's seat counter row. the user ids
+        promoted, None once there is nothing left to do
+        """
+        seats = (await db.execute(SEATS_FOR_UPDATE, {"event_id": event_id})).fetchone()
+        free = seats.capacity - seats.seats_taken if seats else 0
+        if free <= 0:
+            await db.rollback()
+            return None
+        waiting = (
+            await db.execute(
+                FIRST_WAITING,
+                {"event_id": event_id, "n": min(free, self.batch_size)},
+            )
+        ).fetchall()
+        if not waiting:
+            await db.rollback()
+            return None
+
+        user_ids = [row.user_id for row in waiting]
+        # registered meanwhile (before the event had a waitlist), no seat needed
+        registered = {
+            row.user_id
+            for row in await db.execute(
+                ALREADY_REGISTERED, {"event_id": event_id, "user_ids": user_ids}
+            )
+        }
+        promoted = [user_id for user_id in user_ids if user_id not in registered]
+        if promoted:
+            await db.execute(
+                text(
+                    "INSERT INTO attendees (user_id, event_id) VALUES (:user_id, :event_id)"
+                ),
+                [{"user_id": user_id, "event_id": event_id} for user_id in promoted],
+            )
+            await db.execute(
+                text(
+                    """
+                    UPDATE event_seats SET seats_taken = seats_taken + :n
+                    WHERE event_id = :event_id
+                    """
+                ),
+                {"n": len(promoted), "event_id": event_id},
+            )
+        # the batch is the front of the queue
+        await db.execute(
+            text(
+                """
+                DELETE FROM event_waitlist
+                WHERE event_id = :event_id AND ticket <= :last_ticket
+                """
+            ),
+            {"event_id": event_id, "last_ticket": waiting[-1].ticket},
+        )
+        await db.commit()
+        waitlist_index.left(event_id, user_ids)
+        self.batches += 1
+        self.promoted += len(promoted)
+        return promoted
+
+    async def promote(self, db, event_id):
+        """fill the event's free seats from its waitlist, the number promoted"""
+        total = 0
+        while True:
+            promoted = await self._promote_batch(db, event_id)
+            if promoted is None:
+                break
+            total += len(promoted)
+        if total:
+            await table_versions.bump("attendees", "event_waitlist")
+            hub.attendees_changed(event_id)
+        return total
+
+    async def _sweep(self, db):
+        """the events with a waitlist and a free seat"""
+        await waitlist_index.ensure_loaded(db)
+        event_ids = list(waitlist_index.queues)
+        if not event_ids:
+            return set()
+        rows = await db.execute(FREE_SEATS, {"event_ids": event_ids})
+        return {row.event_id for row in rows}
+
+    async def _loop(self, session_factory):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.sweep_interval)
+                sweep = False
+            except asyncio.TimeoutError:
+                sweep = True
+            self._wake.clear()
+            event_ids, self._pending = self._pending, set()
+            try:
+                async with session_factory() as db:
+                    if sweep:
+                        event_ids |= await self._sweep(db)
+                    for event_id in sorted(event_ids):
+                        try:
+                            await self.promote(db, event_id)
+                        except Exception:
+                            await db.rollback()
+                            logger.warning(
+                                "waitlist promotion of event %s failed",
+                                event_id,
+                                exc_info=True,
+                            )
+            except Exception:
+                logger.warning("waitlist sweep failed", exc_info=True)
+
+    def start(self, session_factory):
+        self._task = asyncio.create_task(self._loop(session_factory))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "promoted": self.promoted,
+            "batches": self.batches,
+            **waitlist_index.stats(),
+        }
+
+
+promotion_worker = PromotionWorker(WAITLIST_BATCH_SIZE, WAITLIST_SWEEP_INTERVAL)
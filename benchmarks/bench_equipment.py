@@ -0,0 +1,117 @@
+"""
+equipment availability checks (backend.equipment.availability) against
+DATABASE_URL, meant for a database filled by benchmarks.seed: p50/p95 of the
+free units of the most reserved item over random upcoming windows, then again
+after giving it a reservation for up to --grow past bookings, which the window
+index should skip. the added reservations are rolled back
+
+    python -m benchmarks.bench_equipment --checks 200 --grow 10000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from backend.db import AsyncSessionLocal
+from backend.equipment import availability
+from benchmarks.scenarios import percentiles
+
+
+async def report(db, equipment_id, label, args, rng):
+    reserved = (
+        await db.execute(
+            text("SELECT COUNT(*) FROM booking_equipment WHERE equipment_id = :id"),
+            {"id": equipment_id},
+        )
+    ).scalar_one()
+    now = datetime.now().replace(microsecond=0)
+    timings, free = [], []
+    for _ in range(args.checks):
+        start = now + timedelta(minutes=rng.randint(0, args.future_days * 24 * 60))
+        end = start + timedelta(hours=rng.randint(1, 6))
+        began = time.perf_counter()
+        _, pieces = await availability(db, equipment_id, start, end)
+        timings.append((time.perf_counter() - began) * 1000)
+        free.append(min(units for _, _, units in pieces))
+    p = percentiles(timings)
+    print(
+        f"{label:<10} item {equipment_id}: {reserved:>6} reservations  "
+        f"p50 {p['p50']:6.2f}  p95 {p['p95']:6.2f} ms  "
+        f"(free units seen {min(free)}..{max(free)})"
+    )
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    async with AsyncSessionLocal() as db:
+        busiest = (
+            await db.execute(
+                text(
+                    """
+                    SELECT equipment_id, COUNT(*) AS n FROM booking_equipment
+                    GROUP BY equipment_id ORDER BY n DESC LIMIT 1
+                    """
+                )
+            )
+        ).fetchone()
+        if busiest is None:
+            print("no reservations, fill the database with benchmarks.seed first")
+            return
+        await report(db, busiest.equipment_id, "seeded", args, rng)
+
+        past = (
+            await db.execute(
+                text(
+                    """
+                    SELECT b.booking_id, e.start_time, e.end_time
+                    FROM bookings b
+                    JOIN events e ON b.event_id = e.event_id
+                    WHERE e.end_time < :now AND NOT EXISTS (
+                        SELECT 1 FROM booking_equipment be
+                        WHERE be.booking_id = b.booking_id
+                          AND be.equipment_id = :equipment_id
+                    )
+                    LIMIT :grow
+                    """
+                ),
+                {
+                    "now": datetime.now(),
+                    "equipment_id": busiest.equipment_id,
+                    "grow": args.grow,
+                },
+            )
+        ).fetchall()
+        if past:
+            await db.execute(
+                text(
+                    """
+                    INSERT INTO booking_equipment
+                    (booking_id, equipment_id, quantity, start_time, end_time)
+                    VALUES (:booking_id, :equipment_id, 1, :start_time, :end_time)
+                    """
+                ),
+                [
+                    {
+                        "booking_id": row.booking_id,
+                        "equipment_id": busiest.equipment_id,
+                        "start_time": row.start_time,
+                        "end_time": row.end_time,
+                    }
+                    for row in past
+                ],
+            )
+            await report(db, busiest.equipment_id, f"+{len(past)}", args, rng)
+        await db.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--checks", type=int, default=200)
+    parser.add_argument("--grow", type=int, default=10_000)
+    parser.add_argument("--future-days", type=int, default=180)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
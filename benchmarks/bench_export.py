@@ -0,0 +1,116 @@
+"""
+exports a million synthetic rows through backend.export and fails if the
+process' peak RSS grows by more than --max-rss-mb while doing it. the rows come
+from a recursive CTE shaped like audit_log, so no table has to be filled.
+--fetchall runs the old fetchall + dict approach for comparison (no ceiling)
+
+uses DATABASE_URL when set (mysql 8 or sqlite), else a throwaway sqlite file
+
+    python -m benchmarks.bench_export --rows 1000000 --max-rss-mb 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = (
+        f"sqlite+aiosqlite:///{tempfile.gettempdir()}/evently_bench_export.db"
+    )
+
+from sqlalchemy import event, text  # noqa: E402
+
+from backend.db import engine  # noqa: E402
+from backend.export import export_rows  # noqa: E402
+
+SYNTHETIC_AUDIT_LOG = text(
+    """
+    WITH RECURSIVE seq (n) AS (
+        SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows
+    )
+    SELECT n AS log_id,
+           '2030-01-01 10:00:00' AS log_timestamp,
+           'USER_CREATED' AS action_type,
+           CONCAT('synthetic audit entry number ', n) AS details
+    FROM seq
+    """
+)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _allow_deep_recursion(dbapi_conn, conn_record):
+    cursor = dbapi_conn.cursor()
+    if engine.dialect.name == "mysql":
+        cursor.execute("SET SESSION cte_max_recursion_depth = 100000000")
+    cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    # sqlite has no CONCAT before 3.44
+    SYNTHETIC_AUDIT_LOG = text(
+        SYNTHETIC_AUDIT_LOG.text.replace(
+            "CONCAT('synthetic audit entry number ', n)",
+            "'synthetic audit entry number ' || n",
+        )
+    )
+
+
+def peak_rss_mb():
+    """ru_maxrss is in KiB on linux, bytes on macos"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def streamed(n_rows, fmt):
+    sent = 0
+    async for chunk in export_rows(SYNTHETIC_AUDIT_LOG, {"rows": n_rows}, fmt):
+        sent += len(chunk)
+    return sent
+
+
+async def fetched_all(n_rows, fmt):
+    """what get_audit_log does, scaled up: every row in memory first"""
+    async with engine.connect() as conn:
+        rows = (await conn.execute(SYNTHETIC_AUDIT_LOG, {"rows": n_rows})).fetchall()
+    body = [json.dumps(dict(row._mapping), default=str) for row in rows]
+    return sum(len(line) + 1 for line in body)
+
+
+async def main(n_rows, fmt, max_rss_mb, fetchall):
+    # warm up imports, the pool and the driver before taking the baseline
+    await streamed(10, fmt)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    sent = await (fetched_all if fetchall else streamed)(n_rows, fmt)
+    elapsed = time.perf_counter() - start
+    growth = peak_rss_mb() - baseline
+    await engine.dispose()
+
+    mode = "fetchall" if fetchall else "streamed"
+    print(
+        f"{mode} {fmt}: {n_rows} rows, {sent / 1e6:.1f} MB in {elapsed:.2f}s "
+        f"({n_rows / elapsed:.0f} rows/s), peak RSS +{growth:.1f} MB"
+    )
+    if fetchall:
+        return 0
+    ok = growth <= max_rss_mb
+    print(f"OK: under {max_rss_mb} MB" if ok else f"FAIL: over the {max_rss_mb} MB cap")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--max-rss-mb", type=float, default=64)
+    parser.add_argument("--fetchall", action="store_true")
+    args = parser.parse_args()
+    raise SystemExit(
+        asyncio.run(main(args.rows, args.format, args.max_rss_mb, args.fetchall))
+    )
@@ -0,0 +1,119 @@
+"""
+facet counts and filtered pages of the event browser (backend.facet_index)
+over a synthetic catalog of upcoming events: p50/p95 per filter combination,
+against counting the same facets with one pass over every event (what a
+GROUP BY over the events join does). the counts of both are compared, needs no
+database
+
+    python -m benchmarks.bench_facets --events 100000 --repeat 100
+"""
+
+import argparse
+import random
+import statistics
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+
+from backend.facet_index import EventFacetIndex
+
+Row = namedtuple("Row", "event_id start_time club_id has_venue")
+
+
+def filter_sets(today):
+    week = (today + timedelta(days=7), today + timedelta(days=13))
+    return {
+        "no filter": {},
+        "category": {"category_id": 3},
+        "club": {"club_id": 17},
+        "club+category": {"club_id": 17, "category_id": 3},
+        "has venue": {"has_venue": True},
+        "next week": {"from_date": week[0], "to_date": week[1]},
+        "week+category+venue": {
+            "from_date": week[0],
+            "to_date": week[1],
+            "category_id": 3,
+            "has_venue": True,
+        },
+    }
+
+
+def scan(index, club_id=None, category_id=None, has_venue=False, **dates):
+    """the facets counted from every event, the baseline"""
+    from_date, to_date = dates.get("from_date"), dates.get("to_date")
+    total, clubs, categories = 0, Counter(), Counter()
+    for event in index.events.values():
+        day = event.start.date()
+        if (
+            (has_venue and not event.has_venue)
+            or (from_date and day < from_date)
+            or (to_date and day > to_date)
+        ):
+            continue
+        in_category = category_id is None or category_id in event.category_ids
+        in_club = club_id is None or event.club_id == club_id
+        if in_category:
+            clubs[event.club_id] += 1
+        if in_club:
+            categories.update(event.category_ids)
+        if in_club and in_category:
+            total += 1
+    return total, clubs, categories
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    q = statistics.quantiles(timings, n=20, method="inclusive")
+    return result, q[9], q[18]
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    now = datetime.now().replace(microsecond=0)
+    rows = [
+        Row(
+            event_id,
+            now + timedelta(minutes=rng.randint(60, 365 * 24 * 60)),
+            rng.randint(1, args.clubs),
+            rng.random() < 0.6,
+        )
+        for event_id in range(1, args.events + 1)
+    ]
+    categories = {
+        row.event_id: rng.sample(range(1, args.categories + 1), rng.randint(1, 2))
+        for row in rows
+    }
+    index = EventFacetIndex(refresh=float("inf"))
+    start = time.perf_counter()
+    index._build(rows, categories)
+    print(
+        f"{args.events} events indexed in {time.perf_counter() - start:.1f}s, "
+        f"{index.stats()}"
+    )
+
+    for label, filters in filter_sets(now.date()).items():
+        counts, p50, p95 = timed(lambda: index.facets(**filters), args.repeat)
+        expected, scan50, _ = timed(lambda: scan(index, **filters), 3)
+        assert counts == expected, f"{label}: counts differ from the scan"
+        (ids, _), page50, _ = timed(
+            lambda: index.page(args.limit, **filters), args.repeat
+        )
+        print(
+            f"{label:<20} {counts[0]:>7} events  facets p50 {p50:6.2f} "
+            f"p95 {p95:6.2f} ms (scan {scan50:7.1f} ms)  page p50 {page50:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--clubs", type=int, default=200)
+    parser.add_argument("--categories", type=int, default=7)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
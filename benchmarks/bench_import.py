@@ -0,0 +1,101 @@
+"""
+students onboarded per second through the bulk import route against one
+/student/signup call per student. runs the app in-process against
+DATABASE_URL and writes to it, use a database filled by benchmarks.seed (or
+--create-schema on an empty sqlite one). every --bad-every'th generated
+record is invalid, to show the per-record error report
+
+    python -m benchmarks.bench_import --students 5000 --signups 200
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import secrets
+import time
+
+import httpx
+
+from backend.auth import ADMIN, issue_token
+from backend.bulk_import import IMPORT_BATCH_SIZE, IMPORT_BCRYPT_ROUNDS
+from backend.main import app
+from backend.passwords import PASSWORD_WORKERS
+from benchmarks.seed import SEED_EMAIL_DOMAIN, create_schema, insert
+
+FIELDS = ["first_name", "last_name", "email", "password", "phone", "address_city"]
+
+
+def students(n, bad_every, run_id):
+    for i in range(n):
+        email = f"import.{run_id}.{i}@{SEED_EMAIL_DOMAIN}"
+        if bad_every and i % bad_every == bad_every - 1:
+            email = "not-an-email"
+        yield {
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+            "email": email,
+            "password": "password",
+            "phone": f"9{i:09d}",
+            "address_city": "Bengaluru",
+        }
+
+
+def csv_body(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def main(args):
+    if args.create_schema:
+        await create_schema()
+        # the signup and import routes look the student role up by name
+        await insert("roles", ["role_id", "role_name"], [(1, "Student")], 1)
+    run_id = secrets.token_hex(3)
+    headers = {"Authorization": f"Bearer {issue_token(1, ADMIN)}"}
+    print(
+        f"batch size {IMPORT_BATCH_SIZE}, bcrypt rounds {IMPORT_BCRYPT_ROUNDS}, "
+        f"{PASSWORD_WORKERS} password workers"
+    )
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            if args.signups:
+                start = time.perf_counter()
+                for student in students(args.signups, 0, f"{run_id}s"):
+                    response = await client.post("/student/signup", json=student)
+                    response.raise_for_status()
+                elapsed = time.perf_counter() - start
+                print(
+                    f"signup:  {args.signups:>7} students in {elapsed:7.1f}s  "
+                    f"{args.signups / elapsed:8.1f}/s"
+                )
+
+            body = csv_body(students(args.students, args.bad_every, run_id))
+            start = time.perf_counter()
+            response = await client.post(
+                "/admin/students/import?format=csv", content=body, headers=headers
+            )
+            response.raise_for_status()
+            elapsed = time.perf_counter() - start
+            summary = response.json()
+            print(
+                f"import:  {summary['imported']:>7} students in {elapsed:7.1f}s  "
+                f"{summary['imported'] / elapsed:8.1f}/s, {summary['failed']} "
+                f"rejected, e.g. {summary['errors'][:1]}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--signups", type=int, default=200)
+    parser.add_argument("--bad-every", type=int, default=100)
+    parser.add_argument("--create-schema", action="store_true")
+    asyncio.run(main(parser.parse_args()))
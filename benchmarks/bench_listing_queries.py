@@ -0,0 +1,184 @@
+"""
+compares the per-row stored function listings against the set based ones
+used by get_club_events and get_pending_bookings, at growing table sizes
+
+needs a mysql database with ddl.sql loaded (the fn_* functions must exist),
+synthetic rows are inserted inside a transaction that is rolled back at the end
+
+    python -m benchmarks.bench_listing_queries --scales 100 1000 5000
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from backend.db import engine
+
+CLUB_EVENTS_PER_ROW = """
+SELECT e.event_id, b.status, fn_GetAttendeeCount(e.event_id) AS attendee_count
+FROM events e
+LEFT JOIN bookings b ON e.event_id = b.event_id
+WHERE e.club_id = :club_id
+"""
+
+CLUB_EVENTS_SET_BASED = """
+SELECT e.event_id, b.status, COUNT(a.user_id) AS attendee_count
+FROM events e
+LEFT JOIN bookings b ON e.event_id = b.event_id
+LEFT JOIN attendees a ON a.event_id = e.event_id
+WHERE e.club_id = :club_id
+GROUP BY e.event_id, b.booking_id, b.status
+"""
+
+PENDING_PER_ROW = """
+SELECT b.booking_id,
+       fn_CheckVenueAvailability(b.venue_id, e.start_time, e.end_time) AS is_available
+FROM bookings b
+JOIN events e ON b.event_id = e.event_id
+WHERE b.status = 'Pending'
+"""
+
+PENDING_SET_BASED = """
+SELECT b.booking_id, COUNT(ap.booking_id) = 0 AS is_available
+FROM bookings b
+JOIN events e ON b.event_id = e.event_id
+LEFT JOIN (
+    SELECT ab.booking_id, ab.venue_id, ae.start_time, ae.end_time
+    FROM bookings ab
+    JOIN events ae ON ab.event_id = ae.event_id
+    WHERE ab.status = 'Approved'
+) ap ON ap.venue_id = b.venue_id
+    AND e.start_time < ap.end_time AND e.end_time > ap.start_time
+WHERE b.status = 'Pending'
+GROUP BY b.booking_id
+"""
+
+
+async def seed(conn, n_events, attendees_per_event):
+    """insert one club, a few venues and n_events events with bookings and attendees"""
+    club_id = (
+        await conn.execute(
+            text("INSERT INTO clubs (club_name) VALUES (:n)"),
+            {"n": f"bench club {time.time_ns()}"},
+        )
+    ).lastrowid
+    venue_ids = [
+        (
+            await conn.execute(
+                text("INSERT INTO venues (venue_name, capacity) VALUES (:n, 100)"),
+                {"n": f"bench venue {i}"},
+            )
+        ).lastrowid
+        for i in range(10)
+    ]
+    user_ids = [
+        (
+            await conn.execute(
+                text(
+                    """
+                    INSERT INTO users (first_name, last_name, email, password_hash, role_id)
+                    VALUES ('bench', 'user', :email, 'x',
+                            (SELECT role_id FROM roles WHERE role_name = 'Student'))
+                    """
+                ),
+                {"email": f"bench{time.time_ns()}_{i}@example.com"},
+            )
+        ).lastrowid
+        for i in range(attendees_per_event)
+    ]
+
+    base = datetime(2030, 1, 1)
+    events, bookings, attendees = [], [], []
+    for i in range(n_events):
+        start = base + timedelta(hours=i)
+        events.append(
+            {
+                "name": f"bench event {i}",
+                "start": start,
+                "end": start + timedelta(hours=2),
+                "club_id": club_id,
+            }
+        )
+    await conn.execute(
+        text(
+            """
+            INSERT INTO events (event_name, start_time, end_time, club_id)
+            VALUES (:name, :start, :end, :club_id)
+            """
+        ),
+        events,
+    )
+    event_ids = [
+        row.event_id
+        for row in await conn.execute(
+            text("SELECT event_id FROM events WHERE club_id = :c ORDER BY event_id"),
+            {"c": club_id},
+        )
+    ]
+    for i, event_id in enumerate(event_ids):
+        bookings.append(
+            {
+                "event_id": event_id,
+                "venue_id": venue_ids[i % len(venue_ids)],
+                "user_id": user_ids[0] if user_ids else None,
+                "status": "Approved" if i % 2 else "Pending",
+            }
+        )
+        attendees.extend({"u": u, "e": event_id} for u in user_ids)
+    await conn.execute(
+        text(
+            """
+            INSERT INTO bookings (event_id, venue_id, requested_by, status)
+            VALUES (:event_id, :venue_id, :user_id, :status)
+            """
+        ),
+        bookings,
+    )
+    if attendees:
+        await conn.execute(
+            text("INSERT INTO attendees (user_id, event_id) VALUES (:u, :e)"),
+            attendees,
+        )
+    return club_id
+
+
+async def timed(conn, sql, params, repeat):
+    """best of repeat runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        (await conn.execute(text(sql), params)).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def main(scales, attendees_per_event, repeat):
+    print(f"{'events':>8} {'query':<12} {'per-row ms':>12} {'set-based ms':>14}")
+    for n in scales:
+        async with engine.connect() as conn:
+            trans = await conn.begin()
+            try:
+                club_id = await seed(conn, n, attendees_per_event)
+                params = {"club_id": club_id}
+                for name, old, new, p in (
+                    ("club_events", CLUB_EVENTS_PER_ROW, CLUB_EVENTS_SET_BASED, params),
+                    ("pending", PENDING_PER_ROW, PENDING_SET_BASED, {}),
+                ):
+                    old_ms = await timed(conn, old, p, repeat)
+                    new_ms = await timed(conn, new, p, repeat)
+                    print(f"{n:>8} {name:<12} {old_ms:>12.2f} {new_ms:>14.2f}")
+            finally:
+                await trans.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--attendees-per-event", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.scales, args.attendees_per_event, args.repeat))
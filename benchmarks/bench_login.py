@@ -0,0 +1,82 @@
+"""
+login storm: N concurrent bcrypt verifications done the old way (threadpool,
+sharing the GIL with the request worker) vs on the password process pool.
+reports p50/p95/p99 of the verifications and of a trivial concurrent
+"other endpoint" coroutine, which shows how much the storm stalls everything else
+
+no database needed
+
+    python -m benchmarks.bench_login --logins 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.passwords import password_pool, pwd_context, verify_password
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": q[49], "p95": q[94], "p99": q[98], "max": samples[-1]}
+
+
+async def storm(verify, stored_hash, n_logins):
+    """run n_logins verifications at once while pinging the loop every 10ms"""
+    login_ms, ping_ms = [], []
+    done = asyncio.Event()
+
+    async def login():
+        start = time.perf_counter()
+        await verify("correct horse", stored_hash)
+        login_ms.append((time.perf_counter() - start) * 1000)
+
+    async def other_endpoint():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            # anything beyond the 10ms sleep is time the loop could not run us
+            ping_ms.append((time.perf_counter() - start) * 1000 - 10)
+
+    pinger = asyncio.create_task(other_endpoint())
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(n_logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await pinger
+    return elapsed, percentiles(login_ms), percentiles(ping_ms)
+
+
+async def inline_verify(password, password_hash):
+    """what the handlers did before: bcrypt on a thread of this process"""
+    return await run_in_threadpool(pwd_context.verify, password, password_hash)
+
+
+async def main(n_logins):
+    stored_hash = pwd_context.hash("correct horse")
+    password_pool.queue_limit = n_logins  # measure latency, not 429s
+    # start the pool processes before timing
+    await asyncio.gather(
+        *(verify_password("x", stored_hash) for _ in range(password_pool.workers))
+    )
+
+    for name, verify in (
+        ("threadpool", inline_verify),
+        ("process pool", verify_password),
+    ):
+        elapsed, logins, pings = await storm(verify, stored_hash, n_logins)
+        print(f"{name}: {n_logins} logins in {elapsed:.2f}s")
+        print("  login ms      " + "  ".join(f"{k}={v:.0f}" for k, v in logins.items()))
+        print("  loop stall ms " + "  ".join(f"{k}={v:.1f}" for k, v in pings.items()))
+    password_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
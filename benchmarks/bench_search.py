@@ -0,0 +1,104 @@
+"""
+event search latency of the in-memory inverted index (backend.search_index)
+over a synthetic catalog: build time, memory, and p50/p95 per query shape
+(common word, rare word, short prefix, several words). needs no database,
+memory is the peak rss growth as linux reports it
+
+    python -m benchmarks.bench_search --events 100000 --repeat 200
+"""
+
+import argparse
+import random
+import resource
+import statistics
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from backend.search_index import EventSearchIndex
+
+Row = namedtuple("Row", "event_id event_name description start_time club_id")
+
+TOPICS = (
+    "robotics chess drama poetry football cricket hackathon photography music "
+    "dance debate quiz astronomy chemistry coding startup finance marketing "
+    "design painting theatre film literature yoga marathon gaming blockchain "
+    "machine learning security cloud biology history economics volunteering"
+).split()
+KINDS = (
+    "workshop meetup tournament seminar talk bootcamp showcase festival "
+    "competition screening jam night session masterclass panel fair"
+).split()
+FILLER = (
+    "join us learn build meet share students campus beginners advanced hands "
+    "practice experts guest speaker team prizes snacks open everyone free "
+    "register project demo discussion networking certificate weekend evening"
+).split()
+CATEGORIES = ["Tech", "Arts", "Music", "Sports", "Career", "Culture", "Social"]
+
+QUERIES = {
+    "common word": "workshop",
+    "rare word": "astronomy screening",
+    "short prefix": "ro",
+    "typing prefix": "photog",
+    "several words": "machine learning bootcamp beginners",
+    "club name": "chess club",
+}
+
+
+def synthetic_events(n, clubs, rng):
+    now = datetime.now().replace(microsecond=0)
+    for event_id in range(1, n + 1):
+        topic = rng.choice(TOPICS)
+        name = f"{topic.title()} {rng.choice(KINDS).title()} {event_id % 97}"
+        description = " ".join(rng.choices(FILLER, k=rng.randint(8, 30)))
+        start = now + timedelta(hours=rng.randint(-2000, 4000))
+        yield Row(
+            event_id, name, f"{topic} {description}", start, rng.randint(1, clubs)
+        )
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    index = EventSearchIndex(refresh=float("inf"))
+    index.clubs = {
+        club_id: f"{rng.choice(TOPICS).title()} Club {club_id}"
+        for club_id in range(1, args.clubs + 1)
+    }
+    rows = list(synthetic_events(args.events, args.clubs, rng))
+    categories = {
+        row.event_id: rng.sample(CATEGORIES, rng.randint(0, 2)) for row in rows
+    }
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    index._build(rows, categories)
+    build = time.perf_counter() - start
+    # peak resident set growth, in KiB on linux
+    grown = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+    print(
+        f"{args.events} events indexed in {build:.1f}s, "
+        f"+{grown / 1024:.0f} MiB peak rss, {index.stats()}"
+    )
+
+    for label, query in QUERIES.items():
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            total, ranked = index.search(query, args.limit)
+            timings.append((time.perf_counter() - start) * 1000)
+        q = statistics.quantiles(timings, n=20, method="inclusive")
+        print(
+            f"{label:<14} {query!r:<40} {total:>7} matches  "
+            f"p50 {q[9]:7.2f}  p95 {q[18]:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--clubs", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
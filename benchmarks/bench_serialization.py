@@ -0,0 +1,100 @@
+"""
+per-request CPU of turning a page of listing rows into the response body:
+the old path (text() built per call, rows copied into dicts, FastAPI's
+jsonable_encoder, JSONResponse) against the new one (a statement from
+backend.queries, rows handed to RowJSONResponse as they are).
+the rows come from an in-memory sqlite db so no server is needed, fetching them
+costs the same on both paths and is left out
+
+    python -m benchmarks.bench_serialization --page-sizes 50 200 --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from backend import queries  # noqa: E402
+from backend.serialization import RowJSONResponse, orjson  # noqa: E402
+
+# a synthetic page shaped like the upcoming events listing
+SYNTHETIC_EVENTS = """
+WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows)
+SELECT n AS event_id, 'event number ' || n AS event_name,
+       'a description long enough to look like a real one' AS description,
+       '2030-01-01 10:00:00' AS start_time, '2030-01-01 12:00:00' AS end_time,
+       'Chess Club' AS club_name, 'Main Hall' AS venue_name,
+       'North Campus' AS venue_location
+FROM seq
+"""
+
+
+def fetch_page(n_rows):
+    engine = create_engine("sqlite://")
+    statement = text(SYNTHETIC_EVENTS).columns(**queries.STUDENT_EVENT_COLUMNS)
+    with engine.connect() as conn:
+        return conn.execute(statement, {"rows": n_rows}).fetchall()
+
+
+async def old_path(rows):
+    # every handler used to build its statement per call
+    text(SYNTHETIC_EVENTS)
+    events = [
+        {
+            "event_id": row.event_id,
+            "event_name": row.event_name,
+            "description": row.description,
+            "start_time": row.start_time,
+            "end_time": row.end_time,
+            "club_name": row.club_name,
+            "venue_name": row.venue_name,
+            "venue_location": row.venue_location,
+        }
+        for row in rows
+    ]
+    content = await serialize_response(
+        response_content={"student_id": 1, "events": events, "next_cursor": None}
+    )
+    return JSONResponse(content).body
+
+
+async def new_path(rows):
+    return RowJSONResponse({"student_id": 1, "events": rows, "next_cursor": None}).body
+
+
+async def cpu_per_request(path, rows, n_requests):
+    """mean CPU microseconds of one call"""
+    await path(rows)
+    start = time.process_time()
+    for _ in range(n_requests):
+        await path(rows)
+    return (time.process_time() - start) / n_requests * 1e6
+
+
+async def main(page_sizes, n_requests):
+    print(f"encoder: {'orjson' if orjson is not None else 'json (orjson missing)'}")
+    for size in page_sizes:
+        rows = fetch_page(size)
+        assert (await old_path(rows)) == (
+            await new_path(rows)
+        ), "the two paths disagree"
+        old = await cpu_per_request(old_path, rows, n_requests)
+        new = await cpu_per_request(new_path, rows, n_requests)
+        print(
+            f"{size:>5} rows: old {old:8.1f} us  new {new:8.1f} us  "
+            f"saved {old - new:8.1f} us/request ({old / new:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.page_sizes, args.requests))
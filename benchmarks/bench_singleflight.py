@@ -0,0 +1,86 @@
+"""
+bursts of identical concurrent reads, with and without single-flight: how many
+sql statements each burst of --concurrency requests ran and its p50/p95/p99
+latency. runs the app in-process against DATABASE_URL, meant for a database
+filled by benchmarks.seed; nothing is written
+
+    python -m benchmarks.bench_singleflight --concurrency 200 --bursts 20
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import event
+
+from backend import singleflight
+from backend.auth import ADMIN, CLUB_MEMBER, STUDENT, issue_token
+from backend.cache import catalog_cache
+from backend.db import engine
+from backend.main import app
+from benchmarks.scenarios import percentiles
+
+# endpoint, role of the callers, any valid id does, tokens are not looked up
+ENDPOINTS = [
+    ("/student/{user_id}/events", STUDENT),
+    ("/club/venues", CLUB_MEMBER),
+    ("/admin/bookings/pending", ADMIN),
+]
+
+statements = 0
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+async def burst(client, path, role, concurrency):
+    """latencies (ms) of concurrency identical requests sent at once"""
+
+    async def one(user_id):
+        token = issue_token(user_id, role, 1)
+        start = time.perf_counter()
+        response = await client.get(
+            path.format(user_id=user_id), headers={"Authorization": f"Bearer {token}"}
+        )
+        response.raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    # the catalog cache would answer all but the first, measure the db path
+    await catalog_cache.invalidate()
+    return await asyncio.gather(
+        *(one(user_id) for user_id in range(1, concurrency + 1))
+    )
+
+
+async def main(args):
+    global statements
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=60
+        ) as client:
+            for path, role in ENDPOINTS:
+                for enabled in (False, True):
+                    singleflight.SINGLE_FLIGHT_ENABLED = enabled
+                    statements, latencies = 0, []
+                    for _ in range(args.bursts):
+                        latencies += await burst(client, path, role, args.concurrency)
+                    p = percentiles(latencies)
+                    print(
+                        f"{path:<28} single-flight {'on ' if enabled else 'off'}  "
+                        f"{statements / args.bursts:7.1f} statements/burst  "
+                        f"p50 {p['p50']:7.1f}  p95 {p['p95']:7.1f}  "
+                        f"p99 {p['p99']:7.1f} ms"
+                    )
+    print(singleflight.reads.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--bursts", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,81 @@
+"""
+waitlist places (backend.waitlist.TicketQueue) over a synthetic queue where
+students keep joining at the back, leaving from anywhere and being promoted
+from the front: p50/p95 of a place lookup against counting the tickets ahead
+(what a COUNT over the waitlist does). the places of both are compared, needs
+no database
+
+    python -m benchmarks.bench_waitlist --waiting 100000 --lookups 1000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from bisect import bisect_left, insort
+
+from backend.waitlist import TicketQueue
+
+
+def timed(fn, args):
+    timings, results = [], []
+    for arg in args:
+        start = time.perf_counter()
+        results.append(fn(arg))
+        timings.append((time.perf_counter() - start) * 1000)
+    q = statistics.quantiles(timings, n=20, method="inclusive")
+    return results, q[9], q[18]
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    queue = TicketQueue(1)
+    # the tickets waiting, sorted, for the baseline count
+    waiting = []
+    next_ticket = 1
+    start = time.perf_counter()
+    for _ in range(args.waiting):
+        queue.add(next_ticket, next_ticket)
+        waiting.append(next_ticket)
+        next_ticket += 1
+    print(f"{args.waiting} joins in {time.perf_counter() - start:.2f}s")
+
+    for label in ("joined", "churned"):
+        if label == "churned":
+            # leaves from anywhere, promotions from the front, new joins
+            for _ in range(args.churn):
+                move = rng.random()
+                if move < 0.4 and waiting:
+                    ticket = waiting.pop(rng.randrange(len(waiting)))
+                    queue.remove(ticket)
+                elif move < 0.42 and waiting:
+                    for ticket in waiting[: args.batch]:
+                        queue.remove(ticket)
+                    del waiting[: args.batch]
+                else:
+                    queue.add(next_ticket, next_ticket)
+                    insort(waiting, next_ticket)
+                    next_ticket += 1
+        probes = [rng.choice(waiting) for _ in range(args.lookups)]
+        places, p50, p95 = timed(queue.place, probes)
+        counted, count50, _ = timed(
+            lambda ticket: sum(1 for t in waiting if t < ticket) + 1,
+            probes[: args.count_lookups],
+        )
+        assert places[: args.count_lookups] == counted, "places differ from the count"
+        assert places == [bisect_left(waiting, t) + 1 for t in probes]
+        print(
+            f"{label:<8} {len(queue):>7} waiting  place p50 {p50 * 1000:6.2f} "
+            f"p95 {p95 * 1000:6.2f} us  (count p50 {count50:7.2f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--waiting", type=int, default=100_000)
+    parser.add_argument("--churn", type=int, default=50_000)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--count-lookups", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,117 @@
+"""
+checks the read replica routing of backend.db against two local sqlite files,
+one standing in for the primary and one for a replica: GETs read from the
+replica, a user who just wrote reads from the primary, and reads fail over to
+the primary once the replica is gone. the venue is named differently in each
+file, so /club/venues shows which one answered. exits non-zero on a failure
+
+    python -m benchmarks.check_replicas
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+WORKDIR = Path(tempfile.mkdtemp(prefix="evently_replicas_"))
+PRIMARY = WORKDIR / "primary.db"
+# in a directory of its own, removing it makes the replica unreachable
+REPLICA = WORKDIR / "replica" / "replica.db"
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{PRIMARY}"
+os.environ["DATABASE_REPLICA_URLS"] = f"sqlite+aiosqlite:///{REPLICA}"
+# health checks are run by hand below, the background loop only runs once
+os.environ["REPLICA_CHECK_INTERVAL"] = "3600"
+
+import httpx  # noqa: E402
+
+from backend.auth import CLUB_MEMBER, issue_token  # noqa: E402
+from backend.db import engine, replicas  # noqa: E402
+from backend.main import app  # noqa: E402
+from benchmarks.seed import create_schema, insert  # noqa: E402
+
+CLUB_ID = 1
+
+
+async def setup():
+    """schema and a few rows on the primary, copied to the replica"""
+    await create_schema()
+    for table, columns, rows in [
+        ("roles", ["role_id", "role_name"], [(2, "Club Member")]),
+        ("clubs", ["club_id", "club_name", "description"], [(CLUB_ID, "Chess", "")]),
+        ("venues", ["venue_id", "venue_name", "location", "capacity"], [(1, "", "", 50)]),
+        (
+            "events",
+            ["event_id", "event_name", "description", "start_time", "end_time", "club_id"],
+            [(1, "Opening", "", "2030-01-01 10:00:00", "2030-01-01 12:00:00", CLUB_ID)],
+        ),
+    ]:  # fmt: skip
+        await insert(table, columns, rows, 100)
+    await engine.dispose()
+    REPLICA.parent.mkdir()
+    shutil.copy(PRIMARY, REPLICA)
+    for path, name in [(PRIMARY, "primary"), (REPLICA, "replica")]:
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE venues SET venue_name = ?", (name,))
+
+
+def headers(user_id):
+    return {"Authorization": f"Bearer {issue_token(user_id, CLUB_MEMBER, CLUB_ID)}"}
+
+
+async def answered_by(client, user_id):
+    """which database served this user's /club/venues"""
+    response = await client.get("/club/venues", headers=headers(user_id))
+    response.raise_for_status()
+    return response.json()[0]["venue_name"]
+
+
+async def main():
+    await setup()
+    failures = []
+
+    def expect(label, got, want):
+        ok = got == want
+        print(f"{'ok  ' if ok else 'FAIL'} {label}: {got}")
+        if not ok:
+            failures.append(label)
+
+    async with app.router.lifespan_context(app):
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://check"
+        )
+        async with client:
+            await replicas.check_all()
+            expect("read before any write", await answered_by(client, 10), "replica")
+
+            response = await client.post(
+                "/club/bookings",
+                json={"event_id": 1, "venue_id": 1},
+                headers=headers(10),
+            )
+            response.raise_for_status()
+            expect("writer reads its write", await answered_by(client, 10), "primary")
+            expect("other users still", await answered_by(client, 11), "replica")
+
+            # the replica goes away: the next read fails over on its own,
+            # and health checks keep it out of rotation after that
+            await replicas.replicas[0].engine.dispose()
+            shutil.rmtree(REPLICA.parent)
+            expect("replica down", await answered_by(client, 11), "primary")
+            await replicas.check_all()
+            expect("after health check", await answered_by(client, 11), "primary")
+            expect("replica healthy", replicas.replicas[0].healthy, False)
+
+    print(replicas.stats())
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args()
+    sys.exit(asyncio.run(main()))
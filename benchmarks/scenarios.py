@@ -0,0 +1,459 @@
+"""
+drives the real app (backend.main, in-process through httpx's ASGI transport,
+or a running server with --base-url) through realistic traffic mixes and
+reports throughput and p50/p95/p99 latency per endpoint:
+
+    login_storm         students (and some members/admins) logging in at once
+    registration_rush   students registering for a few hot upcoming events
+    approval_backlog    admins working through pending bookings while
+                        club members keep requesting new ones
+    dashboard_browsing  students, members and admins loading their dashboards,
+                        paging through listings and revalidating with ETags
+
+meant for a database filled by benchmarks.seed (its users and SEED_PASSWORD),
+the scenarios write to it. registration and approval call mysql stored
+procedures, on sqlite those endpoints only show up as errors.
+results can be saved as a JSON baseline and later runs compared against it:
+
+    python -m benchmarks.scenarios dashboard_browsing --journeys 2000 \\
+        --save benchmarks/baselines/main.json
+    python -m benchmarks.scenarios dashboard_browsing --journeys 2000 \\
+        --compare benchmarks/baselines/main.json --tolerance 0.2
+
+with --base-url the server must share this process' AUTH_SECRET, tokens are
+issued here rather than by logging in (except in login_storm)
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import AsyncExitStack
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+from sqlalchemy import text
+
+from backend.auth import ADMIN, CLUB_MEMBER, STUDENT, issue_token
+from backend.db import engine
+from benchmarks.seed import SEED_PASSWORD
+
+SAMPLE_SIZE = 2000
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if len(samples) < 2:
+        return {"p50": samples[0], "p95": samples[0], "p99": samples[0]}
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": q[49], "p95": q[94], "p99": q[98]}
+
+
+class Recorder:
+    """latencies and status codes per endpoint (method + route template)"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    async def request(self, client, endpoint, url, **kwargs):
+        method = endpoint.split(" ", 1)[0]
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[endpoint].append((time.perf_counter() - start) * 1000)
+        self.statuses[endpoint][response.status_code] += 1
+        return response
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 1),
+                **{f"{k}_ms": round(v, 2) for k, v in percentiles(samples).items()},
+                "max_ms": round(max(samples), 2),
+                "statuses": {
+                    str(code): n for code, n in sorted(self.statuses[endpoint].items())
+                },
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 1),
+            "endpoints": endpoints,
+        }
+
+
+class Population:
+    """ids and emails sampled from the seeded database"""
+
+    async def load(self):
+        async with engine.connect() as conn:
+
+            async def users(role):
+                rows = await conn.execute(
+                    text(
+                        """
+                        SELECT u.user_id, u.email, cm.club_id
+                        FROM users u
+                        JOIN roles r ON u.role_id = r.role_id
+                        LEFT JOIN club_memberships cm ON cm.user_id = u.user_id
+                        WHERE r.role_name = :role
+                        LIMIT :n
+                        """
+                    ),
+                    {"role": role, "n": SAMPLE_SIZE},
+                )
+                return rows.fetchall()
+
+            self.students = await users("Student")
+            self.members = [row for row in await users("Club Member") if row.club_id]
+            self.admins = await users("Admin")
+            # hot events: the next upcoming ones with an approved venue
+            self.hot_events = [
+                row.event_id
+                for row in await conn.execute(
+                    text(
+                        """
+                        SELECT e.event_id
+                        FROM events e
+                        JOIN bookings b ON b.event_id = e.event_id
+                        WHERE b.status = 'Approved' AND e.start_time >= NOW()
+                        ORDER BY e.start_time
+                        LIMIT 5
+                        """
+                    )
+                )
+            ]
+        if not (self.students and self.members and self.admins):
+            raise SystemExit("no seeded users found, run python -m benchmarks.seed")
+
+    @staticmethod
+    def headers(user, role):
+        club_id = user.club_id if role == CLUB_MEMBER else None
+        return {"Authorization": f"Bearer {issue_token(user.user_id, role, club_id)}"}
+
+
+async def login_storm(client, rec, pop, rng):
+    path, users = rng.choices(
+        [
+            ("/student/login", pop.students),
+            ("/club/login", pop.members),
+            ("/admin/login", pop.admins),
+        ],
+        [90, 7, 3],
+    )[0]
+    user = rng.choice(users)
+    await rec.request(
+        client,
+        f"POST {path}",
+        path,
+        json={"email": user.email, "password": SEED_PASSWORD},
+    )
+
+
+async def registration_rush(client, rec, pop, rng):
+    student = rng.choice(pop.students)
+    headers = pop.headers(student, STUDENT)
+    # most of the rush goes to the first couple of events
+    event_id = rng.choices(
+        pop.hot_events, [2**-i for i in range(len(pop.hot_events))]
+    )[0]
+    await rec.request(
+        client,
+        "POST /student/{student_id}/register/{event_id}",
+        f"/student/{student.user_id}/register/{event_id}",
+        headers=headers,
+    )
+    if rng.random() < 0.3:
+        await rec.request(
+            client,
+            "GET /student/{student_id}/registrations",
+            f"/student/{student.user_id}/registrations",
+            headers=headers,
+        )
+
+
+async def approval_backlog(client, rec, pop, rng):
+    if rng.random() < 0.3:
+        # a club member requesting a venue for one of the club's unbooked events
+        member = rng.choice(pop.members)
+        headers = pop.headers(member, CLUB_MEMBER)
+        unbooked = await rec.request(
+            client,
+            "GET /club/{club_id}/events/unbooked",
+            f"/club/{member.club_id}/events/unbooked",
+            headers=headers,
+        )
+        if unbooked.status_code != 200:
+            return
+        now = datetime.now().isoformat()
+        upcoming = [e for e in unbooked.json() if e["start_time"] >= now]
+        if not upcoming:
+            return
+        event = rng.choice(upcoming)
+        venues = await rec.request(
+            client,
+            "GET /club/venues/available",
+            "/club/venues/available",
+            params={"start": event["start_time"], "end": event["end_time"]},
+            headers=headers,
+        )
+        if venues.status_code == 200 and venues.json():
+            await rec.request(
+                client,
+                "POST /club/bookings",
+                "/club/bookings",
+                json={
+                    "event_id": event["event_id"],
+                    "venue_id": rng.choice(venues.json())["venue_id"],
+                },
+                headers=headers,
+            )
+        return
+
+    admin = rng.choice(pop.admins)
+    headers = pop.headers(admin, ADMIN)
+    await rec.request(
+        client,
+        "GET /admin/{admin_id}/dashboard",
+        f"/admin/{admin.user_id}/dashboard",
+        headers=headers,
+    )
+    pending = await rec.request(
+        client,
+        "GET /admin/bookings/pending",
+        "/admin/bookings/pending",
+        headers=headers,
+    )
+    bookings = pending.json() if pending.status_code == 200 else []
+    if not bookings:
+        return
+    roll = rng.random()
+    if roll < 0.1:
+        ids = [b["booking_id"] for b in rng.sample(bookings, min(5, len(bookings)))]
+        await rec.request(
+            client,
+            "POST /admin/bookings/bulk_approve",
+            "/admin/bookings/bulk_approve",
+            json={"booking_ids": ids},
+            headers=headers,
+        )
+    elif roll < 0.3:
+        booking_id = rng.choice(bookings)["booking_id"]
+        await rec.request(
+            client,
+            "POST /admin/bookings/{booking_id}/reject",
+            f"/admin/bookings/{booking_id}/reject",
+            headers=headers,
+        )
+    else:
+        booking_id = rng.choice(bookings)["booking_id"]
+        await rec.request(
+            client,
+            "POST /admin/bookings/{booking_id}/approve",
+            f"/admin/bookings/{booking_id}/approve",
+            headers=headers,
+        )
+
+
+async def revalidate(client, rec, endpoint, url, response, headers):
+    """what a browser does on the next visit: If-None-Match with the ETag"""
+    etag = response.headers.get("etag")
+    if etag:
+        await rec.request(
+            client, endpoint, url, headers={**headers, "If-None-Match": etag}
+        )
+
+
+async def dashboard_browsing(client, rec, pop, rng):
+    roll = rng.random()
+    if roll < 0.7:
+        student = rng.choice(pop.students)
+        headers = pop.headers(student, STUDENT)
+        endpoint = "GET /student/{student_id}/dashboard"
+        url = f"/student/{student.user_id}/dashboard"
+        dashboard = await rec.request(client, endpoint, url, headers=headers)
+        if rng.random() < 0.5:
+            await revalidate(client, rec, endpoint, url, dashboard, headers)
+        cursor = dashboard.json().get("next_cursor")
+        for _ in range(rng.randint(0, 3)):
+            if not cursor:
+                break
+            page = await rec.request(
+                client,
+                "GET /student/{student_id}/events",
+                f"/student/{student.user_id}/events",
+                params={"cursor": cursor},
+                headers=headers,
+            )
+            cursor = page.json().get("next_cursor")
+    elif roll < 0.9:
+        member = rng.choice(pop.members)
+        headers = pop.headers(member, CLUB_MEMBER)
+        endpoint = "GET /club/{club_id}/dashboard"
+        url = f"/club/{member.club_id}/dashboard"
+        dashboard = await rec.request(client, endpoint, url, headers=headers)
+        if rng.random() < 0.5:
+            await revalidate(client, rec, endpoint, url, dashboard, headers)
+        cursor = dashboard.json().get("next_cursor")
+        if cursor and rng.random() < 0.5:
+            await rec.request(
+                client,
+                "GET /club/{club_id}/events",
+                f"/club/{member.club_id}/events",
+                params={"cursor": cursor},
+                headers=headers,
+            )
+    else:
+        admin = rng.choice(pop.admins)
+        headers = pop.headers(admin, ADMIN)
+        endpoint = "GET /admin/{admin_id}/dashboard"
+        url = f"/admin/{admin.user_id}/dashboard"
+        dashboard = await rec.request(client, endpoint, url, headers=headers)
+        if rng.random() < 0.5:
+            await revalidate(client, rec, endpoint, url, dashboard, headers)
+        await rec.request(
+            client, "GET /admin/audit_log", "/admin/audit_log", headers=headers
+        )
+
+
+SCENARIOS = {
+    "login_storm": login_storm,
+    "registration_rush": registration_rush,
+    "approval_backlog": approval_backlog,
+    "dashboard_browsing": dashboard_browsing,
+}
+
+
+async def run_scenario(client, journey, pop, n_journeys, concurrency, seed):
+    """n_journeys runs of journey, spread over concurrency simulated users"""
+    rec = Recorder()
+    remaining = iter(range(n_journeys))
+
+    async def user(rng):
+        for _ in remaining:
+            await journey(client, rec, pop, rng)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(user(random.Random(seed * 1000 + i)) for i in range(concurrency))
+    )
+    return rec.summary(time.perf_counter() - start)
+
+
+def print_summary(name, summary):
+    print(
+        f"{name}: {summary['requests']} requests in {summary['elapsed_s']}s "
+        f"({summary['throughput_rps']} req/s)"
+    )
+    for endpoint, stats in summary["endpoints"].items():
+        statuses = " ".join(f"{c}x{n}" for c, n in stats["statuses"].items())
+        print(
+            f"  {endpoint:<48} {stats['requests']:>6} "
+            f"{stats['throughput_rps']:>8.1f}/s  p50 {stats['p50_ms']:>8.1f}  "
+            f"p95 {stats['p95_ms']:>8.1f}  p99 {stats['p99_ms']:>8.1f} ms  {statuses}"
+        )
+
+
+def compare(results, baseline, tolerance):
+    """
+    regressions against a saved baseline: an endpoint whose p95 grew, or whose
+    throughput fell, by more than tolerance. returns how many were found
+    """
+    regressions = 0
+    for name, summary in results.items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            print(f"{name}: not in the baseline")
+            continue
+        for endpoint, stats in summary["endpoints"].items():
+            before = old["endpoints"].get(endpoint)
+            if before is None:
+                continue
+            p95 = stats["p95_ms"] / before["p95_ms"] if before["p95_ms"] else 1
+            rps = (
+                stats["throughput_rps"] / before["throughput_rps"]
+                if before["throughput_rps"]
+                else 1
+            )
+            regressed = p95 > 1 + tolerance or rps < 1 / (1 + tolerance)
+            regressions += regressed
+            print(
+                f"{'REGRESSED' if regressed else 'ok':<9} {name} {endpoint}: "
+                f"p95 {before['p95_ms']:.1f} -> {stats['p95_ms']:.1f} ms ({p95:.2f}x), "
+                f"{before['throughput_rps']:.1f} -> {stats['throughput_rps']:.1f} req/s"
+            )
+    return regressions
+
+
+async def main(args):
+    pop = Population()
+    await pop.load()
+
+    results = {}
+    async with AsyncExitStack() as stack:
+        if args.base_url:
+            client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+        else:
+            from backend.main import app
+
+            # runs the app's startup (indexes, pub/sub hub) and shutdown
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://bench",
+                timeout=60,
+            )
+        await stack.enter_async_context(client)
+        for name in args.scenarios:
+            results[name] = await run_scenario(
+                client, SCENARIOS[name], pop, args.journeys, args.concurrency, args.seed
+            )
+            print_summary(name, results[name])
+    await engine.dispose()
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "database": engine.dialect.name,
+            "target": args.base_url or "in-process",
+            "journeys": args.journeys,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": results,
+    }
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"baseline saved to {args.save}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "scenarios", nargs="*", default=list(SCENARIOS), help=", ".join(SCENARIOS)
+    )
+    parser.add_argument("--journeys", type=int, default=1000, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--base-url", help="a running server instead of the app")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to check the results against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    sys.exit(asyncio.run(main(args)))
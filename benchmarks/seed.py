@@ -0,0 +1,436 @@
+"""
+fills every table of ddl.sql with a synthetic dataset of configurable size,
+so changes can be measured against realistic volumes (benchmarks/scenarios.py).
+ids are assigned here, so the database has to be empty: --reset deletes
+whatever is there first. every user's password is SEED_PASSWORD
+
+targets DATABASE_URL, mysql 8 with ddl.sql loaded or sqlite. --create-schema
+loads ddl.sql first; on sqlite only its tables and indexes are created, the
+stored procedures (registration, booking approval) are mysql only
+
+    python -m benchmarks.seed --users 100000 --events 20000 --attendees 1000000
+    DATABASE_URL=sqlite+aiosqlite:///./evently.db \\
+        python -m benchmarks.seed --create-schema --users 5000 --events 1000
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import text
+
+from backend.db import engine
+from backend.passwords import pwd_context
+from scripts.migrate import split_statements
+
+DDL_PATH = Path(__file__).resolve().parent.parent / "ddl.sql"
+
+SEED_PASSWORD = "password"
+SEED_EMAIL_DOMAIN = "seed.example.com"
+
+ROLES = {1: "Student", 2: "Club Member", 3: "Admin"}
+STUDENT_ROLE, CLUB_MEMBER_ROLE, ADMIN_ROLE = 1, 2, 3
+
+CATEGORIES = [
+    "Tech", "Arts", "Music", "Sports", "Literature", "Science", "Gaming",
+    "Career", "Culture", "Social", "Workshop", "Talk",
+]  # fmt: skip
+VENUE_CAPACITIES = [30, 50, 80, 120, 200, 300, 500, 1000, 2000]
+EQUIPMENT_TYPES = ["Projector", "Microphone", "Speaker", "Laptop", "Camera", "Stage"]
+
+# tables in insert order, deleted in reverse by --reset
+TABLES = [
+    "roles", "categories", "venues", "equipment", "clubs", "users",
+    "user_phone_numbers", "events", "bookings", "event_seats",
+    "club_memberships", "event_categories", "attendees", "event_waitlist",
+    "booking_equipment", "maintenance_logs", "audit_log",
+]  # fmt: skip
+
+SQLITE_SKIP = (
+    "SET ",
+    "ALTER TABLE",
+    "CREATE FUNCTION",
+    "CREATE PROCEDURE",
+    "CREATE TRIGGER",
+)
+
+
+def sqlite_statement(statement):
+    """ddl.sql statement rewritten for sqlite, None for the mysql only ones"""
+    statement = re.sub(r"/\*.*?\*/", "", statement, flags=re.DOTALL).strip()
+    if statement.upper().startswith(SQLITE_SKIP):
+        return None
+    statement = statement.replace(
+        "INT UNSIGNED AUTO_INCREMENT PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT"
+    )
+    return statement.replace(" UNSIGNED", "")
+
+
+async def create_schema():
+    statements = split_statements(DDL_PATH.read_text())
+    if engine.dialect.name == "sqlite":
+        statements = filter(None, map(sqlite_statement, statements))
+    async with engine.begin() as conn:
+        for statement in statements:
+            await conn.exec_driver_sql(statement)
+
+
+async def reset():
+    async with engine.begin() as conn:
+        for table in reversed(TABLES):
+            await conn.execute(text(f"DELETE FROM {table}"))
+
+
+async def insert(table, columns, rows, batch_size):
+    """executemany in batches, one transaction per batch, returns the row count"""
+    statement = text(
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(':' + c for c in columns)})"
+    )
+    count, batch = 0, []
+
+    async def flush():
+        async with engine.begin() as conn:
+            await conn.execute(statement, batch)
+
+    for row in rows:
+        batch.append(dict(zip(columns, row)))
+        if len(batch) == batch_size:
+            await flush()
+            count, batch = count + len(batch), []
+    if batch:
+        await flush()
+        count += len(batch)
+    return count
+
+
+class Dataset:
+    """
+    the synthetic rows, generated lazily table by table.
+    user ids: admins first, then two club members per club, then students.
+    each venue hosts every n_venues-th event in its own time slot, so approved
+    bookings never overlap; a quarter of the pending ones pick a random venue
+    and may conflict, which is what the approval backlog has to sort out
+    """
+
+    def __init__(self, args, rng):
+        self.args = args
+        self.rng = rng
+        self.now = datetime.now().replace(microsecond=0)
+        self.n_admins = args.admins
+        self.n_members = 2 * args.clubs
+        self.first_student = self.n_admins + self.n_members + 1
+        self.last_student = max(args.users, self.first_student)
+        self.venue_capacity = {}
+        self.events = []  # (event_id, club_id, venue_id, start, end)
+        self.approved = {}  # event_id -> (booking_id, venue_id)
+        self.available_equipment = []
+        self.equipment_units = {}
+
+    def role_of(self, user_id):
+        if user_id <= self.n_admins:
+            return ADMIN_ROLE
+        if user_id < self.first_student:
+            return CLUB_MEMBER_ROLE
+        return STUDENT_ROLE
+
+    def club_of_member(self, user_id):
+        return (user_id - self.n_admins - 1) // 2 + 1
+
+    def email(self, user_id):
+        return f"user{user_id}@{SEED_EMAIL_DOMAIN}"
+
+    def roles(self):
+        return ROLES.items()
+
+    def categories(self):
+        return enumerate(CATEGORIES, start=1)
+
+    def venues(self):
+        for venue_id in range(1, self.args.venues + 1):
+            capacity = self.rng.choice(VENUE_CAPACITIES)
+            self.venue_capacity[venue_id] = capacity
+            yield venue_id, f"Venue {venue_id}", f"Block {venue_id % 12}", capacity
+
+    def equipment(self):
+        for equipment_id in range(1, self.args.equipment + 1):
+            status = self.rng.choices(
+                ["Available", "In Use", "Under Maintenance"], [85, 10, 5]
+            )[0]
+            if status == "Available":
+                self.available_equipment.append(equipment_id)
+            kind = self.rng.choice(EQUIPMENT_TYPES)
+            units = self.equipment_units[equipment_id] = self.rng.randint(1, 20)
+            yield equipment_id, f"{kind} {equipment_id}", kind, status, units
+
+    def clubs(self):
+        for club_id in range(1, self.args.clubs + 1):
+            topic = self.rng.choice(CATEGORIES)
+            yield club_id, f"{topic} Club {club_id}", f"a club about {topic.lower()}"
+
+    def users(self, password_hash):
+        for user_id in range(1, self.last_student + 1):
+            yield (
+                user_id,
+                f"First{user_id}",
+                f"Last{user_id}",
+                self.email(user_id),
+                password_hash,
+                f"{user_id} Campus Road",
+                "Bengaluru",
+                f"560{user_id % 1000:03d}",
+                self.role_of(user_id),
+            )
+
+    def user_phone_numbers(self):
+        for user_id in range(1, self.last_student + 1):
+            yield user_id, f"9{user_id:09d}"
+
+    def events_rows(self):
+        """events spread over [now - past_days, now + future_days]"""
+        n_events, n_venues = self.args.events, self.args.venues
+        start_of_span = self.now - timedelta(days=self.args.past_days)
+        span = timedelta(days=self.args.past_days + self.args.future_days)
+        slot = span / max(1, -(-n_events // n_venues))
+        for event_id in range(1, n_events + 1):
+            venue_id = (event_id - 1) % n_venues + 1
+            duration = min(timedelta(hours=self.rng.randint(1, 4)), slot * 0.9)
+            offset = (slot - duration) * self.rng.random()
+            start = start_of_span + slot * ((event_id - 1) // n_venues) + offset
+            start = start.replace(microsecond=0)
+            end = start + max(duration, timedelta(minutes=1))
+            club_id = self.rng.randint(1, self.args.clubs)
+            self.events.append((event_id, club_id, venue_id, start, end))
+            yield (
+                event_id,
+                f"Event {event_id}",
+                f"synthetic event {event_id} of club {club_id}",
+                start,
+                end,
+                club_id,
+            )
+
+    def bookings_rows(self):
+        booking_id = 0
+        for event_id, club_id, venue_id, start, end in self.events:
+            if start < self.now:
+                weights = {"Approved": 85, "Rejected": 5, None: 10}
+            else:
+                weights = {"Approved": 55, "Pending": 20, "Rejected": 5, None: 20}
+            status = self.rng.choices(list(weights), list(weights.values()))[0]
+            if status is None:
+                continue
+            if status == "Pending" and self.rng.random() < 0.25:
+                venue_id = self.rng.randint(1, self.args.venues)
+            booking_id += 1
+            requested_by = self.n_admins + 2 * (club_id - 1) + 1
+            if status == "Approved":
+                self.approved[event_id] = (booking_id, venue_id)
+            requested_at = min(start, self.now) - timedelta(
+                days=self.rng.randint(1, 30)
+            )
+            yield booking_id, event_id, venue_id, requested_by, status, requested_at
+
+    def attendee_counts(self):
+        """popularity is skewed, a few events draw most of the registrations"""
+        weights = [self.rng.paretovariate(1.2) for _ in self.events]
+        scale = self.args.attendees / sum(weights)
+        n_students = self.last_student - self.first_student + 1
+        counts = {}
+        for (event_id, *_), weight in zip(self.events, weights):
+            limit = n_students
+            if event_id in self.approved:
+                limit = min(limit, self.venue_capacity[self.approved[event_id][1]])
+            counts[event_id] = min(limit, round(weight * scale))
+        return counts
+
+    def attendees(self, counts):
+        students = range(self.first_student, self.last_student + 1)
+        for event_id, count in counts.items():
+            for user_id in self.rng.sample(students, count):
+                yield user_id, event_id
+
+    def event_seats(self, counts):
+        for event_id, (_, venue_id) in self.approved.items():
+            yield event_id, self.venue_capacity[venue_id], counts[event_id]
+
+    def club_memberships(self):
+        for user_id in range(self.n_admins + 1, self.first_student):
+            club_id = self.club_of_member(user_id)
+            position = "Lead" if (user_id - self.n_admins) % 2 else "Coordinator"
+            yield user_id, club_id, position
+        for user_id in range(self.first_student, self.last_student + 1):
+            if self.rng.random() < 0.1:
+                yield user_id, self.rng.randint(1, self.args.clubs), "Member"
+
+    def event_categories(self):
+        for event_id, *_ in self.events:
+            for category_id in self.rng.sample(
+                range(1, len(CATEGORIES) + 1), self.rng.randint(1, 2)
+            ):
+                yield event_id, category_id
+
+    def booking_equipment(self):
+        """random reservations, overlapping ones may exceed an item's units"""
+        if not self.available_equipment:
+            return
+        for event_id, _, _, start, end in self.events:
+            if event_id in self.approved and self.rng.random() < 0.2:
+                booking_id = self.approved[event_id][0]
+                k = min(len(self.available_equipment), self.rng.randint(1, 2))
+                for equipment_id in self.rng.sample(self.available_equipment, k):
+                    units = self.rng.randint(
+                        1, min(3, self.equipment_units[equipment_id])
+                    )
+                    yield booking_id, equipment_id, units, start, end
+
+    def maintenance_logs(self):
+        today = date.today()
+        for equipment_id in range(1, self.args.equipment + 1):
+            # past logs and a few scheduled ahead
+            for days_ago in self.rng.sample(range(-60, 365), self.rng.randint(1, 3)):
+                yield (
+                    equipment_id,
+                    today - timedelta(days=days_ago),
+                    "routine check",
+                    f"Technician {self.rng.randint(1, 20)}",
+                )
+
+    def audit_log(self):
+        """what trg_LogUserCreation writes on mysql, for databases without it"""
+        for user_id in range(1, self.last_student + 1):
+            yield (
+                "NEW_USER",
+                f"User created. ID: {user_id}, Email: {self.email(user_id)}",
+            )
+
+
+async def report(table, inserting):
+    start = time.perf_counter()
+    count = await inserting
+    print(f"  {table:<20} {count:>9} rows  {time.perf_counter() - start:6.1f}s")
+
+
+async def main(args):
+    if args.create_schema:
+        await create_schema()
+    if args.reset:
+        await reset()
+
+    rng = random.Random(args.seed)
+    data = Dataset(args, rng)
+    password_hash = pwd_context.hash(SEED_PASSWORD)
+    batch = args.batch_size
+
+    steps = [
+        ("roles", ["role_id", "role_name"], data.roles),
+        ("categories", ["category_id", "category_name"], data.categories),
+        ("venues", ["venue_id", "venue_name", "location", "capacity"], data.venues),
+        (
+            "equipment",
+            ["equipment_id", "equipment_name", "type", "status", "quantity"],
+            data.equipment,
+        ),
+        ("clubs", ["club_id", "club_name", "description"], data.clubs),
+        (
+            "users",
+            [
+                "user_id",
+                "first_name",
+                "last_name",
+                "email",
+                "password_hash",
+                "address_street",
+                "address_city",
+                "address_pincode",
+                "role_id",
+            ],  # fmt: skip
+            lambda: data.users(password_hash),
+        ),
+        ("user_phone_numbers", ["user_id", "phone_number"], data.user_phone_numbers),
+        (
+            "events",
+            [
+                "event_id",
+                "event_name",
+                "description",
+                "start_time",
+                "end_time",
+                "club_id",
+            ],
+            data.events_rows,
+        ),
+        (
+            "bookings",
+            [
+                "booking_id",
+                "event_id",
+                "venue_id",
+                "requested_by",
+                "status",
+                "request_timestamp",
+            ],  # fmt: skip
+            data.bookings_rows,
+        ),
+    ]
+    if engine.dialect.name != "mysql":
+        steps.append(("audit_log", ["action_type", "details"], data.audit_log))
+
+    start = time.perf_counter()
+    for table, columns, rows in steps:
+        await report(table, insert(table, columns, rows(), batch))
+
+    counts = data.attendee_counts()
+    await report(
+        "event_seats",
+        insert(
+            "event_seats",
+            ["event_id", "capacity", "seats_taken"],
+            data.event_seats(counts),
+            batch,
+        ),
+    )
+    for table, columns, rows in [
+        (
+            "club_memberships",
+            ["user_id", "club_id", "position"],
+            data.club_memberships(),
+        ),
+        ("event_categories", ["event_id", "category_id"], data.event_categories()),
+        ("attendees", ["user_id", "event_id"], data.attendees(counts)),
+        (
+            "booking_equipment",
+            ["booking_id", "equipment_id", "quantity", "start_time", "end_time"],
+            data.booking_equipment(),
+        ),
+        (
+            "maintenance_logs",
+            ["equipment_id", "log_date", "description", "performed_by"],
+            data.maintenance_logs(),
+        ),
+    ]:
+        await report(table, insert(table, columns, rows, batch))
+    await engine.dispose()
+    print(f"seeded in {time.perf_counter() - start:.1f}s, password: {SEED_PASSWORD}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--attendees", type=int, default=1_000_000)
+    parser.add_argument("--clubs", type=int, default=200)
+    parser.add_argument("--venues", type=int, default=100)
+    parser.add_argument("--equipment", type=int, default=500)
+    parser.add_argument("--admins", type=int, default=3)
+    parser.add_argument("--past-days", type=int, default=180)
+    parser.add_argument("--future-days", type=int, default=180)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--create-schema", action="store_true")
+    parser.add_argument("--reset", action="store_true")
+    asyncio.run(main(parser.parse_args()))
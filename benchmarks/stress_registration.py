@@ -0,0 +1,158 @@
+"""
+fires many concurrent POST /student/{id}/register/{event_id} at one event with a
+small approved venue and checks that it is never overbooked
+
+needs a mysql database with ddl.sql (or migrations up to V002) loaded,
+the synthetic rows it creates are deleted again at the end
+
+    python -m benchmarks.stress_registration --students 2000 --capacity 150
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import text
+
+from backend.auth import STUDENT, issue_token
+from backend.db import engine
+from backend.main import app
+
+
+async def seed(n_students, capacity):
+    """one club, venue, event with an approved booking, and n_students students"""
+    tag = time.time_ns()
+    async with engine.begin() as conn:
+        club_id = (
+            await conn.execute(
+                text("INSERT INTO clubs (club_name) VALUES (:n)"),
+                {"n": f"stress club {tag}"},
+            )
+        ).lastrowid
+        venue_id = (
+            await conn.execute(
+                text("INSERT INTO venues (venue_name, capacity) VALUES (:n, :c)"),
+                {"n": f"stress venue {tag}", "c": capacity},
+            )
+        ).lastrowid
+        start = datetime.now() + timedelta(days=30)
+        event_id = (
+            await conn.execute(
+                text(
+                    """
+                    INSERT INTO events (event_name, start_time, end_time, club_id)
+                    VALUES (:n, :s, :e, :c)
+                    """
+                ),
+                {
+                    "n": f"stress event {tag}",
+                    "s": start,
+                    "e": start + timedelta(hours=2),
+                    "c": club_id,
+                },
+            )
+        ).lastrowid
+        await conn.execute(
+            text(
+                """
+                INSERT INTO users (first_name, last_name, email, password_hash, role_id)
+                VALUES ('stress', 'student', :email, 'x',
+                        (SELECT role_id FROM roles WHERE role_name = 'Student'))
+                """
+            ),
+            [{"email": f"stress{tag}_{i}@example.com"} for i in range(n_students)],
+        )
+        student_ids = [
+            row.user_id
+            for row in await conn.execute(
+                text("SELECT user_id FROM users WHERE email LIKE :p"),
+                {"p": f"stress{tag}_%"},
+            )
+        ]
+        booking_id = (
+            await conn.execute(
+                text(
+                    """
+                    INSERT INTO bookings (event_id, venue_id, status)
+                    VALUES (:e, :v, 'Pending')
+                    """
+                ),
+                {"e": event_id, "v": venue_id},
+            )
+        ).lastrowid
+        await conn.execute(text("CALL sp_ApproveBooking(:b)"), {"b": booking_id})
+    return club_id, venue_id, event_id, student_ids
+
+
+async def cleanup(club_id, venue_id, student_ids):
+    """club delete cascades to the event, bookings, attendees and seat counter"""
+    async with engine.begin() as conn:
+        await conn.execute(text("DELETE FROM clubs WHERE club_id = :c"), {"c": club_id})
+        await conn.execute(
+            text("DELETE FROM users WHERE user_id = :u"),
+            [{"u": u} for u in student_ids],
+        )
+        await conn.execute(
+            text("DELETE FROM venues WHERE venue_id = :v"), {"v": venue_id}
+        )
+
+
+async def main(n_students, capacity, concurrency):
+    club_id, venue_id, event_id, student_ids = await seed(n_students, capacity)
+    statuses = Counter()
+    limit = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://stress"
+    ) as client:
+
+        async def register(student_id):
+            async with limit:
+                r = await client.post(
+                    f"/student/{student_id}/register/{event_id}",
+                    headers={
+                        "Authorization": f"Bearer {issue_token(student_id, STUDENT)}"
+                    },
+                )
+                statuses[(r.status_code, r.json().get("detail", "ok"))] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(register(s) for s in student_ids))
+        elapsed = time.perf_counter() - start
+
+    async with engine.connect() as conn:
+        attendees = (
+            await conn.execute(
+                text("SELECT COUNT(*) FROM attendees WHERE event_id = :e"),
+                {"e": event_id},
+            )
+        ).scalar()
+        seats_taken = (
+            await conn.execute(
+                text("SELECT seats_taken FROM event_seats WHERE event_id = :e"),
+                {"e": event_id},
+            )
+        ).scalar()
+
+    await cleanup(club_id, venue_id, student_ids)
+    await engine.dispose()
+
+    print(f"{n_students} requests in {elapsed:.2f}s ({n_students / elapsed:.0f} req/s)")
+    for (status, detail), count in sorted(statuses.items()):
+        print(f"  {status} {detail}: {count}")
+    print(f"capacity={capacity} attendees={attendees} seats_taken={seats_taken}")
+    ok = attendees == seats_taken == min(capacity, n_students)
+    print("OK: no overbooking" if ok else "FAIL: capacity violated")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--capacity", type=int, default=150)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.students, args.capacity, args.concurrency)))
@@ -29,7 +29,8 @@ CREATE TABLE equipment (
     equipment_id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
     equipment_name VARCHAR(100) NOT NULL,
     type VARCHAR(100),
-    status VARCHAR(50) NOT NULL CHECK (status IN ('Available', 'In Use', 'Under Maintenance'))
+    status VARCHAR(50) NOT NULL CHECK (status IN ('Available', 'In Use', 'Under Maintenance')),
+    quantity INT UNSIGNED NOT NULL DEFAULT 1 CHECK (quantity > 0)
 );
 
 -- Table 5: CLUBS (No dependencies)
@@ -125,6 +126,9 @@ CREATE TABLE booking_equipment (
     booking_id INT UNSIGNED NOT NULL,
     equipment_id INT UNSIGNED NOT NULL,
     quantity INT UNSIGNED NOT NULL DEFAULT 1 CHECK (quantity > 0),
+    -- the event's window, copied so overlapping reservations are found by index
+    start_time DATETIME NOT NULL,
+    end_time DATETIME NOT NULL,
     PRIMARY KEY (booking_id, equipment_id),
     FOREIGN KEY (booking_id) REFERENCES bookings(booking_id) ON DELETE CASCADE,
     FOREIGN KEY (equipment_id) REFERENCES equipment(equipment_id) ON DELETE RESTRICT
@@ -152,6 +156,66 @@ CREATE TABLE audit_log (
     details TEXT
 );
 
+-- Secondary indexes for the router queries
+-- (kept in sync with migrations/, existing databases get them from there)
+
+-- upcoming events catalog: range scan from NOW() / the cursor
+CREATE INDEX idx_events_start_time ON events (start_time, event_id);
+-- club events listing: equality on club_id, then range scan on the cursor
+CREATE INDEX idx_events_club_start ON events (club_id, start_time, event_id);
+-- registrations are found through the attendees PK (user_id, event_id)
+
+-- pending bookings list: WHERE status = 'Pending' ORDER BY request_timestamp
+CREATE INDEX idx_bookings_status_requested ON bookings (status, request_timestamp);
+-- venue overlap check (fn_CheckVenueAvailability / pending list):
+-- venue_id + status equality, event_id covered for the join to events
+CREATE INDEX idx_bookings_venue_status ON bookings (venue_id, status, event_id);
+-- event listings: LEFT JOIN bookings ON event_id AND status = 'Approved'
+CREATE INDEX idx_bookings_event_status ON bookings (event_id, status, venue_id);
+-- audit log: ORDER BY log_timestamp DESC LIMIT 50 reads the index backwards
+CREATE INDEX idx_audit_log_timestamp ON audit_log (log_timestamp);
+-- reservations overlapping [start, end) of one item: equality on
+-- equipment_id, range on end_time > start (reservations long past are skipped)
+CREATE INDEX idx_booking_equipment_window ON booking_equipment (equipment_id, end_time, start_time);
+
+-- Per-event seat counter for capacity-limited registration.
+-- capacity comes from the approved venue (set by sp_ApproveBooking),
+-- seats_taken is bumped by sp_RegisterForEvent with a conditional UPDATE
+CREATE TABLE event_seats (
+    event_id INT UNSIGNED PRIMARY KEY,
+    capacity INT UNSIGNED NOT NULL,
+    seats_taken INT UNSIGNED NOT NULL DEFAULT 0,
+    -- the next waitlist ticket of the event, tickets only go up so they keep
+    -- the order students joined in
+    next_ticket INT UNSIGNED NOT NULL DEFAULT 1,
+    FOREIGN KEY (event_id) REFERENCES events(event_id) ON DELETE CASCADE
+);
+
+-- Per-event FIFO waitlist of a full event, drained into attendees by the
+-- promotion worker as seats free up. the PK is the queue order
+CREATE TABLE event_waitlist (
+    event_id INT UNSIGNED NOT NULL,
+    ticket INT UNSIGNED NOT NULL,
+    user_id INT UNSIGNED NOT NULL,
+    joined_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (event_id, ticket),
+    CONSTRAINT uq_event_waitlist_user UNIQUE (user_id, event_id),
+    FOREIGN KEY (event_id) REFERENCES events(event_id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+-- versions from migrations/ already contained in this file
+CREATE TABLE schema_migrations (
+    version INT UNSIGNED PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO schema_migrations (version, name) VALUES
+    (1, 'hot_query_indexes'),
+    (2, 'event_seat_counter'),
+    (3, 'equipment_reservations'),
+    (4, 'event_waitlist');
+
 DELIMITER //
 
 -- Functions
@@ -211,6 +275,14 @@ END //
 /**
  * Procedure: sp_RegisterForEvent
  * Purpose: Registers a user for an event, with error handling.
+ * Enforces the capacity of the event's approved venue through the
+ * event_seats counter: one conditional UPDATE takes a seat, so concurrent
+ * registrations can never overbook. Events without a row in event_seats
+ * (no approved venue yet) are not capacity limited.
+ * While the event has a waitlist its free seats go to the waitlist (the
+ * promotion worker hands them out in order), so the event counts as full.
+ * The caller commits right after the call, which keeps the counter's
+ * row lock short.
  * Parameters: u_id (INT) - The user_id registering.
  * e_id (INT) - The event_id to register for.
  */
@@ -222,29 +294,43 @@ BEGIN
         SELECT 'Error: User is already registered for this event.' AS message;
     END;
 
-    -- Attempt to insert the new attendee
+    -- Attempt to insert the new attendee (duplicates fail here, before the counter is touched)
     INSERT INTO attendees (user_id, event_id) VALUES (u_id, e_id);
-    
-    -- If successful
-    SELECT 'Registration successful.' AS message;
+
+    -- Take a seat: only succeeds while seats_taken < capacity and nobody waits
+    UPDATE event_seats
+    SET seats_taken = seats_taken + 1
+    WHERE event_id = e_id AND seats_taken < capacity
+      AND NOT EXISTS (SELECT 1 FROM event_waitlist w WHERE w.event_id = e_id);
+
+    IF ROW_COUNT() = 0 AND EXISTS (SELECT 1 FROM event_seats WHERE event_id = e_id) THEN
+        -- Sold out: undo the attendee insert
+        DELETE FROM attendees WHERE user_id = u_id AND event_id = e_id;
+        SELECT 'Error: Event is full.' AS message;
+    ELSE
+        -- If successful
+        SELECT 'Registration successful.' AS message;
+    END IF;
 END //
 
 /**
  * Procedure: sp_ApproveBooking
  * Purpose: Approves a 'Pending' booking *if* the venue is available.
  * If not, it rejects the booking to prevent a conflict.
+ * On approval the event's seat counter takes the venue's capacity.
  * Parameters: b_id (INT) - The booking_id to approve.
  */
 CREATE PROCEDURE sp_ApproveBooking(IN b_id INT UNSIGNED)
 BEGIN
     DECLARE v_id INT;
+    DECLARE ev_id INT UNSIGNED;
     DECLARE e_start DATETIME;
     DECLARE e_end DATETIME;
     DECLARE is_available BOOLEAN;
     DECLARE current_status VARCHAR(50);
 
-    SELECT b.status, b.venue_id, e.start_time, e.end_time
-    INTO current_status, v_id, e_start, e_end
+    SELECT b.status, b.venue_id, b.event_id, e.start_time, e.end_time
+    INTO current_status, v_id, ev_id, e_start, e_end
     FROM bookings b
     JOIN events e ON b.event_id = e.event_id
     WHERE b.booking_id = b_id;
@@ -255,6 +341,11 @@ BEGIN
         
         IF is_available THEN
             UPDATE bookings SET status = 'Approved' WHERE booking_id = b_id;
+            -- Seats now come from the approved venue
+            INSERT INTO event_seats (event_id, capacity, seats_taken)
+            SELECT ev_id, v.capacity, fn_GetAttendeeCount(ev_id)
+            FROM venues v WHERE v.venue_id = v_id
+            ON DUPLICATE KEY UPDATE capacity = VALUES(capacity);
             SELECT 'Booking approved successfully.' AS message;
         ELSE
             UPDATE bookings SET status = 'Rejected' WHERE booking_id = b_id;
@@ -296,7 +387,8 @@ END //
 
 /**
  * Trigger: trg_CheckEquipmentAvailability
- * Purpose: Prevents booking equipment that is not 'Available'.
+ * Purpose: Prevents booking equipment that is out of service, or more units
+ * than the item has. Overlapping reservations are checked by the API.
  * Event: BEFORE INSERT on `booking_equipment`
  */
 CREATE TRIGGER trg_CheckEquipmentAvailability
@@ -304,15 +396,19 @@ BEFORE INSERT ON booking_equipment
 FOR EACH ROW
 BEGIN
     DECLARE eq_status VARCHAR(50);
-    
-    SELECT status
-    INTO eq_status
+    DECLARE eq_quantity INT UNSIGNED;
+
+    SELECT status, quantity
+    INTO eq_status, eq_quantity
     FROM equipment
     WHERE equipment_id = NEW.equipment_id;
-    
-    IF eq_status != 'Available' THEN
+
+    IF eq_status = 'Under Maintenance' THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot book equipment: Item is under maintenance.';
+    ELSEIF NEW.quantity > eq_quantity THEN
         SIGNAL SQLSTATE '45000'
-        SET MESSAGE_TEXT = 'Cannot book equipment: Item is not currently available.';
+        SET MESSAGE_TEXT = 'Cannot book equipment: Item does not have that many units.';
     END IF;
 END //
 
@@ -18,10 +18,12 @@ function AdminDashboard() {
       return;
     }
     const parsedAdmin = JSON.parse(adminData);
+    // every request after login carries the session token
+    axios.defaults.headers.common.Authorization = `Bearer ${parsedAdmin.token}`;
     setAdmin(parsedAdmin);
 
     if (parsedAdmin.user_id) {
-      fetchData();
+      fetchData(parsedAdmin.user_id);
     } else {
       setError("Admin ID not found. Please log in again.");
       setLoading(false);
@@ -29,17 +31,37 @@ function AdminDashboard() {
     }
   }, [navigate]);
 
+  // Live updates: decided bookings drop out of the pending list,
+  // a new request reloads it (it needs the joined venue/club details)
+  useEffect(() => {
+    if (!admin?.token) return;
+    const source = new EventSource(
+      `http://localhost:8000/admin/stream?token=${admin.token}`,
+    );
+    source.onmessage = (e) => {
+      const update = JSON.parse(e.data);
+      if (update.type === "booking_status") {
+        setPendingBookings((prev) =>
+          prev.filter((b) => b.booking_id !== update.booking_id),
+        );
+      } else {
+        fetchData(admin.user_id);
+      }
+    };
+    return () => source.close();
+  }, [admin]);
+
   // 2. Data Fetching Function
-  const fetchData = async () => {
+  const fetchData = async (adminId = admin?.user_id) => {
     setLoading(true);
     setError("");
     try {
-      const [bookingsRes, logRes] = await Promise.all([
-        axios.get(`http://localhost:8000/admin/bookings/pending`),
-        axios.get(`http://localhost:8000/admin/audit_log`),
-      ]);
-      setPendingBookings(bookingsRes.data || []);
-      setAuditLog(logRes.data || []);
+      // One request for pending bookings and the audit log
+      const res = await axios.get(
+        `http://localhost:8000/admin/${adminId}/dashboard`,
+      );
+      setPendingBookings(res.data.pending_bookings || []);
+      setAuditLog(res.data.audit_log || []);
     } catch (err) {
       console.error("Failed to load admin data:", err);
       setError("Failed to load admin data. Please try again.");
@@ -60,6 +82,25 @@ function AdminDashboard() {
     }
   };
 
+  // Approve every pending booking in one request, conflicts are
+  // settled first-come by request time on the server
+  const handleApproveAll = async () => {
+    try {
+      const res = await axios.post(
+        `http://localhost:8000/admin/bookings/bulk_approve`,
+        { all_pending: true },
+      );
+      if (res.data.rejected > 0) {
+        setError(
+          `${res.data.approved} approved, ${res.data.rejected} rejected due to venue conflicts.`,
+        );
+      }
+      fetchData(); // Refresh lists
+    } catch (err) {
+      setError(err.response?.data?.detail || "Failed to approve bookings.");
+    }
+  };
+
   // 4. Action: Reject Booking
   const handleReject = async (bookingId) => {
     try {
@@ -75,6 +116,7 @@ function AdminDashboard() {
   // 5. Action: Logout
   const handleLogout = () => {
     localStorage.removeItem("admin");
+    delete axios.defaults.headers.common.Authorization;
     navigate("/");
   };
 
@@ -112,7 +154,17 @@ function AdminDashboard() {
 
         {/* Section 1: Pending Bookings */}
         <div className="mb-12">
-          <h2 className="text-2xl font-bold mb-6">Pending Venue Bookings</h2>
+          <div className="flex justify-between items-center mb-6">
+            <h2 className="text-2xl font-bold">Pending Venue Bookings</h2>
+            {pendingBookings.length > 0 && (
+              <button
+                onClick={handleApproveAll}
+                className="bg-green-700 hover:bg-green-800 text-white font-bold rounded-lg px-6 py-2 transition"
+              >
+                Approve All
+              </button>
+            )}
+          </div>
           {loading && <p className="text-gray-400">Loading bookings...</p>}
           {!loading && pendingBookings.length === 0 ? (
             <p className="text-gray-400">
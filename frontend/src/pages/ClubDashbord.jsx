@@ -6,6 +6,7 @@ function ClubDashboard() {
   const navigate = useNavigate();
   const [club, setClub] = useState(null);
   const [clubEvents, setClubEvents] = useState([]);
+  const [eventsCursor, setEventsCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
   const [formError, setFormError] = useState("");
@@ -13,6 +14,15 @@ function ClubDashboard() {
   // NEW: State for dropdowns
   const [venues, setVenues] = useState([]);
   const [unbookedEvents, setUnbookedEvents] = useState([]);
+  const [categories, setCategories] = useState([]);
+  const [equipment, setEquipment] = useState([]);
+  const [equipmentForm, setEquipmentForm] = useState({
+    booking_id: "",
+    equipment_id: "",
+    quantity: 1,
+  });
+  const [equipmentFree, setEquipmentFree] = useState(null);
+  const [equipmentMessage, setEquipmentMessage] = useState("");
 
   // State for the "Create Event" form
   const [eventForm, setEventForm] = useState({
@@ -20,6 +30,7 @@ function ClubDashboard() {
     description: "",
     start_time: "",
     end_time: "",
+    category_ids: [],
   });
 
   // State for the "Book Venue" form
@@ -36,6 +47,8 @@ function ClubDashboard() {
       return;
     }
     const parsedClub = JSON.parse(clubData);
+    // every request after login carries the session token
+    axios.defaults.headers.common.Authorization = `Bearer ${parsedClub.token}`;
     setClub(parsedClub);
 
     if (parsedClub.club_id) {
@@ -47,21 +60,52 @@ function ClubDashboard() {
     }
   }, [navigate]);
 
+  // Live updates: booking status and attendee counts are pushed by the
+  // server, so the events list is patched in place instead of reloaded
+  useEffect(() => {
+    if (!club?.club_id) return;
+    const source = new EventSource(
+      `http://localhost:8000/club/${club.club_id}/stream?token=${club.token}`,
+    );
+    source.onmessage = (e) => {
+      const update = JSON.parse(e.data);
+      if (update.type === "resync") {
+        fetchData(club.club_id);
+        return;
+      }
+      const patch =
+        update.type === "booking_status"
+          ? { booking_status: update.status }
+          : update.type === "attendee_count"
+            ? { attendee_count: update.attendee_count }
+            : null;
+      if (!patch) return;
+      setClubEvents((prev) =>
+        prev.map((event) =>
+          event.event_id === update.event_id ? { ...event, ...patch } : event,
+        ),
+      );
+    };
+    return () => source.close();
+  }, [club]);
+
   // 2. Data Fetching Function (UPDATED)
   const fetchData = async (clubId) => {
     setLoading(true);
     setError("");
     try {
-      // UPDATED: Fetch all data in parallel
-      const [eventsRes, venuesRes, unbookedEventsRes] = await Promise.all([
-        axios.get(`http://localhost:8000/club/${clubId}/events`),
-        axios.get(`http://localhost:8000/club/venues`),
-        axios.get(`http://localhost:8000/club/${clubId}/events/unbooked`),
-      ]);
-
-      setClubEvents(eventsRes.data || []);
-      setVenues(venuesRes.data || []);
-      setUnbookedEvents(unbookedEventsRes.data || []);
+      // One request for events, venues and unbooked events
+      const res = await axios.get(
+        `http://localhost:8000/club/${clubId}/dashboard`,
+      );
+
+      setClubEvents(res.data.events || []);
+      setEventsCursor(res.data.next_cursor);
+      setVenues(res.data.venues || []);
+      setUnbookedEvents(res.data.unbooked_events || []);
+      setCategories(res.data.categories || []);
+      const items = await axios.get("http://localhost:8000/club/equipment");
+      setEquipment(items.data || []);
     } catch (err) {
       console.error("Failed to load club data:", err);
       setError("Failed to load club data. Please try again.");
@@ -70,13 +114,54 @@ function ClubDashboard() {
     }
   };
 
+  // Fetch the next page of club events
+  const loadMoreEvents = async () => {
+    try {
+      const res = await axios.get(
+        `http://localhost:8000/club/${club.club_id}/events`,
+        { params: { cursor: eventsCursor } },
+      );
+      setClubEvents((prev) => prev.concat(res.data.events || []));
+      setEventsCursor(res.data.next_cursor);
+    } catch (err) {
+      console.error("Failed to load more events:", err);
+      setError("Failed to load more events. Please try again.");
+    }
+  };
+
   // 3. Form Input Handlers
   const handleEventFormChange = (e) => {
     setEventForm({ ...eventForm, [e.target.name]: e.target.value });
   };
 
-  const handleBookingFormChange = (e) => {
+  const toggleEventCategory = (categoryId) => {
+    setEventForm((prev) => ({
+      ...prev,
+      category_ids: prev.category_ids.includes(categoryId)
+        ? prev.category_ids.filter((id) => id !== categoryId)
+        : prev.category_ids.concat(categoryId),
+    }));
+  };
+
+  const handleBookingFormChange = async (e) => {
     setBookingForm({ ...bookingForm, [e.target.name]: e.target.value });
+
+    // Only offer venues that are free for the selected event's time slot
+    if (e.target.name === "event_id") {
+      const selected = unbookedEvents.find(
+        (event) => String(event.event_id) === e.target.value,
+      );
+      try {
+        const res = selected
+          ? await axios.get(`http://localhost:8000/club/venues/available`, {
+              params: { start: selected.start_time, end: selected.end_time },
+            })
+          : await axios.get(`http://localhost:8000/club/venues`);
+        setVenues(res.data || []);
+      } catch (err) {
+        console.error("Failed to load available venues:", err);
+      }
+    }
   };
 
   // 4. Action: Create a new Event
@@ -95,6 +180,7 @@ function ClubDashboard() {
         description: "",
         start_time: "",
         end_time: "",
+        category_ids: [],
       });
     } catch (err) {
       setFormError(err.response?.data?.detail || "Failed to create event.");
@@ -106,11 +192,8 @@ function ClubDashboard() {
     e.preventDefault();
     setFormError("");
     try {
-      // We must pass the user_id as a query parameter
-      const params = { requested_by: club.user_id };
-      await axios.post(`http://localhost:8000/club/bookings`, bookingForm, {
-        params,
-      });
+      // The requesting member is taken from the session token
+      await axios.post(`http://localhost:8000/club/bookings`, bookingForm);
       // Refresh event list to show 'Pending' status
       fetchData(club.club_id);
       setBookingForm({ event_id: "", venue_id: "" });
@@ -119,13 +202,63 @@ function ClubDashboard() {
     }
   };
 
-  // 6. Action: Logout
+  // 6. Action: Reserve equipment for a booked event
+  const bookedEvents = clubEvents.filter(
+    (event) => event.booking_id && event.booking_status !== "Rejected",
+  );
+
+  const handleEquipmentFormChange = async (e) => {
+    const form = { ...equipmentForm, [e.target.name]: e.target.value };
+    setEquipmentForm(form);
+    setEquipmentMessage("");
+    // Free units of the item over the event, shown next to the form
+    const event = bookedEvents.find(
+      (item) => String(item.booking_id) === String(form.booking_id),
+    );
+    if (!event || !form.equipment_id) {
+      setEquipmentFree(null);
+      return;
+    }
+    try {
+      const res = await axios.get(
+        `http://localhost:8000/club/equipment/${form.equipment_id}/availability`,
+        { params: { start: event.start_time, end: event.end_time } },
+      );
+      setEquipmentFree(res.data.free);
+    } catch (err) {
+      console.error("Failed to check equipment availability:", err);
+      setEquipmentFree(null);
+    }
+  };
+
+  const handleReserveEquipment = async (e) => {
+    e.preventDefault();
+    setFormError("");
+    try {
+      const res = await axios.post(
+        `http://localhost:8000/club/${club.club_id}/bookings/${equipmentForm.booking_id}/equipment`,
+        {
+          equipment_id: Number(equipmentForm.equipment_id),
+          quantity: Number(equipmentForm.quantity),
+        },
+      );
+      setEquipmentFree(res.data.free);
+      setEquipmentMessage(res.data.message);
+    } catch (err) {
+      setFormError(
+        err.response?.data?.detail || "Failed to reserve equipment.",
+      );
+    }
+  };
+
+  // 7. Action: Logout
   const handleLogout = () => {
     localStorage.removeItem("club");
+    delete axios.defaults.headers.common.Authorization;
     navigate("/");
   };
 
-  // 7. Render
+  // 8. Render
   if (loading && !club) {
     return (
       <div className="min-h-screen bg-gradient-to-b from-gray-900 to-black text-white flex items-center justify-center">
@@ -204,6 +337,27 @@ function ClubDashboard() {
                 required
                 className="w-full bg-gray-700 text-white px-4 py-3 rounded-lg focus:outline-none focus:ring-2 focus:ring-red-500"
               />
+              {categories.length > 0 && (
+                <div className="flex flex-wrap gap-3 text-sm">
+                  {categories.map((category) => (
+                    <label
+                      key={category.category_id}
+                      className="flex items-center gap-2 bg-gray-700 px-3 py-2 rounded-lg"
+                    >
+                      <input
+                        type="checkbox"
+                        checked={eventForm.category_ids.includes(
+                          category.category_id,
+                        )}
+                        onChange={() =>
+                          toggleEventCategory(category.category_id)
+                        }
+                      />
+                      {category.category_name}
+                    </label>
+                  ))}
+                </div>
+              )}
               <button
                 type="submit"
                 className="w-full bg-red-600 hover:bg-red-700 text-white font-bold rounded-lg px-6 py-3 transition"
@@ -261,6 +415,67 @@ function ClubDashboard() {
               </button>
             </form>
           </div>
+
+          {/* Reserve Equipment Form */}
+          <div className="bg-gray-800 p-6 rounded-lg">
+            <h2 className="text-2xl font-bold mb-6">Reserve Equipment</h2>
+            <form onSubmit={handleReserveEquipment} className="space-y-4">
+              <p className="text-sm text-gray-400">
+                Select one of your booked events and the equipment it needs.
+              </p>
+              <select
+                name="booking_id"
+                value={equipmentForm.booking_id}
+                onChange={handleEquipmentFormChange}
+                required
+                className="w-full bg-gray-700 text-white px-4 py-3 rounded-lg focus:outline-none focus:ring-2 focus:ring-red-500"
+              >
+                <option value="">Select a Booked Event</option>
+                {bookedEvents.map((event) => (
+                  <option key={event.booking_id} value={event.booking_id}>
+                    {event.event_name} ({event.booking_status})
+                  </option>
+                ))}
+              </select>
+              <select
+                name="equipment_id"
+                value={equipmentForm.equipment_id}
+                onChange={handleEquipmentFormChange}
+                required
+                className="w-full bg-gray-700 text-white px-4 py-3 rounded-lg focus:outline-none focus:ring-2 focus:ring-red-500"
+              >
+                <option value="">Select Equipment</option>
+                {equipment.map((item) => (
+                  <option key={item.equipment_id} value={item.equipment_id}>
+                    {item.equipment_name} ({item.quantity} units)
+                  </option>
+                ))}
+              </select>
+              <input
+                type="number"
+                name="quantity"
+                min="1"
+                value={equipmentForm.quantity}
+                onChange={handleEquipmentFormChange}
+                required
+                className="w-full bg-gray-700 text-white px-4 py-3 rounded-lg focus:outline-none focus:ring-2 focus:ring-red-500"
+              />
+              {equipmentFree !== null && (
+                <p className="text-sm text-gray-400">
+                  {equipmentFree} unit(s) free during the event
+                </p>
+              )}
+              {equipmentMessage && (
+                <p className="text-sm text-green-300">{equipmentMessage}</p>
+              )}
+              <button
+                type="submit"
+                className="w-full bg-red-600 hover:bg-red-700 text-white font-bold rounded-lg px-6 py-3 transition"
+              >
+                Reserve Equipment
+              </button>
+            </form>
+          </div>
         </div>
 
         {/* List of Club's Events */}
@@ -306,6 +521,14 @@ function ClubDashboard() {
               ))}
             </div>
           )}
+          {eventsCursor && (
+            <button
+              onClick={loadMoreEvents}
+              className="mt-6 bg-gray-800 hover:bg-gray-700 text-white font-bold rounded-lg px-6 py-3 transition"
+            >
+              Load more events
+            </button>
+          )}
         </div>
       </div>
     </div>
@@ -7,6 +7,20 @@ function StudentDashboard() {
   const [student, setStudent] = useState(null);
   const [events, setEvents] = useState([]);
   const [registrations, setRegistrations] = useState([]);
+  const [registeredIds, setRegisteredIds] = useState(new Set());
+  const [waitlist, setWaitlist] = useState([]);
+  const [fullIds, setFullIds] = useState(new Set());
+  const [eventsCursor, setEventsCursor] = useState(null);
+  const [query, setQuery] = useState("");
+  const [results, setResults] = useState(null);
+  const [filters, setFilters] = useState({
+    club_id: "",
+    category_id: "",
+    has_venue: false,
+    from_date: "",
+    to_date: "",
+  });
+  const [browse, setBrowse] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
 
@@ -18,6 +32,8 @@ function StudentDashboard() {
     }
 
     const parsedStudent = JSON.parse(studentData);
+    // every request after login carries the session token
+    axios.defaults.headers.common.Authorization = `Bearer ${parsedStudent.token}`;
     setStudent(parsedStudent);
 
     // Check if user_id exists before fetching
@@ -30,21 +46,43 @@ function StudentDashboard() {
     }
   }, [navigate]);
 
+  // The dashboard carries the first page of registrations,
+  // follow next_cursor for the rest
+  const fetchRemainingRegistrations = async (studentId, cursor) => {
+    let rest = [];
+    while (cursor) {
+      const res = await axios.get(
+        `http://localhost:8000/student/${studentId}/registrations`,
+        { params: { cursor } },
+      );
+      rest = rest.concat(res.data.events || []);
+      cursor = res.data.next_cursor;
+    }
+    return rest;
+  };
+
   const fetchData = async (studentId) => {
     setLoading(true); // Show loading state on refetch
     setError("");
 
     try {
-      // Fetch both in parallel
-      const [eventsRes, registrationsRes] = await Promise.all([
-        axios.get(`http://localhost:8000/student/${studentId}/events`),
-        axios.get(`http://localhost:8000/student/${studentId}/registrations`),
+      // One request for events, registrations and registered flags
+      const res = await axios.get(
+        `http://localhost:8000/student/${studentId}/dashboard`,
+      );
+      const [rest, waiting] = await Promise.all([
+        fetchRemainingRegistrations(
+          studentId,
+          res.data.registrations_next_cursor,
+        ),
+        axios.get(`http://localhost:8000/student/${studentId}/waitlist`),
       ]);
 
-      // The API for events returns an object { student_id: ..., events: [...] }
-      setEvents(eventsRes.data.events || []);
-      // The API for registrations returns a direct list [...]
-      setRegistrations(registrationsRes.data || []);
+      setEvents(res.data.events || []);
+      setEventsCursor(res.data.next_cursor);
+      setRegistrations((res.data.registrations || []).concat(rest));
+      setRegisteredIds(new Set(res.data.registered_event_ids || []));
+      setWaitlist(waiting.data.waitlist || []);
     } catch (err) {
       console.error("Failed to load dashboard data:", err);
       setError("Failed to load dashboard data. Please try again.");
@@ -53,6 +91,95 @@ function StudentDashboard() {
     }
   };
 
+  const loadMoreEvents = async () => {
+    try {
+      const res = await axios.get(
+        `http://localhost:8000/student/${student.user_id}/events`,
+        { params: { cursor: eventsCursor } },
+      );
+      setEvents((prev) => prev.concat(res.data.events || []));
+      setEventsCursor(res.data.next_cursor);
+    } catch (err) {
+      console.error("Failed to load more events:", err);
+      setError("Failed to load more events. Please try again.");
+    }
+  };
+
+  // Search as the student types, any word can be a prefix
+  useEffect(() => {
+    const q = query.trim();
+    if (!q) {
+      setResults(null);
+      return;
+    }
+    let stale = false;
+    const timer = setTimeout(async () => {
+      try {
+        const res = await axios.get(
+          "http://localhost:8000/student/events/search",
+          { params: { q } },
+        );
+        if (!stale) setResults(res.data.events || []);
+      } catch (err) {
+        console.error("Search failed:", err);
+        if (!stale) setError("Search failed. Please try again.");
+      }
+    }, 200);
+    return () => {
+      stale = true;
+      clearTimeout(timer);
+    };
+  }, [query]);
+
+  // Filtered listing and the facet counts, empty filters are left out
+  const browseParams = (cursor) => {
+    const params = Object.fromEntries(
+      Object.entries(filters).filter(([, value]) => value),
+    );
+    return cursor ? { ...params, cursor } : params;
+  };
+  const filtering = Object.values(filters).some(Boolean);
+
+  useEffect(() => {
+    if (!student) return;
+    axios
+      .get("http://localhost:8000/student/events/browse", {
+        params: browseParams(),
+      })
+      .then((res) => setBrowse(res.data))
+      .catch((err) => {
+        console.error("Failed to filter events:", err);
+        setError(err.response?.data?.detail || "Failed to filter events.");
+      });
+  }, [student, filters]);
+
+  const loadMoreBrowse = async () => {
+    try {
+      const res = await axios.get(
+        "http://localhost:8000/student/events/browse",
+        { params: browseParams(browse.next_cursor) },
+      );
+      setBrowse((prev) => ({
+        ...res.data,
+        events: prev.events.concat(res.data.events || []),
+      }));
+    } catch (err) {
+      console.error("Failed to load more events:", err);
+      setError("Failed to load more events. Please try again.");
+    }
+  };
+
+  const handleFilterChange = (e) => {
+    const { name, type, value, checked } = e.target;
+    setFilters((prev) => ({
+      ...prev,
+      [name]: type === "checkbox" ? checked : value,
+    }));
+  };
+
+  const shownEvents =
+    results ?? (filtering && browse ? browse.events || [] : events);
+
   const handleRegister = async (eventId) => {
     try {
       await axios.post(
@@ -61,23 +188,65 @@ function StudentDashboard() {
       // Refetch data to show the new registration and update the button
       fetchData(student.user_id);
     } catch (err) {
-      console.error(
-        "Registration failed:",
-        err.response?.data?.detail || "Registration failed",
+      const detail = err.response?.data?.detail || "Registration failed";
+      console.error("Registration failed:", detail);
+      if (err.response?.status === 409 && detail === "Error: Event is full.") {
+        // Offer the waitlist instead of another retry
+        setFullIds((prev) => new Set(prev).add(eventId));
+      }
+      setError(detail);
+    }
+  };
+
+  const handleUnregister = async (eventId) => {
+    try {
+      await axios.delete(
+        `http://localhost:8000/student/${student.user_id}/register/${eventId}`,
+      );
+      fetchData(student.user_id);
+    } catch (err) {
+      setError(err.response?.data?.detail || "Cancelling failed");
+    }
+  };
+
+  // Waitlisted students are registered in join order as seats free up
+  const handleJoinWaitlist = async (eventId) => {
+    try {
+      await axios.post(
+        `http://localhost:8000/student/${student.user_id}/waitlist/${eventId}`,
+      );
+      setError("");
+      fetchData(student.user_id);
+    } catch (err) {
+      setError(err.response?.data?.detail || "Joining the waitlist failed");
+    }
+  };
+
+  const handleLeaveWaitlist = async (eventId) => {
+    try {
+      await axios.delete(
+        `http://localhost:8000/student/${student.user_id}/waitlist/${eventId}`,
       );
-      setError(err.response?.data?.detail || "Registration failed");
+      fetchData(student.user_id);
+    } catch (err) {
+      setError(err.response?.data?.detail || "Leaving the waitlist failed");
     }
   };
 
   const handleLogout = () => {
     localStorage.removeItem("student");
+    delete axios.defaults.headers.common.Authorization;
     navigate("/");
   };
 
+  // Later event pages come without is_registered, so check the id set
   const isRegistered = (eventId) => {
-    return registrations.some((reg) => reg.event_id === eventId);
+    return registeredIds.has(eventId);
   };
 
+  const waitlistEntry = (eventId) =>
+    waitlist.find((entry) => entry.event_id === eventId);
+
   if (loading && !student) {
     return (
       <div className="min-h-screen bg-gradient-to-b from-gray-900 to-black text-white flex items-center justify-center">
@@ -140,24 +309,144 @@ function StudentDashboard() {
                       {new Date(event.start_time).toLocaleString()}
                     </span>
                   </div>
+                  {new Date(event.start_time) > new Date() && (
+                    <button
+                      onClick={() => handleUnregister(event.event_id)}
+                      className="mt-4 bg-gray-700 hover:bg-gray-600 text-white font-bold rounded-lg px-4 py-2 text-sm transition"
+                    >
+                      Unregister
+                    </button>
+                  )}
                 </div>
               ))}
             </div>
           )}
         </div>
 
+        {waitlist.length > 0 && (
+          <div className="mb-12">
+            <h2 className="text-2xl font-bold mb-6 flex items-center gap-2">
+              Your Waitlists
+            </h2>
+            <div className="grid gap-4">
+              {waitlist.map((entry) => (
+                <div
+                  key={entry.event_id}
+                  className="bg-gray-800 rounded-lg p-6 flex justify-between items-center"
+                >
+                  <div>
+                    <h3 className="text-xl font-bold mb-2">
+                      {entry.event_name}
+                    </h3>
+                    <div className="flex flex-col gap-2 text-sm text-gray-400">
+                      <span>
+                        <strong>Club:</strong> {entry.club_name}
+                      </span>
+                      <span>
+                        <strong>Starts:</strong>{" "}
+                        {new Date(entry.start_time).toLocaleString()}
+                      </span>
+                      <span>
+                        <strong>Position:</strong> {entry.position} of{" "}
+                        {entry.waiting}
+                      </span>
+                    </div>
+                  </div>
+                  <button
+                    onClick={() => handleLeaveWaitlist(entry.event_id)}
+                    className="bg-gray-700 hover:bg-gray-600 text-white font-bold rounded-lg px-4 py-2 text-sm transition"
+                  >
+                    Leave waitlist
+                  </button>
+                </div>
+              ))}
+            </div>
+          </div>
+        )}
+
         <div>
           <h2 className="text-2xl font-bold mb-6 flex items-center gap-2">
             Available Events
           </h2>
+          <input
+            type="search"
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
+            placeholder="Search events, clubs or categories"
+            maxLength={200}
+            className="w-full mb-4 bg-gray-800 text-white rounded-lg px-4 py-3 focus:outline-none focus:ring-2 focus:ring-red-600"
+          />
+          {!results && (
+            <div className="flex flex-wrap items-center gap-3 mb-6 text-sm">
+              <select
+                name="category_id"
+                value={filters.category_id}
+                onChange={handleFilterChange}
+                className="bg-gray-800 text-white rounded-lg px-3 py-2"
+              >
+                <option value="">All categories</option>
+                {(browse?.facets.categories || []).map((category) => (
+                  <option
+                    key={category.category_id}
+                    value={category.category_id}
+                  >
+                    {category.category_name} ({category.count})
+                  </option>
+                ))}
+              </select>
+              <select
+                name="club_id"
+                value={filters.club_id}
+                onChange={handleFilterChange}
+                className="bg-gray-800 text-white rounded-lg px-3 py-2"
+              >
+                <option value="">All clubs</option>
+                {(browse?.facets.clubs || []).map((club) => (
+                  <option key={club.club_id} value={club.club_id}>
+                    {club.club_name} ({club.count})
+                  </option>
+                ))}
+              </select>
+              <input
+                type="date"
+                name="from_date"
+                value={filters.from_date}
+                onChange={handleFilterChange}
+                className="bg-gray-800 text-white rounded-lg px-3 py-2"
+              />
+              <input
+                type="date"
+                name="to_date"
+                value={filters.to_date}
+                onChange={handleFilterChange}
+                className="bg-gray-800 text-white rounded-lg px-3 py-2"
+              />
+              <label className="flex items-center gap-2 text-gray-300">
+                <input
+                  type="checkbox"
+                  name="has_venue"
+                  checked={filters.has_venue}
+                  onChange={handleFilterChange}
+                />
+                Venue confirmed
+              </label>
+              {filtering && browse && (
+                <span className="text-gray-400">{browse.total} events</span>
+              )}
+            </div>
+          )}
           {loading && events.length === 0 && (
             <p className="text-gray-400">Loading events...</p>
           )}
-          {!loading && events.length === 0 ? (
-            <p className="text-gray-400">No events available</p>
+          {!loading && shownEvents.length === 0 ? (
+            <p className="text-gray-400">
+              {results || filtering
+                ? "No events match your search"
+                : "No events available"}
+            </p>
           ) : (
             <div className="grid gap-4">
-              {events.map((event) => (
+              {shownEvents.map((event) => (
                 <div
                   key={event.event_id}
                   className="bg-gray-800 rounded-lg p-6"
@@ -190,6 +479,17 @@ function StudentDashboard() {
                       <span className="bg-green-900/50 text-green-300 px-4 py-2 rounded-lg font-bold">
                         Registered
                       </span>
+                    ) : waitlistEntry(event.event_id) ? (
+                      <span className="bg-yellow-900/50 text-yellow-300 px-4 py-2 rounded-lg font-bold">
+                        Waitlisted #{waitlistEntry(event.event_id).position}
+                      </span>
+                    ) : fullIds.has(event.event_id) ? (
+                      <button
+                        onClick={() => handleJoinWaitlist(event.event_id)}
+                        className="bg-yellow-600 hover:bg-yellow-700 text-white font-bold rounded-lg px-6 py-2 transition"
+                      >
+                        Join waitlist
+                      </button>
                     ) : (
                       <button
                         onClick={() => handleRegister(event.event_id)}
@@ -203,6 +503,22 @@ function StudentDashboard() {
               ))}
             </div>
           )}
+          {filtering && !results && browse?.next_cursor && (
+            <button
+              onClick={loadMoreBrowse}
+              className="mt-6 bg-gray-800 hover:bg-gray-700 text-white font-bold rounded-lg px-6 py-3 transition"
+            >
+              Load more events
+            </button>
+          )}
+          {eventsCursor && !results && !filtering && (
+            <button
+              onClick={loadMoreEvents}
+              className="mt-6 bg-gray-800 hover:bg-gray-700 text-white font-bold rounded-lg px-6 py-3 transition"
+            >
+              Load more events
+            </button>
+          )}
         </div>
       </div>
     </div>
@@ -0,0 +1,18 @@
+-- Migration 1: secondary indexes for the router queries
+-- for databases created from ddl.sql before these indexes were added,
+-- fresh installs from ddl.sql already contain them (and record version 1)
+
+-- upcoming events catalog: range scan from NOW() / the cursor
+CREATE INDEX idx_events_start_time ON events (start_time, event_id);
+-- club events listing: equality on club_id, then range scan on the cursor
+CREATE INDEX idx_events_club_start ON events (club_id, start_time, event_id);
+
+-- pending bookings list: WHERE status = 'Pending' ORDER BY request_timestamp
+CREATE INDEX idx_bookings_status_requested ON bookings (status, request_timestamp);
+-- venue overlap check (fn_CheckVenueAvailability / pending list):
+-- venue_id + status equality, event_id covered for the join to events
+CREATE INDEX idx_bookings_venue_status ON bookings (venue_id, status, event_id);
+-- event listings: LEFT JOIN bookings ON event_id AND status = 'Approved'
+CREATE INDEX idx_bookings_event_status ON bookings (event_id, status, venue_id);
+-- audit log: ORDER BY log_timestamp DESC LIMIT 50 reads the index backwards
+CREATE INDEX idx_audit_log_timestamp ON audit_log (log_timestamp);
@@ -0,0 +1,110 @@
+-- Migration 2: capacity-aware registration
+-- adds the event_seats counter, backfills it from approved bookings and
+-- replaces sp_RegisterForEvent / sp_ApproveBooking with the versions in ddl.sql
+
+-- Per-event seat counter for capacity-limited registration.
+-- capacity comes from the approved venue (set by sp_ApproveBooking),
+-- seats_taken is bumped by sp_RegisterForEvent with a conditional UPDATE
+CREATE TABLE event_seats (
+    event_id INT UNSIGNED PRIMARY KEY,
+    capacity INT UNSIGNED NOT NULL,
+    seats_taken INT UNSIGNED NOT NULL DEFAULT 0,
+    FOREIGN KEY (event_id) REFERENCES events(event_id) ON DELETE CASCADE
+);
+
+-- Backfill: one row per event with an approved booking
+INSERT INTO event_seats (event_id, capacity, seats_taken)
+SELECT b.event_id, MAX(v.capacity),
+       (SELECT COUNT(*) FROM attendees a WHERE a.event_id = b.event_id)
+FROM bookings b
+JOIN venues v ON b.venue_id = v.venue_id
+WHERE b.status = 'Approved'
+GROUP BY b.event_id;
+
+DROP PROCEDURE IF EXISTS sp_RegisterForEvent;
+DROP PROCEDURE IF EXISTS sp_ApproveBooking;
+
+DELIMITER //
+
+/**
+ * Procedure: sp_RegisterForEvent
+ * Purpose: Registers a user for an event, with error handling.
+ * Enforces the capacity of the event's approved venue through the
+ * event_seats counter: one conditional UPDATE takes a seat, so concurrent
+ * registrations can never overbook. Events without a row in event_seats
+ * (no approved venue yet) are not capacity limited.
+ * The caller commits right after the call, which keeps the counter's
+ * row lock short.
+ * Parameters: u_id (INT) - The user_id registering.
+ * e_id (INT) - The event_id to register for.
+ */
+CREATE PROCEDURE sp_RegisterForEvent(IN u_id INT UNSIGNED, IN e_id INT UNSIGNED)
+BEGIN
+    -- Declare an exit handler for SQLSTATE 1062 (Duplicate entry for key)
+    DECLARE EXIT HANDLER FOR 1062
+    BEGIN
+        SELECT 'Error: User is already registered for this event.' AS message;
+    END;
+
+    -- Attempt to insert the new attendee (duplicates fail here, before the counter is touched)
+    INSERT INTO attendees (user_id, event_id) VALUES (u_id, e_id);
+
+    -- Take a seat: only succeeds while seats_taken < capacity
+    UPDATE event_seats
+    SET seats_taken = seats_taken + 1
+    WHERE event_id = e_id AND seats_taken < capacity;
+
+    IF ROW_COUNT() = 0 AND EXISTS (SELECT 1 FROM event_seats WHERE event_id = e_id) THEN
+        -- Sold out: undo the attendee insert
+        DELETE FROM attendees WHERE user_id = u_id AND event_id = e_id;
+        SELECT 'Error: Event is full.' AS message;
+    ELSE
+        -- If successful
+        SELECT 'Registration successful.' AS message;
+    END IF;
+END //
+
+/**
+ * Procedure: sp_ApproveBooking
+ * Purpose: Approves a 'Pending' booking *if* the venue is available.
+ * If not, it rejects the booking to prevent a conflict.
+ * On approval the event's seat counter takes the venue's capacity.
+ * Parameters: b_id (INT) - The booking_id to approve.
+ */
+CREATE PROCEDURE sp_ApproveBooking(IN b_id INT UNSIGNED)
+BEGIN
+    DECLARE v_id INT;
+    DECLARE ev_id INT UNSIGNED;
+    DECLARE e_start DATETIME;
+    DECLARE e_end DATETIME;
+    DECLARE is_available BOOLEAN;
+    DECLARE current_status VARCHAR(50);
+
+    SELECT b.status, b.venue_id, b.event_id, e.start_time, e.end_time
+    INTO current_status, v_id, ev_id, e_start, e_end
+    FROM bookings b
+    JOIN events e ON b.event_id = e.event_id
+    WHERE b.booking_id = b_id;
+
+    IF current_status = 'Pending' THEN
+        -- Use our function to check for conflicts
+        SET is_available = fn_CheckVenueAvailability(v_id, e_start, e_end);
+        
+        IF is_available THEN
+            UPDATE bookings SET status = 'Approved' WHERE booking_id = b_id;
+            -- Seats now come from the approved venue
+            INSERT INTO event_seats (event_id, capacity, seats_taken)
+            SELECT ev_id, v.capacity, fn_GetAttendeeCount(ev_id)
+            FROM venues v WHERE v.venue_id = v_id
+            ON DUPLICATE KEY UPDATE capacity = VALUES(capacity);
+            SELECT 'Booking approved successfully.' AS message;
+        ELSE
+            UPDATE bookings SET status = 'Rejected' WHERE booking_id = b_id;
+            SELECT 'Booking rejected: Venue conflict detected.' AS message;
+        END IF;
+    ELSE
+        SELECT 'Booking is not in Pending status.' AS message;
+    END IF;
+END //
+
+DELIMITER ;
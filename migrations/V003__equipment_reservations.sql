@@ -0,0 +1,59 @@
+-- Migration 3: quantity-aware equipment reservations
+-- equipment gets the number of units owned, reservations carry their event's
+-- time window so the ones overlapping a request are an index range scan, and
+-- trg_CheckEquipmentAvailability no longer refuses items by their static
+-- status: the reservation route checks the free units over time instead
+
+ALTER TABLE equipment
+    ADD COLUMN quantity INT UNSIGNED NOT NULL DEFAULT 1 CHECK (quantity > 0);
+
+ALTER TABLE booking_equipment
+    ADD COLUMN start_time DATETIME NULL,
+    ADD COLUMN end_time DATETIME NULL;
+
+-- Backfill: events are not rescheduled, their window is copied once
+UPDATE booking_equipment be
+JOIN bookings b ON be.booking_id = b.booking_id
+JOIN events e ON b.event_id = e.event_id
+SET be.start_time = e.start_time, be.end_time = e.end_time;
+
+ALTER TABLE booking_equipment
+    MODIFY start_time DATETIME NOT NULL,
+    MODIFY end_time DATETIME NOT NULL;
+
+-- reservations overlapping [start, end) of one item: equality on
+-- equipment_id, range on end_time > start (reservations long past are skipped)
+CREATE INDEX idx_booking_equipment_window ON booking_equipment (equipment_id, end_time, start_time);
+
+DROP TRIGGER IF EXISTS trg_CheckEquipmentAvailability;
+
+DELIMITER //
+
+/**
+ * Trigger: trg_CheckEquipmentAvailability
+ * Purpose: Prevents booking equipment that is out of service, or more units
+ * than the item has. Overlapping reservations are checked by the API.
+ * Event: BEFORE INSERT on `booking_equipment`
+ */
+CREATE TRIGGER trg_CheckEquipmentAvailability
+BEFORE INSERT ON booking_equipment
+FOR EACH ROW
+BEGIN
+    DECLARE eq_status VARCHAR(50);
+    DECLARE eq_quantity INT UNSIGNED;
+
+    SELECT status, quantity
+    INTO eq_status, eq_quantity
+    FROM equipment
+    WHERE equipment_id = NEW.equipment_id;
+
+    IF eq_status = 'Under Maintenance' THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot book equipment: Item is under maintenance.';
+    ELSEIF NEW.quantity > eq_quantity THEN
+        SIGNAL SQLSTATE '45000'
+        SET MESSAGE_TEXT = 'Cannot book equipment: Item does not have that many units.';
+    END IF;
+END //
+
+DELIMITER ;
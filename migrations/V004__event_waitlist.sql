@@ -0,0 +1,69 @@
+-- Migration 4: waitlist for full events
+-- adds event_waitlist, the ticket counter it draws from and replaces
+-- sp_RegisterForEvent with the version in ddl.sql, which leaves freed seats
+-- to the waitlist instead of the first student to retry
+
+-- the next waitlist ticket of the event, tickets only go up so they keep
+-- the order students joined in
+ALTER TABLE event_seats
+    ADD COLUMN next_ticket INT UNSIGNED NOT NULL DEFAULT 1;
+
+-- Per-event FIFO waitlist of a full event, drained into attendees by the
+-- promotion worker as seats free up. the PK is the queue order
+CREATE TABLE event_waitlist (
+    event_id INT UNSIGNED NOT NULL,
+    ticket INT UNSIGNED NOT NULL,
+    user_id INT UNSIGNED NOT NULL,
+    joined_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (event_id, ticket),
+    CONSTRAINT uq_event_waitlist_user UNIQUE (user_id, event_id),
+    FOREIGN KEY (event_id) REFERENCES events(event_id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+DROP PROCEDURE IF EXISTS sp_RegisterForEvent;
+
+DELIMITER //
+
+/**
+ * Procedure: sp_RegisterForEvent
+ * Purpose: Registers a user for an event, with error handling.
+ * Enforces the capacity of the event's approved venue through the
+ * event_seats counter: one conditional UPDATE takes a seat, so concurrent
+ * registrations can never overbook. Events without a row in event_seats
+ * (no approved venue yet) are not capacity limited.
+ * While the event has a waitlist its free seats go to the waitlist (the
+ * promotion worker hands them out in order), so the event counts as full.
+ * The caller commits right after the call, which keeps the counter's
+ * row lock short.
+ * Parameters: u_id (INT) - The user_id registering.
+ * e_id (INT) - The event_id to register for.
+ */
+CREATE PROCEDURE sp_RegisterForEvent(IN u_id INT UNSIGNED, IN e_id INT UNSIGNED)
+BEGIN
+    -- Declare an exit handler for SQLSTATE 1062 (Duplicate entry for key)
+    DECLARE EXIT HANDLER FOR 1062
+    BEGIN
+        SELECT 'Error: User is already registered for this event.' AS message;
+    END;
+
+    -- Attempt to insert the new attendee (duplicates fail here, before the counter is touched)
+    INSERT INTO attendees (user_id, event_id) VALUES (u_id, e_id);
+
+    -- Take a seat: only succeeds while seats_taken < capacity and nobody waits
+    UPDATE event_seats
+    SET seats_taken = seats_taken + 1
+    WHERE event_id = e_id AND seats_taken < capacity
+      AND NOT EXISTS (SELECT 1 FROM event_waitlist w WHERE w.event_id = e_id);
+
+    IF ROW_COUNT() = 0 AND EXISTS (SELECT 1 FROM event_seats WHERE event_id = e_id) THEN
+        -- Sold out: undo the attendee insert
+        DELETE FROM attendees WHERE user_id = u_id AND event_id = e_id;
+        SELECT 'Error: Event is full.' AS message;
+    ELSE
+        -- If successful
+        SELECT 'Registration successful.' AS message;
+    END IF;
+END //
+
+DELIMITER ;
@@ -0,0 +1,148 @@
+"""
+runs EXPLAIN on every SQL string in backend/routers/*.py (and the modules in
+SQL_MODULES) and every statement in backend.queries.REGISTRY, and fails if any of them reads
+a whole table (access type ALL)
+
+    DATABASE_URL=mysql+aiomysql://... python -m scripts.check_explain
+
+bind params are filled with sample values, f-string placeholders with the
+fragments the routers substitute at runtime (see RENDER below).
+keyset listings are checked in both variants, the after-cursor one is the worst case
+"""
+
+import ast
+import asyncio
+import re
+import sys
+from pathlib import Path
+
+from sqlalchemy import text
+
+from backend import queries
+from backend.db import engine
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+ROUTERS_DIR = BACKEND_DIR / "routers"
+# backend modules with text(...) queries of their own
+SQL_MODULES = [BACKEND_DIR / "equipment.py", BACKEND_DIR / "waitlist.py"]
+
+# full scans of these are fine: tiny lookup tables, or the query genuinely
+# returns every row (e.g. the venue dropdown, the waitlist index load)
+ALLOWED_FULL_SCANS = {"roles", "categories", "venues", "equipment", "event_waitlist"}
+
+# values substituted for {name} placeholders in f-string queries
+RENDER = {
+    "where": "b.status = 'Pending'",
+}
+
+BIND_RE = re.compile(r"(?<![:\w]):(\w+)")
+ALIAS_RE = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+SQL_KEYWORDS = {"on", "where", "join", "left", "inner", "group", "order", "limit"}
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+def sample_value(name):
+    """a literal for a bind param, datetimes for anything time shaped"""
+    if "time" in name or name in ("start", "end"):
+        return "'2030-01-01 10:00:00'"
+    if name.endswith(("_day", "_date")):
+        return "'2030-01-01'"
+    if name in ("email",):
+        return "'someone@example.com'"
+    if name in ("status",):
+        return "'Pending'"
+    if name.endswith("_ids"):
+        # expanding IN params, written without their parentheses
+        return "(1)"
+    return "1"
+
+
+def table_aliases(sql):
+    """alias -> table name, EXPLAIN reports tables by alias"""
+    aliases = {}
+    for table, alias in ALIAS_RE.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def render(node):
+    """source text of a str / f-string node, None if it is not sql we can render"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+            elif isinstance(value.value, ast.Name) and value.value.id in RENDER:
+                parts.append(RENDER[value.value.id])
+            else:
+                return None
+        return "".join(parts)
+    return None
+
+
+def collect_queries():
+    """(location, sql) for every text(...) literal in the routers and SQL_MODULES"""
+    found = []
+    for path in [*sorted(ROUTERS_DIR.glob("*.py")), *SQL_MODULES]:
+        tree = ast.parse(path.read_text())
+        for node in ast.walk(tree):
+            if (
+                isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Name)
+                and node.func.id == "text"
+                and node.args
+            ):
+                sql = render(node.args[0])
+                location = f"{path.name}:{node.lineno}"
+                if sql is None:
+                    print(f"SKIP {location}: cannot render dynamic sql")
+                    continue
+                sql = sql.strip().rstrip(";")
+                if sql.upper().startswith(EXPLAINABLE):
+                    found.append((location, sql))
+    return found
+
+
+def registry_queries():
+    """(name, sql) for the precompiled statements, both variants of keyset ones"""
+    found = []
+    for name, statement in queries.REGISTRY.items():
+        if isinstance(statement, dict):
+            variants = [(f"{name}[after={after}]", s) for after, s in statement.items()]
+        else:
+            variants = [(name, statement)]
+        for location, variant in variants:
+            found.append((f"queries.{location}", variant.element.text.strip()))
+    return found
+
+
+async def main():
+    failures = 0
+    async with engine.connect() as conn:
+        for location, sql in collect_queries() + registry_queries():
+            literal_sql = BIND_RE.sub(lambda m: sample_value(m.group(1)), sql)
+            rows = (await conn.execute(text("EXPLAIN " + literal_sql))).mappings()
+            aliases = table_aliases(sql)
+            scans = [
+                aliases.get(row["table"], row["table"])
+                for row in rows
+                if row["type"] == "ALL"
+                and row["table"]
+                and not row["table"].startswith("<")
+            ]
+            scans = [table for table in scans if table not in ALLOWED_FULL_SCANS]
+            if scans:
+                failures += 1
+                print(f"FAIL {location}: full scan of {', '.join(scans)}")
+            else:
+                print(f"ok   {location}")
+    await engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
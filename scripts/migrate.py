@@ -0,0 +1,98 @@
+"""
+applies the versioned sql files in migrations/ that the database has not seen yet,
+applied versions are recorded in the schema_migrations table
+
+    python -m scripts.migrate            # apply pending migrations
+    python -m scripts.migrate --status   # list applied / pending versions
+"""
+
+import argparse
+import asyncio
+import re
+from pathlib import Path
+
+from sqlalchemy import text
+
+from backend.db import engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+FILENAME_RE = re.compile(r"^V(\d+)__(\w+)\.sql$")
+
+
+def discover():
+    """(version, name, path) for every migration file, in version order"""
+    found = []
+    for path in MIGRATIONS_DIR.glob("V*.sql"):
+        match = FILENAME_RE.match(path.name)
+        if match:
+            found.append((int(match.group(1)), match.group(2), path))
+    return sorted(found)
+
+
+def split_statements(sql):
+    """
+    split a migration into statements, honouring DELIMITER
+    so procedures/triggers can be written like in ddl.sql
+    """
+    statements, current, delimiter = [], [], ";"
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith("DELIMITER "):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        if not current and (not stripped or stripped.startswith("--")):
+            continue
+        current.append(line)
+        if stripped.endswith(delimiter):
+            statement = "\n".join(current).strip()
+            statements.append(statement[: -len(delimiter)].strip())
+            current = []
+    if "\n".join(current).strip():
+        statements.append("\n".join(current).strip())
+    return statements
+
+
+async def applied_versions(conn):
+    await conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT UNSIGNED PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+    )
+    rows = await conn.execute(text("SELECT version FROM schema_migrations"))
+    return {row.version for row in rows}
+
+
+async def main(status_only):
+    async with engine.begin() as conn:
+        done = await applied_versions(conn)
+    for version, name, path in discover():
+        if version in done:
+            print(f"V{version:03d} {name}: applied")
+            continue
+        if status_only:
+            print(f"V{version:03d} {name}: pending")
+            continue
+        # mysql commits DDL implicitly, so each migration is only as
+        # atomic as its statements, the version row is written last
+        async with engine.begin() as conn:
+            for statement in split_statements(path.read_text()):
+                await conn.exec_driver_sql(statement)
+            await conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)"),
+                {"v": version, "n": name},
+            )
+        print(f"V{version:03d} {name}: applied now")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="apply migrations/ to the database")
+    parser.add_argument("--status", action="store_true", help="only list versions")
+    args = parser.parse_args()
+    asyncio.run(main(args.status))
@@ -0,0 +1,13 @@
+"""
+the suite runs without mysql: backend.db is pointed at an in-memory sqlite
+stand-in before anything imports it, and session tokens get a fixed secret.
+tests needing tables create them on a sqlite file of their own
+
+    python -m pytest -q
+"""
+
+import os
+
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite://"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ.setdefault("AUTH_SECRET", "test-secret")
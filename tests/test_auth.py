@@ -0,0 +1,74 @@
+"""signed session tokens: issue, decode, tampering and expiry"""
+
+import asyncio
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from backend import auth
+from backend.auth import (
+    ADMIN,
+    CLUB_MEMBER,
+    STUDENT,
+    current_student,
+    current_user,
+    decode_token,
+    issue_token,
+)
+
+
+def test_round_trip():
+    user = decode_token(issue_token(7, CLUB_MEMBER, club_id=3))
+    assert (user.user_id, user.role, user.club_id) == (7, CLUB_MEMBER, 3)
+
+
+def test_role_is_lowercased():
+    assert decode_token(issue_token(1, "Admin")).role == ADMIN
+
+
+def test_tampered_claims_are_rejected():
+    payload, signature = issue_token(7, STUDENT).split(".")
+    claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    claims["role"] = ADMIN
+    forged = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=")
+    assert decode_token(f"{forged.decode()}.{signature}") is None
+
+
+def test_tampered_signature_is_rejected():
+    payload, signature = issue_token(7, STUDENT).split(".")
+    flipped = ("A" if signature[0] != "A" else "B") + signature[1:]
+    assert decode_token(f"{payload}.{flipped}") is None
+
+
+def test_token_from_another_secret_is_rejected(monkeypatch):
+    token = issue_token(7, STUDENT)
+    monkeypatch.setattr(auth, "AUTH_SECRET", "another secret")
+    assert decode_token(token) is None
+
+
+@pytest.mark.parametrize("token", ["", "garbage", "a.b.c", "a.b"])
+def test_malformed_tokens_are_rejected(token):
+    assert decode_token(token) is None
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_TOKEN_TTL", -1)
+    assert decode_token(issue_token(7, STUDENT)) is None
+
+
+def test_current_user_needs_a_bearer_token():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(current_user(authorization=f"Basic {issue_token(7, STUDENT)}"))
+    assert error.value.status_code == 401
+    user = asyncio.run(current_user(authorization=f"Bearer {issue_token(7, STUDENT)}"))
+    assert user.user_id == 7
+
+
+def test_students_only_act_as_themselves():
+    user = decode_token(issue_token(7, STUDENT))
+    assert asyncio.run(current_student(student_id=7, user=user)) is user
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(current_student(student_id=8, user=user))
+    assert error.value.status_code == 403
@@ -0,0 +1,136 @@
+"""
+booking approval lock order, through the app on a sqlite file: the single and
+the bulk approve both lock the venues before any booking row, so the two never
+wait on each other in opposite orders. sqlite has no FOR UPDATE, the statements
+are recorded with it and run without. sp_ApproveBooking is mysql only, its
+CALL answers with the approval message
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.auth import ADMIN, issue_token
+from backend.db import get_async_db
+from backend.main import app
+from benchmarks.seed import DDL_PATH, sqlite_statement
+from scripts.migrate import split_statements
+
+HEADERS = {"Authorization": f"Bearer {issue_token(1, ADMIN)}"}
+
+ROWS = [
+    "INSERT INTO clubs (club_id, club_name) VALUES (1, 'Chess')",
+    "INSERT INTO venues (venue_id, venue_name, capacity) VALUES (1, 'Hall', 50)",
+    "INSERT INTO venues (venue_id, venue_name, capacity) VALUES (2, 'Lab', 20)",
+    """
+    INSERT INTO events (event_id, event_name, start_time, end_time, club_id)
+    VALUES (1, 'Opening', '2030-01-01 10:00:00', '2030-01-01 12:00:00', 1),
+           (2, 'Closing', '2030-01-02 10:00:00', '2030-01-02 12:00:00', 1),
+           (3, 'Overlap', '2030-01-01 11:00:00', '2030-01-01 13:00:00', 1)
+    """,
+    """
+    INSERT INTO bookings (booking_id, event_id, venue_id, request_timestamp)
+    VALUES (1, 1, 1, '2029-01-01 00:00:01'),
+           (2, 3, 1, '2029-01-01 00:00:02')
+    """,
+]
+# filed on the other venue while a bulk approve runs
+LATE_BOOKING = """
+    INSERT INTO bookings (booking_id, event_id, venue_id, request_timestamp)
+    VALUES (3, 2, 2, '2029-01-01 00:00:03')
+"""
+
+
+def kind(statement):
+    """the locks and the procedure call among the recorded statements"""
+    if "FOR UPDATE" in statement:
+        return "venues" if "FROM venues" in statement else "bookings"
+    if statement.startswith("CALL"):
+        return "call"
+    return None
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'evently.db'}")
+    recorded = []
+    file_late_booking = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute", retval=True)
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if kind(statement):
+            recorded.append(kind(statement))
+        if kind(statement) == "venues" and file_late_booking:
+            file_late_booking.clear()
+            cursor.execute(LATE_BOOKING)
+        if statement.startswith("CALL sp_ApproveBooking"):
+            return "SELECT 'Booking approved successfully.' AS message", ()
+        statement = statement.replace("FOR UPDATE", "").replace(
+            "ON DUPLICATE KEY UPDATE capacity = VALUES(capacity)",
+            "ON CONFLICT (event_id) DO UPDATE SET capacity = excluded.capacity",
+        )
+        return statement, parameters
+
+    async def setup():
+        async with engine.begin() as conn:
+            for statement in split_statements(DDL_PATH.read_text()):
+                statement = sqlite_statement(statement)
+                if statement:
+                    await conn.exec_driver_sql(statement)
+            for statement in ROWS:
+                await conn.execute(text(statement))
+
+    asyncio.run(setup())
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def test_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = test_db
+    yield recorded, file_late_booking
+    app.dependency_overrides.pop(get_async_db)
+    asyncio.run(engine.dispose())
+
+
+def post(path, body=None):
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as http:
+            return await http.post(path, json=body, headers=HEADERS)
+
+    response = asyncio.run(send())
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_single_approve_locks_the_venue_first(db):
+    recorded, _ = db
+    post("/admin/bookings/1/approve")
+    assert recorded == ["venues", "call"]
+
+
+def test_bulk_approve_locks_venues_before_bookings(db):
+    recorded, _ = db
+    body = post("/admin/bookings/bulk_approve", {"booking_ids": [1, 2]})
+    assert recorded == ["venues", "bookings"]
+    assert [r["status"] for r in body["results"]] == ["Approved", "Rejected"]
+
+
+def test_booking_filed_meanwhile_is_left_pending(db):
+    recorded, file_late_booking = db
+    file_late_booking.append(True)
+    body = post("/admin/bookings/bulk_approve", {"all_pending": True})
+    # its venue was not locked, and is not locked after the booking rows
+    assert recorded == ["venues", "bookings"]
+    assert {r["booking_id"]: r["status"] for r in body["results"]} == {
+        1: "Approved",
+        2: "Rejected",
+        3: "Pending",
+    }
+    assert (body["approved"], body["rejected"]) == (1, 1)
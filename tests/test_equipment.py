@@ -0,0 +1,60 @@
+"""equipment usage over time: the sweep behind availability and the peak"""
+
+from datetime import date
+
+from backend.equipment import usage_timeline
+
+
+def day(n):
+    return date(2026, 5, n)
+
+
+def peak(timeline):
+    return max(used for _, _, used in timeline)
+
+
+def test_empty_window_is_free():
+    assert usage_timeline([], day(1), day(5)) == [(day(1), day(5), 0)]
+
+
+def test_overlaps_add_up():
+    timeline = usage_timeline(
+        [(day(2), day(6), 3), (day(4), day(8), 2)], day(1), day(10)
+    )
+    assert timeline == [
+        (day(1), day(2), 0),
+        (day(2), day(4), 3),
+        (day(4), day(6), 5),
+        (day(6), day(8), 2),
+        (day(8), day(10), 0),
+    ]
+    assert peak(timeline) == 5
+
+
+def test_touching_intervals_do_not_count_twice():
+    timeline = usage_timeline(
+        [(day(1), day(3), 4), (day(3), day(5), 4)], day(1), day(5)
+    )
+    assert timeline == [(day(1), day(5), 4)]
+
+
+def test_intervals_are_clipped_to_the_window():
+    timeline = usage_timeline(
+        [(day(1), day(20), 1), (day(9), day(12), 2), (day(12), day(15), 9)],
+        day(5),
+        day(10),
+    )
+    assert timeline == [(day(5), day(9), 1), (day(9), day(10), 3)]
+
+
+def test_peak_against_a_daily_count():
+    intervals = [
+        (day(a), day(b), units)
+        for a, b, units in [(1, 4, 2), (2, 9, 1), (3, 5, 4), (7, 8, 3), (8, 12, 5)]
+    ]
+    timeline = usage_timeline(intervals, day(1), day(12))
+    for n in range(1, 12):
+        expected = sum(u for lo, hi, u in intervals if lo <= day(n) < hi)
+        (used,) = [u for lo, hi, u in timeline if lo <= day(n) < hi]
+        assert used == expected
+    assert peak(timeline) == 7
@@ -0,0 +1,91 @@
+"""streaming exports: the encoded rows, one chunk per batch, in bounded memory"""
+
+import asyncio
+import csv
+import io
+import json
+import tracemalloc
+
+from sqlalchemy import text
+
+from backend import export
+from backend.export import export_rows
+
+# shaped like audit_log, no table to fill
+ROWS = text(
+    """
+    WITH RECURSIVE seq (n) AS (
+        SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows
+    )
+    SELECT n AS log_id,
+           'USER_CREATED' AS action_type,
+           'synthetic, "quoted" entry number ' || n AS details
+    FROM seq
+    """
+)
+
+
+def chunks(n_rows, fmt):
+    async def collect():
+        return [chunk async for chunk in export_rows(ROWS, {"rows": n_rows}, fmt)]
+
+    return asyncio.run(collect())
+
+
+def test_csv_has_a_header_and_every_row(monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 100)
+    sent = chunks(250, "csv")
+    # the header, then one chunk per batch
+    assert len(sent) == 4
+    rows = list(csv.reader(io.StringIO("".join(sent))))
+    assert rows[0] == ["log_id", "action_type", "details"]
+    assert len(rows) == 251
+    assert rows[250] == ["250", "USER_CREATED", 'synthetic, "quoted" entry number 250']
+
+
+def test_ndjson_is_one_object_per_line(monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 100)
+    sent = chunks(250, "ndjson")
+    assert len(sent) == 3
+    lines = "".join(sent).splitlines()
+    assert len(lines) == 250
+    assert json.loads(lines[0]) == {
+        "log_id": 1,
+        "action_type": "USER_CREATED",
+        "details": 'synthetic, "quoted" entry number 1',
+    }
+
+
+def test_empty_export_is_only_the_header():
+    nothing = text(ROWS.text + " WHERE n > :rows")
+
+    async def collect(fmt):
+        return "".join(
+            [chunk async for chunk in export_rows(nothing, {"rows": 5}, fmt)]
+        )
+
+    assert asyncio.run(collect("ndjson")) == ""
+    assert asyncio.run(collect("csv")) == "log_id,action_type,details\r\n"
+
+
+def test_memory_stays_flat_however_many_rows():
+    """python allocations while streaming, kept or not, against the bytes sent"""
+    n_rows = 50_000
+
+    async def stream():
+        sent = 0
+        async for chunk in export_rows(ROWS, {"rows": n_rows}, "ndjson"):
+            sent += len(chunk)
+        return sent
+
+    # warm up the pool and the driver before measuring
+    chunks(10, "ndjson")
+    tracemalloc.start()
+    try:
+        sent = asyncio.run(stream())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert sent > 5_000_000
+    # fetchall() of the same rows peaks around 16 MB
+    assert peak < 4_000_000, f"peak {peak / 1e6:.1f} MB for {sent / 1e6:.1f} MB sent"
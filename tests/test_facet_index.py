@@ -0,0 +1,95 @@
+"""facet counts of the event browser as events are added, approved and start"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.facet_index import EventFacetIndex
+
+NOW = datetime.now().replace(microsecond=0)
+
+
+def day(n, hour=10):
+    return (NOW + timedelta(days=n)).replace(hour=hour, minute=0, second=0)
+
+
+@pytest.fixture
+def index():
+    index = EventFacetIndex(refresh=float("inf"))
+    # event_id, start, club, categories, has an approved venue
+    for event_id, start, club_id, category_ids, has_venue in [
+        (1, day(2), 10, (1,), False),
+        (2, day(2, 14), 10, (1, 2), True),
+        (3, day(3), 20, (2,), False),
+        (4, day(5), 20, (), True),
+        (5, day(8), 10, (2,), False),
+    ]:
+        index.add_event(event_id, start, club_id, category_ids, has_venue)
+    return index
+
+
+def test_counts(index):
+    total, clubs, categories = index.facets()
+    assert total == 5
+    assert clubs == Counter({10: 3, 20: 2})
+    assert categories == Counter({1: 2, 2: 3})
+
+
+def test_each_facet_ignores_its_own_filter(index):
+    total, clubs, categories = index.facets(club_id=10, category_id=2)
+    assert total == 2  # events 2 and 5
+    # clubs under category 2 only, categories under club 10 only
+    assert clubs == Counter({10: 2, 20: 1})
+    assert categories == Counter({1: 2, 2: 2})
+
+
+def test_has_venue_and_dates(index):
+    assert index.facets(has_venue=True)[0] == 2
+    total, clubs, _ = index.facets(from_date=day(2).date(), to_date=day(3).date())
+    assert total == 3
+    assert clubs == Counter({10: 2, 20: 1})
+
+
+def test_venue_approved_moves_the_event(index):
+    index.venue_approved(1)
+    index.venue_approved(1)  # twice counts once
+    assert index.facets(has_venue=True)[0] == 3
+    assert index.facets()[0] == 5
+
+
+def test_started_events_are_dropped(index):
+    index._expire(day(3, 12))
+    total, clubs, categories = index.facets()
+    assert total == 2
+    assert clubs == Counter({20: 1, 10: 1})
+    assert categories == Counter({2: 1})
+    assert day(2).date() not in index.days
+    assert index.page(10) == ([4, 5], None)
+
+
+def test_duplicates_and_past_events_are_skipped(index):
+    index.add_event(1, day(4), 20, (1,))
+    index.add_event(6, NOW - timedelta(days=1), 10, (1,))
+    assert index.facets()[0] == 5
+
+
+def test_counts_match_a_scan_after_changes(index):
+    index.add_event(6, day(2, 18), 20, (1, 2), False)
+    index.venue_approved(3)
+    index._expire(day(2, 12))
+    expected = Counter()
+    for event in index.events.values():
+        for category_id in event.category_ids:
+            expected[category_id] += 1
+    assert index.facets()[2] == expected
+    assert index.facets()[0] == len(index.events)
+
+
+def test_pages_follow_the_cursor(index):
+    ids, last = index.page(2)
+    assert ids == [1, 2]
+    ids, last = index.page(2, after=last)
+    assert ids == [3, 4]
+    assert index.page(2, after=last) == ([5], None)
+    assert index.page(10, club_id=10, category_id=2)[0] == [2, 5]
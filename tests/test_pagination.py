@@ -0,0 +1,78 @@
+"""keyset pagination: cursors and the page split of PageParams"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from backend.pagination import PageParams, decode_cursor, encode_cursor
+
+Row = namedtuple("Row", "event_id start_time venue_name")
+START = datetime(2030, 1, 1, 10, 0)
+
+
+def rows(*event_ids):
+    """one row per id, an id repeated stands for an event spanning rows"""
+    return [
+        Row(event_id, START + timedelta(hours=event_id), f"venue {i}")
+        for i, event_id in enumerate(event_ids)
+    ]
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(START, 42)
+    assert decode_cursor(cursor) == (START, 42)
+    # opaque: no padding, url safe
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+def test_cursor_round_trip_from_string():
+    assert decode_cursor(encode_cursor("2030-01-01T10:00:00", 7)) == (START, 7)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor("soon", 1)])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_page_params_after_cursor():
+    page = PageParams(cursor=encode_cursor(START, 3), limit=10)
+    assert page.after == (START, 3)
+    assert page.params() == {"page_limit": 11, "after_time": START, "after_id": 3}
+    assert page.statement({False: "first", True: "after"}) == "after"
+    first = PageParams(cursor=None, limit=10)
+    assert first.params() == {"page_limit": 11}
+    assert first.statement({False: "first", True: "after"}) == "first"
+
+
+def test_split_trims_the_extra_event():
+    page = PageParams(cursor=None, limit=2)
+    fetched = rows(1, 2, 3)
+    kept, cursor = page.split(fetched)
+    assert [row.event_id for row in kept] == [1, 2]
+    assert decode_cursor(cursor) == (fetched[1].start_time, 2)
+
+
+def test_split_last_page_has_no_cursor():
+    page = PageParams(cursor=None, limit=3)
+    kept, cursor = page.split(rows(1, 2))
+    assert [row.event_id for row in kept] == [1, 2]
+    assert cursor is None
+
+
+def test_split_keeps_every_row_of_an_event():
+    # event 2 spans two rows (two venues), it counts once
+    page = PageParams(cursor=None, limit=2)
+    kept, cursor = page.split(rows(1, 2, 2, 3))
+    assert [row.event_id for row in kept] == [1, 2, 2]
+    assert decode_cursor(cursor)[1] == 2
+
+
+def test_split_exactly_limit_events():
+    page = PageParams(cursor=None, limit=2)
+    kept, cursor = page.split(rows(1, 2, 2))
+    assert len(kept) == 3
+    assert cursor is None
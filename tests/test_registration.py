@@ -0,0 +1,189 @@
+"""
+the register route under a rush: many students posting at once for an event
+with a few seats, through the app on a sqlite file. sqlite cannot store
+sp_RegisterForEvent, so its CALL is run as the procedure's statements from
+ddl.sql on the route's own connection, with the procedure's branching around
+them. sqlite also runs one writer at a time, so this checks the route (the
+sold out gate, the 409s, the counter bookkeeping), not mysql's row locks under
+real concurrency: that is benchmarks/stress_registration.py's job
+"""
+
+import asyncio
+import re
+import sqlite3
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.auth import STUDENT, issue_token
+from backend.db import get_async_db
+from backend.main import app
+from backend.seats import FULL_MESSAGE, sold_out
+
+EVENT_ID = 1
+CAPACITY = 5
+STUDENTS = 60
+
+DDL = (Path(__file__).resolve().parent.parent / "ddl.sql").read_text()
+SCHEMA = [
+    """
+    CREATE TABLE attendees (
+        user_id INT NOT NULL, event_id INT NOT NULL,
+        PRIMARY KEY (user_id, event_id)
+    )
+    """,
+    """
+    CREATE TABLE event_seats (
+        event_id INT PRIMARY KEY, capacity INT NOT NULL,
+        seats_taken INT NOT NULL DEFAULT 0, next_ticket INT NOT NULL DEFAULT 1
+    )
+    """,
+    "CREATE TABLE event_waitlist (event_id INT, ticket INT, user_id INT)",
+]
+
+
+def procedure_statements(name):
+    """the INSERT / UPDATE / DELETE statements of a ddl.sql procedure, in order"""
+    body = re.search(rf"CREATE PROCEDURE {name}\(.*?\nEND //", DDL, re.DOTALL)
+    statements = re.findall(
+        r"^\s*((?:INSERT|UPDATE|DELETE)\b.*?);", body.group(0), re.DOTALL | re.M
+    )
+    # the procedure's parameters become named parameters
+    return [re.sub(r"\b(u_id|e_id)\b", r":\1", s) for s in statements]
+
+
+INSERT_ATTENDEE, TAKE_SEAT, UNDO_ATTENDEE = procedure_statements("sp_RegisterForEvent")
+
+
+def call_register(cursor, params):
+    """sp_RegisterForEvent's branching around its statements, the message"""
+    u_id, e_id = params
+    args = {"u_id": u_id, "e_id": e_id}
+    try:
+        cursor.execute(INSERT_ATTENDEE, args)
+    except sqlite3.IntegrityError:
+        return "Error: User is already registered for this event."
+    cursor.execute(TAKE_SEAT, args)
+    if cursor.rowcount == 0:
+        cursor.execute("SELECT 1 FROM event_seats WHERE event_id = :e_id", args)
+        if cursor.fetchone():
+            cursor.execute(UNDO_ATTENDEE, args)
+            return FULL_MESSAGE
+    return "Registration successful."
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'seats.db'}",
+        connect_args={"timeout": 30},
+    )
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute", retval=True)
+    def _call(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("CALL sp_RegisterForEvent"):
+            return "SELECT ? AS message", (call_register(cursor, parameters),)
+        return statement, parameters
+
+    async def setup():
+        async with engine.begin() as conn:
+            for statement in SCHEMA:
+                await conn.exec_driver_sql(statement)
+            await conn.execute(
+                text("INSERT INTO event_seats (event_id, capacity) VALUES (:e, :c)"),
+                {"e": EVENT_ID, "c": CAPACITY},
+            )
+
+    asyncio.run(setup())
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def test_db():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = test_db
+    sold_out.clear()
+    yield sessions
+    sold_out.clear()
+    app.dependency_overrides.pop(get_async_db)
+    asyncio.run(engine.dispose())
+
+
+async def post_register(http, user_id):
+    token = issue_token(user_id, STUDENT)
+    response = await http.post(
+        f"/student/{user_id}/register/{EVENT_ID}",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    return response.status_code
+
+
+async def rush(user_ids):
+    """everyone at once through the app, (admitted, rejected with 409)"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        codes = await asyncio.gather(*(post_register(http, u) for u in user_ids))
+    assert set(codes) <= {200, 409}, codes
+    return codes.count(200), codes.count(409)
+
+
+async def seat_counts(sessions):
+    async with sessions() as db:
+        taken = (await db.execute(text("SELECT seats_taken FROM event_seats"))).scalar()
+        attendees = (await db.execute(text("SELECT COUNT(*) FROM attendees"))).scalar()
+    return taken, attendees
+
+
+def test_procedure_statements_are_read_from_the_ddl():
+    assert INSERT_ATTENDEE.startswith("INSERT INTO attendees")
+    assert "seats_taken < capacity" in TAKE_SEAT
+    assert UNDO_ATTENDEE.startswith("DELETE FROM attendees")
+
+
+def test_rush_admits_capacity_and_rejects_the_rest(client):
+    admitted, rejected = asyncio.run(rush(range(1, STUDENTS + 1)))
+    assert (admitted, rejected) == (CAPACITY, STUDENTS - CAPACITY)
+    assert asyncio.run(seat_counts(client)) == (CAPACITY, CAPACITY)
+    assert sold_out.is_sold_out(EVENT_ID)
+
+
+def test_sold_out_event_is_rejected_without_the_db(client):
+    asyncio.run(rush(range(1, STUDENTS + 1)))
+    before = sold_out.fast_rejections
+    late = range(STUDENTS + 1, 2 * STUDENTS + 1)
+    assert asyncio.run(rush(late)) == (0, STUDENTS)
+    assert sold_out.fast_rejections - before == STUDENTS
+    assert asyncio.run(seat_counts(client)) == (CAPACITY, CAPACITY)
+
+
+def test_registering_twice_is_a_conflict(client):
+    assert asyncio.run(rush([1])) == (1, 0)
+    assert asyncio.run(rush([1])) == (0, 1)
+    assert asyncio.run(seat_counts(client)) == (1, 1)
+
+
+def test_freed_seat_goes_to_one_student(client):
+    asyncio.run(rush(range(1, CAPACITY + 1)))
+
+    async def cancel():
+        async with client() as db:
+            await db.execute(text(UNDO_ATTENDEE), {"u_id": 1, "e_id": EVENT_ID})
+            await db.execute(
+                text(
+                    """
+                    UPDATE event_seats SET seats_taken = seats_taken - 1
+                    WHERE event_id = :e_id AND seats_taken > 0
+                    """
+                ),
+                {"e_id": EVENT_ID},
+            )
+            await db.commit()
+        sold_out.clear(EVENT_ID)
+
+    asyncio.run(cancel())
+    admitted, _ = asyncio.run(rush(range(100, 130)))
+    assert admitted == 1
+    assert asyncio.run(seat_counts(client)) == (CAPACITY, CAPACITY)
@@ -0,0 +1,145 @@
+"""read replica routing: round robin, fallback to the primary, read-your-writes"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from backend import db as backend_db
+from backend.db import AsyncSessionLocal, ReplicaSet, _open_read_session
+
+MISSING = "sqlite+aiosqlite:////nonexistent/dir/replica.db"
+
+
+@pytest.fixture
+def replica_urls(tmp_path):
+    """two sqlite files standing in for replicas, each knowing its name"""
+
+    async def create(url, name):
+        replica_set = ReplicaSet([url], max_lag=5, check_interval=5)
+        async with replica_set.replicas[0].engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE whoami (name TEXT)"))
+            await conn.execute(text("INSERT INTO whoami VALUES (:n)"), {"n": name})
+        await replica_set.stop()
+
+    urls = [f"sqlite+aiosqlite:///{tmp_path}/replica{i}.db" for i in range(2)]
+    for i, url in enumerate(urls):
+        asyncio.run(create(url, f"replica{i}"))
+    return urls
+
+
+def run_with(replica_set, check):
+    async def main():
+        try:
+            await replica_set.check_all()
+            return await check()
+        finally:
+            await replica_set.stop()
+
+    return asyncio.run(main())
+
+
+async def whoami(replica):
+    db = await _open_read_session(replica)
+    try:
+        exists = (
+            await db.execute(
+                text("SELECT name FROM sqlite_master WHERE name = 'whoami'")
+            )
+        ).scalar()
+        if not exists:
+            return "primary"
+        return (await db.execute(text("SELECT name FROM whoami"))).scalar()
+    finally:
+        await db.close()
+
+
+def test_checks_find_replicas_up_or_down(replica_urls):
+    replica_set = ReplicaSet(replica_urls + [MISSING], max_lag=5, check_interval=5)
+
+    async def check():
+        return [(r.healthy, r.lag, r.failures) for r in replica_set.replicas]
+
+    assert run_with(replica_set, check) == [
+        (True, 0.0, 0),
+        (True, 0.0, 0),
+        (False, None, 1),
+    ]
+
+
+def test_reads_go_round_robin_over_healthy_replicas(replica_urls):
+    replica_set = ReplicaSet(replica_urls + [MISSING], max_lag=5, check_interval=5)
+
+    async def check():
+        return [await whoami(replica_set.pick(user_id=1)) for _ in range(4)]
+
+    names = run_with(replica_set, check)
+    assert sorted(names) == ["replica0", "replica0", "replica1", "replica1"]
+    assert names[0] != names[1]
+    assert replica_set.replica_reads == 4
+    assert replica_set.primary_reads == 0
+
+
+def test_primary_when_no_replica_is_healthy():
+    replica_set = ReplicaSet([MISSING], max_lag=5, check_interval=5)
+
+    async def check():
+        replica = replica_set.pick(user_id=1)
+        return replica, await whoami(replica)
+
+    assert run_with(replica_set, check) == (None, "primary")
+    assert replica_set.primary_reads == 1
+
+
+def test_failed_replica_falls_back_to_the_primary(replica_urls):
+    replica_set = ReplicaSet([MISSING], max_lag=5, check_interval=5)
+    (replica,) = replica_set.replicas
+
+    async def check():
+        # passed the last check, down since
+        replica.healthy = True
+        return await whoami(replica)
+
+    assert run_with(replica_set, check) == "primary"
+    assert not replica.healthy
+    assert replica.failures == 2
+
+
+def test_writer_reads_from_the_primary(replica_urls, monkeypatch):
+    replica_set = ReplicaSet(replica_urls, max_lag=5, check_interval=5)
+    monkeypatch.setattr(backend_db, "replicas", replica_set)
+
+    async def check():
+        async with AsyncSessionLocal() as db:
+            db.info["user_id"] = 7
+            await db.execute(text("SELECT 1"))
+            await db.commit()
+        return (
+            await whoami(replica_set.pick(user_id=7)),
+            await whoami(replica_set.pick(user_id=8)),
+        )
+
+    writer, other = run_with(replica_set, check)
+    assert writer == "primary"
+    assert other.startswith("replica")
+    assert replica_set.stats()["recent_writers"] == 1
+
+
+def test_writes_are_forgotten_after_the_window(replica_urls):
+    replica_set = ReplicaSet(replica_urls, max_lag=0, check_interval=0)
+
+    async def check():
+        replica_set.note_write(7)
+        await replica_set.check_all()
+        return replica_set.pick(user_id=7), replica_set.stats()["recent_writers"]
+
+    replica, recent_writers = run_with(replica_set, check)
+    assert replica is not None
+    assert recent_writers == 0
+
+
+def test_no_replicas_keeps_no_writers():
+    replica_set = ReplicaSet([], max_lag=5, check_interval=5)
+    replica_set.note_write(7)
+    assert replica_set.pick(user_id=7) is None
+    assert replica_set.stats()["recent_writers"] == 0
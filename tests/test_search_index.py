@@ -0,0 +1,94 @@
+"""event search: matching, prefixes and BM25 ranking of the inverted index"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.search_index import EventSearchIndex, tokenize
+
+SOON = datetime.now() + timedelta(days=3)
+PAST = datetime.now() - timedelta(days=3)
+
+
+@pytest.fixture
+def index():
+    index = EventSearchIndex(refresh=float("inf"))
+    for event_id, name, description, club, categories, start in [
+        (1, "Robotics Night", "build and race robots", "Tech Club", ["Tech"], SOON),
+        (2, "Chess Open", "rapid games, robotics fans welcome", "Chess", [], SOON),
+        (3, "Poetry Slam", "open mic night", "Writers", ["Arts"], SOON),
+        (4, "Robotics Workshop", "soldering basics", "Tech Club", ["Tech"], PAST),
+        (5, "Jazz Evening", "live quartet", "Music", ["Arts"], SOON),
+        (6, "Café Crème", "coffee tasting", "Foodies", [], SOON),
+        (7, "Hackathon", "24 hours of code", "Coders", ["Tech"], SOON),
+        (8, "Debate Cup", "finals", "Debaters", [], SOON),
+        (9, "Film Screening", "classic cinema", "Film Society", ["Arts"], SOON),
+        (10, "Yoga Morning", "bring a mat", "Wellness", [], SOON),
+    ]:
+        index.add_event(event_id, name, description, start, club, categories)
+    return index
+
+
+def ids(result):
+    return [event_id for event_id, _ in result[1]]
+
+
+def test_tokenize():
+    assert tokenize("The Café, and CRÈME!") == ["cafe", "creme"]
+    assert tokenize(None) == []
+
+
+def test_every_word_has_to_match(index):
+    assert ids(index.search("robotics night", 10)) == [1]
+    assert index.search("robotics jazz", 10) == (0, [])
+
+
+def test_name_outranks_description(index):
+    # robotics is in event 1's name and only in event 2's description
+    assert ids(index.search("robotics", 10)) == [1, 2]
+
+
+def test_scores_are_bm25_ordered(index):
+    total, ranked = index.search("robotics", 10)
+    scores = [score for _, score in ranked]
+    assert total == 2
+    assert scores == sorted(scores, reverse=True)
+    assert all(score > 0 for score in scores)
+
+
+def test_any_word_can_be_a_prefix(index):
+    assert ids(index.search("rob night", 10)) == [1]
+    assert ids(index.search("robot", 10)) == [1, 2]
+
+
+def test_whole_word_outranks_prefix():
+    index = EventSearchIndex(refresh=float("inf"))
+    index.add_event(1, "Night Run", "", SOON, "Runners")
+    index.add_event(2, "Nightingale Concert", "", SOON, "Choir")
+    assert ids(index.search("night", 10)) == [1, 2]
+
+
+def test_started_events_are_left_out(index):
+    assert 4 not in ids(index.search("robotics", 10))
+    assert 4 in ids(index.search("robotics", 10, upcoming_only=False))
+
+
+def test_accents_and_stopwords(index):
+    assert ids(index.search("cafe creme", 10)) == [6]
+    assert index.search("the and", 10) == (0, [])
+
+
+def test_common_words_only_count_when_alone():
+    index = EventSearchIndex(refresh=float("inf"))
+    for event_id in range(1, 5):
+        index.add_event(event_id, f"Club Meetup {event_id}", "", SOON, "Club")
+    index.add_event(5, "Club Quiz", "", SOON, "Club")
+    # club is in every event, the match is on quiz alone
+    assert ids(index.search("club quiz", 10)) == [5]
+    assert index.search("club", 10)[0] == 5
+
+
+def test_limit_keeps_the_total(index):
+    total, ranked = index.search("arts", 1)
+    assert total == 3
+    assert len(ranked) == 1
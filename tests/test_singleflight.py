@@ -0,0 +1,104 @@
+"""single-flight: identical concurrent reads share one execution"""
+
+import asyncio
+
+import pytest
+
+from backend.singleflight import SingleFlight
+
+
+async def slow(value, calls, delay=0.01):
+    calls.append(value)
+    await asyncio.sleep(delay)
+    return value
+
+
+def test_concurrent_calls_collapse():
+    flights = SingleFlight()
+    calls = []
+
+    async def main():
+        return await asyncio.gather(
+            *(flights.do("key", lambda: slow("rows", calls)) for _ in range(20))
+        )
+
+    assert asyncio.run(main()) == ["rows"] * 20
+    assert calls == ["rows"]
+    assert (flights.executions, flights.collapsed) == (1, 19)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight()
+    calls = []
+
+    async def main():
+        return await asyncio.gather(
+            flights.do("a", lambda: slow("a", calls)),
+            flights.do("b", lambda: slow("b", calls)),
+        )
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_later_calls_run_again():
+    flights = SingleFlight()
+    calls = []
+
+    async def main():
+        await flights.do("key", lambda: slow(1, calls))
+        await flights.do("key", lambda: slow(2, calls))
+
+    asyncio.run(main())
+    assert calls == [1, 2]
+
+
+def test_forget_all_starts_a_new_read():
+    flights = SingleFlight()
+    calls = []
+
+    async def main():
+        first = asyncio.ensure_future(flights.do("key", lambda: slow(1, calls)))
+        await asyncio.sleep(0)
+        # a commit happened, the read in flight may miss it
+        flights.forget_all()
+        second = await flights.do("key", lambda: slow(2, calls))
+        return await first, second
+
+    assert asyncio.run(main()) == (1, 2)
+    assert calls == [1, 2]
+
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    async def main():
+        return await asyncio.gather(
+            *(flights.do("key", fail) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flights.executions == 1
+
+
+def test_cancelled_waiter_leaves_the_read_running():
+    flights = SingleFlight()
+    calls = []
+
+    async def main():
+        first = asyncio.ensure_future(flights.do("key", lambda: slow(1, calls)))
+        waiter = asyncio.ensure_future(flights.do("key", lambda: slow(2, calls)))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await first
+
+    assert asyncio.run(main()) == 1
+    assert calls == [1]
@@ -0,0 +1,56 @@
+"""venue availability: VenueSlots overlap checks and the index around them"""
+
+from datetime import datetime
+
+import pytest
+
+from backend.venue_index import VenueAvailabilityIndex, VenueSlots
+
+
+def at(hour):
+    return datetime(2030, 1, 1, hour)
+
+
+@pytest.fixture
+def slots():
+    venue = VenueSlots()
+    venue.add(at(10), at(12), 1)
+    venue.add(at(14), at(16), 2)
+    return venue
+
+
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [
+        (at(8), at(10), False),  # ends as the first starts
+        (at(12), at(14), False),  # the gap between them, touching both
+        (at(9), at(11), True),
+        (at(11), at(15), True),
+        (at(15), at(17), True),
+        (at(10), at(12), True),
+        (at(16), at(18), False),
+        (at(9), at(17), True),  # covers both
+    ],
+)
+def test_overlaps(slots, start, end, expected):
+    assert slots.overlaps(start, end) is expected
+
+
+def test_long_early_slot_is_still_seen():
+    # a slot starting first but ending last, found through max_end
+    venue = VenueSlots()
+    venue.add(at(8), at(20), 1)
+    venue.add(at(9), at(10), 2)
+    assert venue.overlaps(at(18), at(19))
+    assert not venue.overlaps(at(20), at(21))
+
+
+def test_index_adds_bookings():
+    index = VenueAvailabilityIndex(refresh=60)
+    index.venues = {1: {"venue_name": "Hall B"}, 2: {"venue_name": "Hall A"}}
+    index.add_booking(7, 1, "2030-01-01T10:00:00", "2030-01-01T12:00:00")
+    assert not index.is_available(1, at(11), at(13))
+    assert index.is_available(2, at(11), at(13))
+    assert [v["venue_name"] for v in index.available_venues(at(11), at(13))] == [
+        "Hall A"
+    ]
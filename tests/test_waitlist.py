@@ -0,0 +1,95 @@
+"""waitlist places: the Fenwick tree per event against a plain count"""
+
+import random
+
+from backend.waitlist import TicketQueue, WaitlistIndex
+
+
+def brute_place(waiting, ticket):
+    return sum(1 for t in waiting.values() if t < ticket) + 1
+
+
+def test_ticket_queue_matches_a_count():
+    rng = random.Random(7)
+    queue = TicketQueue(100)
+    waiting = {}
+    next_ticket = 100
+    for step in range(2000):
+        if waiting and rng.random() < 0.4:
+            user_id = rng.choice(list(waiting))
+            del waiting[user_id]
+            queue.remove(user_id)
+        else:
+            user_id = step
+            waiting[user_id] = next_ticket
+            queue.add(next_ticket, user_id)
+            next_ticket += rng.randint(1, 3)
+        assert len(queue) == len(waiting)
+        for ticket in rng.sample(range(100, next_ticket + 5), 5):
+            assert queue.place(ticket) == brute_place(waiting, ticket)
+
+
+def test_ticket_queue_ignores_repeats():
+    queue = TicketQueue(10)
+    queue.add(10, "a")
+    queue.add(11, "a")
+    assert len(queue) == 1
+    assert queue.place(12) == 2
+    queue.remove("nobody")
+    assert len(queue) == 1
+
+
+def test_joins_indexed_out_of_ticket_order():
+    rng = random.Random(3)
+    tickets = list(range(1, 201))
+    rng.shuffle(tickets)
+    index = WaitlistIndex(refresh=60)
+    waiting = {}
+    for ticket in tickets:
+        # each join indexed after its commit, in whatever order they finish
+        index.joined(7, ticket, user_id=1000 + ticket)
+        waiting[1000 + ticket] = ticket
+        for probe in rng.sample(sorted(waiting.values()), min(5, len(waiting))):
+            assert index.place(7, probe) == (
+                brute_place(waiting, probe),
+                len(waiting),
+            )
+    index.left(7, [1001, 1100])
+    del waiting[1001], waiting[1100]
+    assert index.place(7, 150) == (brute_place(waiting, 150), 198)
+
+
+def test_earlier_ticket_after_a_later_one():
+    index = WaitlistIndex(refresh=60)
+    index.joined(7, 5, 11)
+    index.joined(7, 4, 12)
+    assert index.place(7, 4) == (1, 2)
+    assert index.place(7, 5) == (2, 2)
+
+
+def test_index_place_and_total():
+    index = WaitlistIndex(refresh=60)
+    for ticket, user_id in enumerate([11, 12, 13, 14], start=1):
+        index.joined(7, ticket, user_id)
+    assert index.place(7, 1) == (1, 4)
+    assert index.place(7, 4) == (4, 4)
+    index.left(7, [11, 13])
+    assert index.place(7, 4) == (2, 2)
+    assert index.stats() == {"events": 1, "waiting": 2}
+
+
+def test_stale_ticket_still_counts_itself():
+    index = WaitlistIndex(refresh=60)
+    index.joined(7, 1, 11)
+    # ticket 5 joined on another worker, not indexed yet
+    assert index.place(7, 5) == (2, 2)
+    # nobody indexed for the event
+    assert index.place(8, 3) == (1, 1)
+
+
+def test_empty_queues_are_dropped():
+    index = WaitlistIndex(refresh=60)
+    index.joined(7, 1, 11)
+    index.left(7, [11])
+    assert index.queues == {}
+    index.left(9, [1])